@@ -0,0 +1,167 @@
+"""
+Fixtures of the benchmark suite.
+
+Benchmarks require ``pytest-benchmark``, they are not collected without it. Run them with::
+
+    tox -e benchmarks
+
+Every benchmark has a time budget, the run fails if mean time of a benchmark exceeds it. Budgets are generous, they
+catch big regressions on any machine. ``SETTEI_BENCHMARK_BUDGET_FACTOR`` environment variable scales all budgets,
+e.g. for slow CI machines. Smaller regressions are caught by comparison with the previous saved run
+(``--benchmark-compare-fail``).
+"""
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+try:
+    import pytest_benchmark  # noqa
+except ImportError:
+    collect_ignore_glob = ['test_*.py']
+
+import settei
+from settei import discovery
+
+#: Number of synthesized distributions.
+DISTRIBUTIONS = 100
+
+#: Number of ``settings_*`` entry points in every synthesized distribution.
+ENTRY_POINTS_PER_DISTRIBUTION = 50
+
+#: Depth of inheritance chain of the benchmark application.
+DEPTH = 30
+
+#: Number of environments which inherit the last environment of the chain.
+WIDTH = 100
+
+#: Number of settings which every environment sets.
+KEYS_PER_ENVIRONMENT = 100
+
+#: Number of settings in config files.
+FILE_KEYS = 20000
+
+BUDGET_FACTOR = float(os.environ.get('SETTEI_BENCHMARK_BUDGET_FACTOR', 1))
+
+SETTINGS_MODULE = '''
+from settei.config import Config
+
+
+def make_settings(name):
+    return dict(('{0}_{1}'.format(name, i).upper(), i) for i in range(%d))
+
+
+def level_0():
+    return Config(make_settings('level_0'))
+'''
+
+#: Environment which extends ``parent``, leaves of the graph also depend on ``level_0``, so the graph has diamonds.
+ENVIRONMENT_FUNCTION = '''
+
+def {name}({arguments}):
+    {parent}.update(make_settings({name!r}))
+    return {parent}
+'''
+
+
+def assert_budget(benchmark, seconds):
+    """Fail if mean time of the benchmark exceeds the budget.
+
+    :param benchmark: benchmark fixture which was already run
+    :param seconds: budget in seconds
+    """
+    stats = getattr(benchmark, 'stats', None)
+    if stats is None:
+        return
+    budget = seconds * BUDGET_FACTOR
+    assert stats.stats.mean < budget, 'Mean time {0:.6f}s exceeds budget {1:.6f}s'.format(stats.stats.mean, budget)
+
+
+def write_distribution(path, name, groups):
+    """Write metadata of installed distribution.
+
+    :param path: site-packages directory
+    :param name: name of distribution
+    :param groups: dictionary of group name to list of ``(name, value)`` pairs
+    """
+    dist_info = os.path.join(path, '{0}-1.0.dist-info'.format(name))
+    os.makedirs(dist_info)
+    with open(os.path.join(dist_info, 'METADATA'), 'w') as metadata:
+        metadata.write('Metadata-Version: 2.1\nName: {0}\nVersion: 1.0\n'.format(name))
+    with open(os.path.join(dist_info, 'entry_points.txt'), 'w') as entry_points:
+        for group, items in sorted(groups.items()):
+            entry_points.write('[{0}]\n'.format(group))
+            entry_points.writelines('{0} = {1}\n'.format(*item) for item in items)
+
+
+@pytest.fixture(scope='session')
+def site_packages(tmp_path_factory):
+    """Directory with synthesized distributions, it is added to ``sys.path``.
+
+    Every distribution has its own ``settings_*`` group, ``benchmark`` distribution has ``settings_benchmark`` group
+    with a deep and wide inheritance graph.
+    """
+    path = str(tmp_path_factory.mktemp('site-packages'))
+    for i in range(DISTRIBUTIONS):
+        write_distribution(path, 'distribution_{0}'.format(i), {
+            'settings_application_{0}'.format(i): [
+                ('environment_{0}'.format(j), 'benchmark_settings:level_0')
+                for j in range(ENTRY_POINTS_PER_DISTRIBUTION)
+            ],
+        })
+
+    tip = 'level_{0}'.format(DEPTH - 1)
+    source = [SETTINGS_MODULE % KEYS_PER_ENVIRONMENT]
+    graph = [('level_0', 'benchmark_settings:level_0')]
+    for level in range(1, DEPTH):
+        name, parent = 'level_{0}'.format(level), 'level_{0}'.format(level - 1)
+        source.append(ENVIRONMENT_FUNCTION.format(name=name, arguments=parent, parent=parent))
+        graph.append((name, 'benchmark_settings:' + name))
+    for leaf in range(WIDTH):
+        name = 'leaf_{0}'.format(leaf)
+        source.append(ENVIRONMENT_FUNCTION.format(name=name, arguments=tip + ', level_0', parent=tip))
+        graph.append((name, 'benchmark_settings:' + name))
+    with open(os.path.join(path, 'benchmark_settings.py'), 'w') as module:
+        module.write(''.join(source))
+    write_distribution(path, 'benchmark', {'settings_benchmark': graph})
+
+    sys.path.insert(0, path)
+    importlib.invalidate_caches()
+    yield path
+    sys.path.remove(path)
+    importlib.invalidate_caches()
+
+
+@pytest.fixture
+def clean_config(site_packages, monkeypatch, tmp_path):
+    """Empty config storage, default discovery backend and own index file."""
+    monkeypatch.setattr(discovery, '_backend', None)
+    monkeypatch.setenv('SETTEI_INDEX_PATH', str(tmp_path / 'index.json'))
+    settei.config_storage.clear()
+    yield
+    settei.config_storage.clear()
+
+
+@pytest.fixture(scope='session')
+def settings_files(tmp_path_factory):
+    """Big config files in all supported formats.
+
+    :return: dictionary of format to path.
+    """
+    directory = tmp_path_factory.mktemp('settings')
+    settings = dict(('KEY_{0}'.format(i), i if i % 2 else 'value {0}'.format(i)) for i in range(FILE_KEYS))
+    lines = {
+        'py': ['{0} = {1!r}'.format(key, value) for key, value in settings.items()],
+        'toml': ['{0} = {1}'.format(key, json.dumps(value)) for key, value in settings.items()],
+        'yaml': ['{0}: {1}'.format(key, json.dumps(value)) for key, value in settings.items()],
+        'ini': ['[DEFAULT]'] + ['{0} = {1}'.format(key, value) for key, value in settings.items()],
+        'json': [json.dumps(settings)],
+    }
+    paths = {}
+    for extension, content in lines.items():
+        paths[extension] = str(directory / ('settings.' + extension))
+        with open(paths[extension], 'w') as settings_file:
+            settings_file.write('\n'.join(content) + '\n')
+    return paths
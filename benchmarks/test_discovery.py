@@ -0,0 +1,63 @@
+"""Benchmarks of import of settei and of entry points discovery."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import settei
+from settei import discovery
+
+from conftest import DISTRIBUTIONS, assert_budget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cold_import(benchmark):
+    """Import of settei in a fresh interpreter, interpreter startup is included."""
+    command = [sys.executable, '-c', 'import settei']
+    benchmark.pedantic(subprocess.check_call, args=(command,), kwargs={'cwd': ROOT}, rounds=10, warmup_rounds=1)
+    assert_budget(benchmark, 1.0)
+
+
+COLD_DISCOVERY = 'from settei import discovery; discovery.backends[{0!r}]({1!r})'
+
+
+@pytest.mark.parametrize('backend', ['importlib', 'pkg_resources', 'index'])
+def test_cold_discovery(benchmark, clean_config, site_packages, backend):
+    """Discovery of a group in a fresh interpreter, it includes import of the backend and scan of installed
+    distributions which every worker pays on boot. The first round of the ``index`` backend builds the index, it is
+    a warmup round."""
+    if backend == 'pkg_resources':
+        pytest.importorskip('pkg_resources')
+    code = COLD_DISCOVERY.format(backend, 'settings_application_{0}'.format(DISTRIBUTIONS - 1))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, site_packages, os.environ.get('PYTHONPATH', '')]))
+    command = [sys.executable, '-c', code]
+    benchmark.pedantic(subprocess.check_call, args=(command,), kwargs={'env': env}, rounds=5, warmup_rounds=1)
+    assert_budget(benchmark, 3.0)
+
+
+@pytest.mark.parametrize('backend', ['importlib', 'index'])
+def test_iter_entry_points(benchmark, clean_config, backend):
+    """Discovery of a group among thousands of ``settings_*`` entry points of other distributions."""
+    discovery.set_backend(backend)
+    entry_points = benchmark(discovery.iter_entry_points, 'settings_application_{0}'.format(DISTRIBUTIONS - 1))
+    assert entry_points
+    assert_budget(benchmark, 0.5)
+
+
+def test_get_entry_points(benchmark, clean_config):
+    """Discovery of the benchmark application by config generator, duplicates are checked."""
+    def get_entry_points():
+        return settei.ConfigGenerator('benchmark', 'leaf_0').get_entry_points()
+
+    entry_points = benchmark(get_entry_points)
+    assert 'leaf_0' in entry_points
+    assert_budget(benchmark, 0.5)
+
+
+def test_build_index(benchmark, clean_config):
+    """Full scan of installed distributions which happens when the index is stale."""
+    groups = benchmark(discovery.scan_groups)
+    assert len(groups) > DISTRIBUTIONS
+    assert_budget(benchmark, 2.0)
@@ -0,0 +1,101 @@
+"""Benchmarks of ``Config.from_*`` loaders with big config files."""
+import importlib
+import types
+
+import pytest
+
+from settei.config import Config
+
+from conftest import FILE_KEYS, assert_budget
+
+
+def require(*modules):
+    """Skip benchmark if none of the modules can be imported."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        return
+    pytest.skip('{0} is not installed'.format(' or '.join(modules)))
+
+
+def load(loader, *args, **kwargs):
+    config = Config()
+    getattr(config, loader)(*args, **kwargs)
+    return config
+
+
+@pytest.mark.parametrize('loader, extension, kwargs, modules, budget', [
+    ('from_pyfile', 'py', {}, (), 1.0),
+    ('from_json', 'json', {}, (), 0.2),
+    ('from_json', 'json', {'stream': True}, (), 0.5),
+    ('from_toml', 'toml', {}, ('tomllib', 'tomli', 'toml'), 2.0),
+    ('from_yaml', 'yaml', {}, ('yaml',), 5.0),
+    ('from_ini', 'ini', {}, (), 1.0),
+], ids=['pyfile', 'json', 'json-stream', 'toml', 'yaml', 'ini'])
+def test_loader(benchmark, settings_files, loader, extension, kwargs, modules, budget):
+    if modules:
+        require(*modules)
+    config = benchmark(load, loader, settings_files[extension], **kwargs)
+    assert len(config) == FILE_KEYS
+    assert_budget(benchmark, budget)
+
+
+def test_from_pyfile_cached(benchmark, settings_files, tmp_path):
+    """Config file is executed from cached bytecode."""
+    load('from_pyfile', settings_files['py'], cache=str(tmp_path))
+    config = benchmark(load, 'from_pyfile', settings_files['py'], cache=str(tmp_path))
+    assert len(config) == FILE_KEYS
+    assert_budget(benchmark, 0.5)
+
+
+def make_module():
+    module = types.ModuleType('settings')
+    module.__dict__.update(('KEY_{0}'.format(i), i) for i in range(FILE_KEYS))
+    return module
+
+
+def make_class():
+    return type('Settings', (object,), dict(('KEY_{0}'.format(i), i) for i in range(FILE_KEYS)))
+
+
+def make_hierarchy(depth=50):
+    """Class hierarchy where every class overrides a part of settings of its base."""
+    cls = object
+    for level in range(depth):
+        attributes = dict(('KEY_{0}'.format(i), level) for i in range(level * 100, FILE_KEYS, 10))
+        cls = type('Settings{0}'.format(level), (cls,), attributes)
+    return cls
+
+
+@pytest.mark.parametrize('make_object, prefix', [
+    (make_module, None),
+    (make_class, None),
+    (make_hierarchy, None),
+    (make_module, 'KEY_1'),
+], ids=['module', 'class', 'hierarchy', 'prefix'])
+def test_from_object(benchmark, make_object, prefix):
+    obj = make_object()
+    config = benchmark(load, 'from_object', obj, prefix=prefix)
+    assert config == dict((key, getattr(obj, key)) for key in dir(obj) if key.startswith(prefix or 'KEY_'))
+    assert_budget(benchmark, 0.5)
+
+
+def test_from_mapping(benchmark):
+    settings = dict(('KEY_{0}'.format(i), i) for i in range(FILE_KEYS))
+    config = benchmark(load, 'from_mapping', settings)
+    assert len(config) == FILE_KEYS
+    assert_budget(benchmark, 0.2)
+
+
+def test_from_env(benchmark):
+    """Hundreds of prefixed variables among other variables of the environment, the plan is compiled once."""
+    environ = dict(('OTHER_{0}'.format(i), 'value') for i in range(1000))
+    environ.update(('APP_KEY_{0}'.format(i), str(i)) for i in range(500))
+    environ.update(('APP_NESTED__KEY_{0}'.format(i), 'true') for i in range(100))
+    types = dict(('KEY_{0}'.format(i), int) for i in range(500))
+    types.update(('NESTED__KEY_{0}'.format(i), bool) for i in range(100))
+    config = benchmark(load, 'from_env', 'APP_', types=types, environ=environ)
+    assert len(config) == 501
+    assert_budget(benchmark, 0.05)
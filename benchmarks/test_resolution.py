@@ -0,0 +1,81 @@
+"""Benchmarks of config resolution with a deep and wide inheritance graph."""
+import tracemalloc
+
+import pytest
+
+import settei
+
+from conftest import DEPTH, KEYS_PER_ENVIRONMENT, WIDTH, assert_budget
+
+#: Budget of memory which is allocated by resolution of all leaves of the graph.
+MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+def test_get_config_first_call(benchmark, clean_config):
+    """First call resolves the whole chain: discovery, imports and invocation of every entry point."""
+    config = benchmark.pedantic(
+        settei.get_config, args=('benchmark', 'leaf_0'), setup=settei.config_storage.clear, rounds=20)
+    assert len(config) == (DEPTH + 1) * KEYS_PER_ENVIRONMENT
+    assert_budget(benchmark, 0.5)
+
+
+def test_get_config_cached_call(benchmark, clean_config):
+    """Cached config is a dictionary lookup."""
+    settei.get_config('benchmark', 'leaf_0')
+    benchmark(settei.get_config, 'benchmark', 'leaf_0')
+    assert_budget(benchmark, 0.0001)
+
+
+def test_get_config_all_leaves(benchmark, clean_config):
+    """Leaves share the chain, it is resolved only once, but every call discovers entry points."""
+    def get_configs():
+        for leaf in range(WIDTH):
+            settei.get_config('benchmark', 'leaf_{0}'.format(leaf))
+
+    benchmark.pedantic(get_configs, setup=settei.config_storage.clear, rounds=3)
+    assert_budget(benchmark, 15.0)
+
+
+def test_memory_footprint(benchmark, clean_config):
+    """Memory which is kept by configs of all leaves of the graph, tracemalloc makes it much slower."""
+    def get_configs():
+        settei.config_storage.clear()
+        tracemalloc.start()
+        try:
+            for leaf in range(WIDTH):
+                settei.get_config('benchmark', 'leaf_{0}'.format(leaf))
+            return tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    current, peak = benchmark.pedantic(get_configs, rounds=1)
+    benchmark.extra_info.update(memory=current, peak_memory=peak)
+    assert current < MEMORY_BUDGET
+    assert peak < MEMORY_BUDGET * 2
+
+
+@pytest.mark.parametrize('threads', [None, 4])
+def test_get_configs(benchmark, clean_config, threads):
+    """All leaves at once, entry points are discovered only once."""
+    environments = ['leaf_{0}'.format(leaf) for leaf in range(WIDTH)]
+    configs = benchmark.pedantic(
+        settei.get_configs, args=('benchmark', environments), kwargs={'threads': threads},
+        setup=settei.config_storage.clear, rounds=5)
+    assert len(configs) == WIDTH
+    assert_budget(benchmark, 1.0)
+
+
+def test_fingerprint(benchmark, clean_config):
+    """Digests of values are cached per key, next fingerprints only combine them."""
+    config = settei.get_config('benchmark', 'leaf_0')
+    config.fingerprint()
+    benchmark(config.fingerprint)
+    assert_budget(benchmark, 0.01)
+
+
+def test_diff(benchmark, clean_config):
+    """Leaves share the chain of 30 environments, only their own layers are compared."""
+    configs = settei.get_configs('benchmark', ['leaf_0', 'leaf_1'])
+    result = benchmark(settei.diff, configs['leaf_0'], configs['leaf_1'])
+    assert len(result.added) == len(result.removed) == KEYS_PER_ENVIRONMENT
+    assert_budget(benchmark, 0.005)
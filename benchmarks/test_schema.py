@@ -0,0 +1,33 @@
+"""Benchmarks of validation of configs with thousands of keys."""
+import pytest
+
+from settei import schema
+from settei.config import Config
+
+from conftest import FILE_KEYS, assert_budget
+
+FIELDS = dict(('KEY_{0}'.format(i), schema.Field(int, check=lambda value: value >= 0)) for i in range(FILE_KEYS))
+FIELDS['NESTED'] = dict(('KEY_{0}'.format(i), str) for i in range(100))
+
+
+def make_config():
+    config = Config(('KEY_{0}'.format(i), i) for i in range(FILE_KEYS))
+    config['NESTED'] = dict(('KEY_{0}'.format(i), str(i)) for i in range(100))
+    return config
+
+
+def test_compile(benchmark):
+    compiled = benchmark(schema.Schema, FIELDS)
+    assert len(compiled.validators) == FILE_KEYS + 1
+    assert_budget(benchmark, 0.5)
+
+
+@pytest.mark.parametrize('frozen', [False, True], ids=['config', 'frozen'])
+def test_validate(benchmark, frozen):
+    """Frozen configs are validated once, next validations are cached."""
+    compiled = schema.Schema(FIELDS)
+    config = make_config()
+    if frozen:
+        config = config.freeze()
+    assert benchmark(compiled.validate, config) is config
+    assert_budget(benchmark, 0.0001 if frozen else 0.1)
@@ -3,11 +3,19 @@ Settei
 
 Config system which bases on entry points of setuptools.
 """
+import collections
+import gc
 import inspect
+import itertools
 import os
-import pkg_resources
+import sys
+import threading
 
 from . import config
+from . import discovery
+from . import schema
+from . import tracing
+from .config import diff, fingerprint  # noqa
 
 
 class WrongConfigTypeError(Exception):
@@ -54,7 +62,9 @@ class EnvironmentIsMissing(Exception):
 
 
 class MoreThanOneDependencyInjection(Exception):
-    """Raises if entry point has more than one dependency injection."""
+    """Raises if entry point has more than one dependency injection.
+
+    Not raised anymore, entry points can depend on several environments. Kept for backwards compatibility."""
     message = "You specified more than one dependency injection."
 
     def __str__(self):
@@ -64,21 +74,77 @@ class MoreThanOneDependencyInjection(Exception):
         return self.message
 
 
+class CircularDependency(Exception):
+    """Raises if entry points depend on each other."""
+    message = "Entry points have circular dependency: {0}."
+
+    def __init__(self, path):
+        Exception.__init__(self, path)
+        self.path = path
+
+    def __str__(self):
+        if config.PY2:
+            return unicode(self).encode('utf-8')
+        return self.__unicode__()
+
+    def __unicode__(self):
+        return self.message.format(' -> '.join(self.path))
+
+
+def get_arguments(function):
+    """Get names of positional arguments of function.
+
+    :param function: function or any other callable object
+
+    :return: list of names of arguments.
+    """
+    if config.PY2:
+        return inspect.getargspec(function).args
+    return [
+        parameter.name for parameter in inspect.signature(function).parameters.values()
+        if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+    ]
+
+
+#: Locks of entry points which are being built, keyed by the shared ``resolved`` dictionary and name of entry point.
+building_nodes = {}
+
+building_nodes_lock = threading.Lock()
+
+
 class ConfigGenerator(object):
     """ConfigGenerator is simple entry points reader. Its main feature get list of entry points for application
-     then get entry point for environment, calculate all dependency injection and return result."""
-    def __init__(self, application, environment):
+     then get entry point for environment, calculate all dependency injection and return result.
+
+    Every entry point is invoked only once, its result is kept in the ``resolved`` dictionary which can be shared
+    between generators of the same application. Generators which share it and need the same entry point at the same
+    time wait for a single build. Dependents always get their own overlay of the resolved config
+    (:class:`settei.config.LayeredConfig`), so they can't change it for others and keep only their own changes."""
+
+    #: Dependents get overlays of resolved configs, set to `False` to give them full copies.
+    layered = True
+
+    def __init__(self, application, environment, resolved=None):
         self.application = application
         self.environment = environment
 
         self.entry_points = {}
+        self.loaded = {}
+        self.resolved = {} if resolved is None else resolved
 
     def get_entry_points(self):
         """Fill in self.entry_points dict.
 
         :return: dictionary entry_points contains entry points for application.
         """
-        for entry_point in pkg_resources.iter_entry_points('settings_{0}'.format(self.application)):
+        group = 'settings_{0}'.format(self.application)
+        if tracing.tracer is None:
+            entry_points = discovery.iter_entry_points(group)
+        else:
+            with tracing.tracer.span('discovery', group):
+                entry_points = discovery.iter_entry_points(group)
+
+        for entry_point in entry_points:
             if entry_point.name not in self.entry_points:
                 self.entry_points[entry_point.name] = entry_point
             else:
@@ -86,6 +152,65 @@ class ConfigGenerator(object):
 
         return self.entry_points
 
+    def load(self, name):
+        """Load entry point and introspect its arguments, both are done only once for every entry point.
+
+        :param name: name of entry point
+
+        :return: tuple of loaded object and list of names of its arguments.
+        """
+        try:
+            return self.loaded[name]
+        except KeyError:
+            pass
+
+        if tracing.tracer is None:
+            function = self.entry_points[name].load()
+        else:
+            with tracing.tracer.span('load', name):
+                function = self.entry_points[name].load()
+        return self.loaded.setdefault(name, (function, get_arguments(function)))
+
+    def get_dependencies(self, name):
+        """Get names of environments which entry point depends on.
+
+        :param name: name of entry point
+
+        :return: list of names of environments.
+        """
+        return self.load(name)[1]
+
+    def get_resolution_order(self, name):
+        """Get entry points which should be resolved to get config of entry point.
+
+        :param name: name of entry point
+
+        :return: list of names of entry points which are not resolved yet in topological order, dependencies go
+                 before dependents and the entry point itself is the last one.
+        """
+        order = []
+        done = set(self.resolved)
+        if name in done:
+            return order
+
+        path = [name]
+        stack = [iter(self.get_dependencies(name))]
+        while stack:
+            for dependency in stack[-1]:
+                if dependency in done:
+                    continue
+                if dependency in path:
+                    raise CircularDependency(path[path.index(dependency):] + [dependency])
+                path.append(dependency)
+                stack.append(iter(self.get_dependencies(dependency)))
+                break
+            else:
+                stack.pop()
+                done.add(path[-1])
+                order.append(path.pop())
+
+        return order
+
     def evaluate_dependency_injection(self, args):
         """Evaluate dependency injection of entry point.
 
@@ -93,66 +218,598 @@ class ConfigGenerator(object):
 
         :return: tuple of calculated dependency injection for entry point.
         """
+        if self.layered:
+            return tuple(self.resolve(dependency).overlay() for dependency in args)
+        return tuple(self.resolve(dependency).copy() for dependency in args)
+
+    def resolve(self, name):
+        """Get config of entry point. Entry point and all its dependencies are resolved in topological order,
+        every entry point is invoked only if it wasn't resolved before.
+
+        :param name: name of entry point
+
+        :return: resolved config, it should not be changed.
+        """
+        try:
+            return self.resolved[name]
+        except KeyError:
+            pass
+
+        for node in self.get_resolution_order(name):
+            self.build(node)
+
+        return self.resolved[name]
+
+    def resolve_many(self, names, threads=None):
+        """Get configs of several entry points. Dependencies which they share are resolved only once.
+
+        :param names: names of entry points
+        :param threads: number of threads which build independent entry points concurrently, entry points are built
+                        one by one if not specified
+
+        :return: dictionary of name to resolved config, configs should not be changed.
+        """
+        order = []
+        seen = set()
+        for name in names:
+            for node in self.get_resolution_order(name):
+                if node not in seen:
+                    seen.add(node)
+                    order.append(node)
+
+        if threads and threads > 1 and len(order) > 1:
+            self.build_concurrently(order, threads)
+        else:
+            for node in order:
+                self.build(node)
+
+        return dict((name, self.resolved[name]) for name in names)
+
+    def build_concurrently(self, order, threads):
+        """Build entry points in a thread pool, every entry point is submitted as soon as its dependencies are built.
+
+        :param order: names of entry points in topological order, their dependencies which are not listed should be
+                      already resolved
+        :param threads: number of threads
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        waiting = {}
+        dependents = dict((name, []) for name in order)
+        for name in order:
+            waiting[name] = set(dependency for dependency in self.get_dependencies(name) if dependency in dependents)
+            for dependency in waiting[name]:
+                dependents[dependency].append(name)
+
+        ready = [name for name in order if not waiting[name]]
+        running = {}
+        with ThreadPoolExecutor(threads) as executor:
+            while ready or running:
+                for name in ready:
+                    running[executor.submit(self.build, name)] = name
+                ready = []
+                done = wait(running, return_when=FIRST_COMPLETED)[0]
+                for future in done:
+                    name = running.pop(future)
+                    future.result()
+                    for dependent in dependents[name]:
+                        waiting[dependent].discard(name)
+                        if not waiting[dependent]:
+                            ready.append(dependent)
+
+    def build(self, name):
+        """Invoke entry point unless it is already resolved, all its dependencies should be already resolved.
+        Generators which share the ``resolved`` dictionary build the entry point only once, the others wait for it.
+
+        :param name: name of entry point
+
+        :return: resolved config, it should not be changed.
+        """
+        key = (id(self.resolved), name)
+        with building_nodes_lock:
+            lock = building_nodes.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                try:
+                    return self.resolved[name]
+                except KeyError:
+                    return self.invoke_node(name)
+        finally:
+            with building_nodes_lock:
+                if building_nodes.get(key) is lock:
+                    del building_nodes[key]
+
+    def invoke_node(self, name):
+        """Invoke entry point and put its config into the ``resolved`` dictionary.
+
+        :param name: name of entry point
+
+        :return: resolved config.
+        """
+        function, dependencies = self.load(name)
+        arguments = self.evaluate_dependency_injection(dependencies)
+        if tracing.tracer is None:
+            config_instance = self.invoke(function, *arguments)
+        else:
+            with tracing.tracer.span('invoke', name):
+                config_instance = self.invoke(function, *arguments)
+        module = sys.modules.get(getattr(function, '__module__', None))
+        if getattr(module, '__file__', None):
+            config_instance.add_source(module.__file__)
+        # config depends on files of every injected config, not only on the one it is layered on
+        config_instance.sources = config_instance.sources.union(
+            *(self.resolved[dependency].sources for dependency in dependencies))
+        config_instance.environment = name
+        if isinstance(config_instance, config.LayeredConfig):
+            # resolved config keeps only its own layer, overlays build their flattened dictionaries themselves
+            config_instance.compact()
+        self.validate(function, config_instance)
+        return self.resolved.setdefault(name, config_instance)
+
+    def validate(self, function, config_instance):
+        """Validate config of entry point with schema of the entry point, see :mod:`settei.schema`.
+
+        :param function: loaded entry point
+        :param config_instance: config which the entry point returned
+        """
+        self.check_schema(getattr(function, 'settei_schema', None), config_instance)
 
-        if len(args) > 1:
-            raise MoreThanOneDependencyInjection()
+    def validate_environment(self, config_instance):
+        """Validate config of the requested environment with schema of the application. Entry points which it
+        inherits are not validated, they may miss keys which only the requested environment sets.
 
-        arguments = []
-        for dependency in args:
-            entry_point = self.entry_points[dependency]
-            dependency_args = self.evaluate_dependency_injection(
-                inspect.getargspec(entry_point.load()).args
-            )
-            arguments.append(self.invoke_entry_point(entry_point, *tuple(dependency_args)))
+        :param config_instance: resolved config of the environment
 
-        return tuple(arguments)
+        :return: the config itself.
+        """
+        self.check_schema(schema.schemas.get(self.application), config_instance)
+        return config_instance
 
     @staticmethod
-    def invoke_entry_point(entry_point, *args):
-        """Invoke given entry point."""
-        config_instance = entry_point.load()(*args)
+    def check_schema(compiled, config_instance):
+        if compiled is None:
+            return
+        if tracing.tracer is None:
+            compiled.validate(config_instance)
+        else:
+            with tracing.tracer.span('validate', config_instance.environment):
+                compiled.validate(config_instance)
+
+    @staticmethod
+    def invoke(function, *args):
+        """Invoke loaded entry point."""
+        config_instance = function(*args)
         if not isinstance(config_instance, config.Config):
             raise WrongConfigTypeError()
         return config_instance
 
+    @staticmethod
+    def invoke_entry_point(entry_point, *args):
+        """Invoke given entry point."""
+        return ConfigGenerator.invoke(entry_point.load(), *args)
+
     def get_config(self):
         """Get entry point for environment and return result.
 
         :return: result of calling entry point with pre calculated dependency injection.
         """
-        try:
-            entry_point = self.get_entry_points()[self.environment]
-        except KeyError:
+        if self.environment not in self.get_entry_points():
             raise EnvironmentIsMissing()
 
-        return self.invoke_entry_point(entry_point, *tuple(
-            self.evaluate_dependency_injection(inspect.getargspec(entry_point.load()).args)
-        ))
+        return self.validate_environment(self.resolve(self.environment)).copy()
+
+
+class Counter(object):
+    """Counter which is incremented without locking, :func:`next` of :func:`itertools.count` is atomic. Every read
+    takes a number from the count too, reads are subtracted under the lock."""
+    def __init__(self):
+        self.count = itertools.count()
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def increment(self):
+        next(self.count)
+
+    @property
+    def value(self):
+        with self.lock:
+            value = next(self.count) - self.reads
+            self.reads += 1
+            return value
 
 
 class ConfigStorage(dict):
-    """Dict for memoization already calculated configs for applications and environments."""
+    """Dict for memoization already calculated configs for applications and environments.
+
+    Configs of entry points resolved for an application are shared by all its environments.
+
+    Storage is safe to use from several threads. Config is built only once, threads which need the same config at
+    the same time wait for the one which builds it. Already built configs are read without locking.
+
+    Storage is unbounded by default. With `maxsize` least recently used configs are evicted, with `ttl` configs
+    are built again, invoking their entry points, when they get older than `ttl` seconds. Resolved configs of entry
+    points of an application are dropped together with its last config or with any expired one.
+
+    :param maxsize: maximum number of configs
+    :param ttl: time to live of configs in seconds"""
+    def __init__(self, *args, **kwargs):
+        self.maxsize = kwargs.pop('maxsize', None)
+        self.ttl = kwargs.pop('ttl', None)
+        dict.__init__(self, *args, **kwargs)
+        self.resolved = {}
+        self.lock = threading.Lock()
+        self.building = {}
+        self.env_overlays = {}
+        #: Keys of configs from the least recently used one.
+        self.order = collections.OrderedDict()
+        #: Time when configs expire.
+        self.expires = {}
+        #: Environments of stored configs per application.
+        self.environments = {}
+        #: Increased when configs are invalidated, expired or reloaded, configs which were built for an older
+        #: generation are stale.
+        self.generation = 0
+        #: Hits and misses are counted on the path which reads configs without locking.
+        self.hits = Counter()
+        self.misses = Counter()
+        self.builds = self.evictions = self.expirations = self.invalidations = 0
+        self.build_time = 0.0
+        for key in list(dict.keys(self)):
+            self.remember(key)
+
     def __getitem__(self, *key):
-        return dict.__getitem__(self, key)
+        config_instance = self.lookup(key)
+        if config_instance is None:
+            return self.__missing__(key)
+        return config_instance
 
     def __missing__(self, key):
-        config = self[key] = ConfigGenerator(*key).get_config()
-        return config
+        with self.lock:
+            lock = self.building.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                config_instance = self.get_fresh(key)
+                if config_instance is not None:
+                    return config_instance
+                application, environment = key
+                resolved = self.resolved.setdefault(application, {})
+                built = environment not in resolved
+                generator = ConfigGenerator(application, environment, resolved)
+                start = tracing.clock()
+                config_instance = generator.get_config()
+                if built:
+                    self.record_build(tracing.clock() - start)
+                self[key] = config_instance
+                return config_instance
+        finally:
+            with self.lock:
+                if self.building.get(key) is lock:
+                    del self.building[key]
+
+    def __setitem__(self, key, config_instance):
+        dict.__setitem__(self, key, config_instance)
+        self.remember(key)
+
+    def setdefault(self, key, config_instance=None):
+        stored = dict.setdefault(self, key, config_instance)
+        if stored is config_instance:
+            self.remember(key)
+        return stored
+
+    def get_fresh(self, key):
+        """Get config unless it is missing or expired, expired config is removed together with resolved configs of
+        entry points of the application, so entry points are invoked again when it is built.
+
+        :param key: tuple of application and environment
+
+        :return: config or `None`.
+        """
+        config_instance = dict.get(self, key)
+        if config_instance is not None and self.ttl is not None and self.expires.get(key, 0) <= tracing.clock():
+            with self.lock:
+                if dict.get(self, key) is config_instance:
+                    self.discard(key)
+                    self.resolved.pop(key[0], None)
+                    self.expirations += 1
+                    self.generation += 1
+            return None
+        return config_instance
+
+    def lookup(self, key):
+        """Get config if it is stored, it is counted as hit or miss.
+
+        :param key: tuple of application and environment
+
+        :return: config or `None`.
+        """
+        config_instance = dict.get(self, key) if self.ttl is None else self.get_fresh(key)
+        if config_instance is None:
+            self.misses.increment()
+            return None
+        self.hits.increment()
+        if self.maxsize is not None:
+            try:
+                self.order.move_to_end(key)
+            except KeyError:
+                pass
+        return config_instance
+
+    def record_build(self, seconds, count=1):
+        """Count configs which were built by invoking entry points, configs copied from already resolved ones are
+        not counted.
+
+        :param seconds: time of building
+        :param count: number of configs
+        """
+        with self.lock:
+            self.builds += count
+            self.build_time += seconds
+
+    def remember(self, key):
+        """Track added or replaced config, least recently used configs are evicted if the storage is full."""
+        with self.lock:
+            if key not in self:
+                return
+            application, environment = key
+            self.environments.setdefault(application, set()).add(environment)
+            if self.ttl is not None:
+                self.expires[key] = tracing.clock() + self.ttl
+            if self.maxsize is not None:
+                self.order[key] = None
+                self.order.move_to_end(key)
+                self.evict(self.maxsize)
+
+    def evict(self, maxsize):
+        while len(self.order) > maxsize:
+            self.discard(next(iter(self.order)))
+            self.evictions += 1
+
+    def discard(self, key):
+        """Remove config, resolved configs of the application are removed with its last config. Storage should be
+        locked."""
+        dict.pop(self, key, None)
+        self.order.pop(key, None)
+        self.expires.pop(key, None)
+        for overlay_key in [overlay_key for overlay_key in self.env_overlays if overlay_key[0] == key]:
+            del self.env_overlays[overlay_key]
+        application, environment = key
+        environments = self.environments.get(application)
+        if environments is not None:
+            environments.discard(environment)
+            if not environments:
+                del self.environments[application]
+                self.resolved.pop(application, None)
+
+    def configure(self, maxsize=None, ttl=None):
+        """Change limits of the storage, configs above `maxsize` are evicted at once.
+
+        :param maxsize: maximum number of configs, unbounded if not specified
+        :param ttl: time to live of configs in seconds, configs don't expire if not specified
+        """
+        with self.lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self.expires = dict.fromkeys(dict.keys(self), tracing.clock() + ttl) if ttl is not None else {}
+            # recently used configs keep their order, configs which were not tracked are the newest ones
+            keys = list(self.order) + list(dict.keys(self)) if maxsize is not None else []
+            self.order = collections.OrderedDict.fromkeys(keys)
+            if maxsize is not None:
+                self.evict(maxsize)
+
+    def invalidate(self, application, environment=None):
+        """Remove configs, they are built again when they are requested.
+
+        :param application: group of entry points
+        :param environment: name of entry point, all environments of the application if not specified, resolved
+                            configs of entry points of the application are removed in both cases
+
+        :return: number of removed configs.
+        """
+        with self.lock:
+            environments = self.environments.get(application, set())
+            keys = [(application, name) for name in environments if environment in (None, name)]
+            for key in keys:
+                self.discard(key)
+            self.resolved.pop(application, None)
+            self.invalidations += len(keys)
+            self.generation += 1
+            return len(keys)
+
+    def get_stats(self):
+        """Get counters of the storage, they are never reset, so they can be exported as metrics.
+
+        :return: dictionary with number of stored configs, hits, misses, builds, evictions, expirations,
+                 invalidations and total time of builds in seconds.
+        """
+        return {
+            'size': len(self),
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'builds': self.builds,
+            'build_time': self.build_time,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+    def get_env_overlay(self, key, config_instance, plan):
+        """Get config with environment variables applied as the final layer. Overlay is built once per config and
+        plan, it is built again when the config is replaced, e.g. by :mod:`settei.reload`.
+
+        :param key: tuple of application and environment
+        :param config_instance: config from the storage
+        :param plan: :class:`settei.config.EnvironmentPlan`
+
+        :return: overlay of the config.
+        """
+        cached = self.env_overlays.get((key, plan))
+        if cached is not None and cached[0] is config_instance:
+            return cached[1]
+        overlay = plan.overlay(config_instance)
+        self.env_overlays[(key, plan)] = (config_instance, overlay)
+        return overlay
+
+    def clear(self):
+        """Remove all configs including resolved configs of entry points."""
+        with self.lock:
+            dict.clear(self)
+            self.resolved.clear()
+            self.env_overlays.clear()
+            self.order.clear()
+            self.expires.clear()
+            self.environments.clear()
+            self.generation += 1
 
 config_storage = ConfigStorage()
 
 
-def get_config(application, environment=None):
-    """Get config for specific application and environment.
+def get_environment(environment=None):
+    """Get environment, ``CONFIG_ENVIRONMENT`` environment variable is used if it is not specified.
 
-    :param application: group of entry points
-    :param environment: name of entry point from which you want to get config
+    :param environment: name of entry point
 
-    :return: result of calling entry point"""
+    :return: name of entry point."""
     if not environment:
         environment = os.environ.get('CONFIG_ENVIRONMENT')
 
     if not environment:
         raise EnvironmentNotSpecified()
 
-    return config_storage.__getitem__(application, environment)
+    return environment
+
+
+def load_snapshot(path, key):
+    """Load snapshot of the config and put it into the storage.
+
+    :param path: path to snapshot written by :mod:`settei.snapshot`
+    :param key: tuple of application and environment
+
+    :return: config or `None` if the snapshot is missing or stale."""
+    from . import snapshot as snapshots
+    application, environment = key
+    try:
+        config_instance = snapshots.load(path, application, environment)
+    except (IOError, OSError, snapshots.StaleSnapshot):
+        return None
+    compiled = schema.schemas.get(application)
+    if compiled is not None:
+        compiled.validate(config_instance, environment)
+    return config_storage.setdefault(key, config_instance)
+
+
+def get_config(application, environment=None, snapshot=None, env_prefix=None, env_types=None):
+    """Get config for specific application and environment.
+
+    :param application: group of entry points
+    :param environment: name of entry point from which you want to get config
+    :param snapshot: path to snapshot written by :mod:`settei.snapshot`, it is used instead of building the config
+                     unless it is missing or stale
+    :param env_prefix: prefix of environment variables which are applied as the final layer of the config, see
+                       :meth:`settei.config.Config.from_env`
+    :param env_types: types of values of environment variables
+
+    :return: result of calling entry point"""
+    environment = get_environment(environment)
+    key = (application, environment)
+    if snapshot is None:
+        config_instance = config_storage.__getitem__(application, environment)
+    else:
+        config_instance = config_storage.lookup(key)
+        if config_instance is None:
+            config_instance = load_snapshot(snapshot, key)
+        if config_instance is None:
+            config_instance = config_storage.__missing__(key)
+    if env_prefix is None:
+        return config_instance
+    return config_storage.get_env_overlay(key, config_instance, config.get_env_plan(env_prefix, env_types))
+
+
+def get_configs(application, environments=None, threads=None):
+    """Get configs of several environments of the application at once.
+
+    Entry points are discovered once and every environment is resolved only once, even if several of the requested
+    environments inherit it. Configs are put into the storage, like configs built by :func:`get_config`.
+
+    :param application: group of entry points
+    :param environments: names of entry points, all entry points of the application by default
+    :param threads: number of threads which build independent environments concurrently, environments are built one
+                    by one if not specified
+
+    :return: dictionary of environment name to config."""
+    stored = {}
+    if environments is not None:
+        stored = get_stored(application, environments)
+        if len(stored) == len(set(environments)):
+            return stored
+
+    generator = ConfigGenerator(application, None, config_storage.resolved.setdefault(application, {}))
+    entry_points = generator.get_entry_points()
+    if environments is None:
+        environments = sorted(entry_points)
+        stored = get_stored(application, environments)
+    for environment in environments:
+        if environment not in entry_points:
+            raise EnvironmentIsMissing()
+
+    missing = [environment for environment in environments if environment not in stored]
+    built = len([environment for environment in set(missing) if environment not in generator.resolved])
+    start = tracing.clock()
+    resolved = generator.resolve_many(missing, threads)
+    if built:
+        config_storage.record_build(tracing.clock() - start, built)
+
+    configs = stored
+    for environment in missing:
+        config_instance = generator.validate_environment(resolved[environment]).copy()
+        configs[environment] = config_storage.setdefault((application, environment), config_instance)
+    return configs
+
+
+def get_stored(application, environments):
+    """Get configs of environments which are in the storage.
+
+    :param application: group of entry points
+    :param environments: names of entry points
+
+    :return: dictionary of environment name to config."""
+    stored = {}
+    for environment in environments:
+        if environment not in stored:
+            config_instance = config_storage.lookup((application, environment))
+            if config_instance is not None:
+                stored[environment] = config_instance
+    return stored
+
+
+def preload(application, environments=None, freeze=True, gc_freeze=True):
+    """Build configs in advance, e.g. in the master process of prefork server before workers are forked.
+
+    Configs are built with :func:`get_configs` and put into the storage, so workers get them from
+    :func:`get_config` without building. Frozen configs are never changed and, with `gc_freeze`, garbage collector
+    doesn't touch them either, so memory pages which they occupy stay shared between the master process and workers.
+
+    :param application: group of entry points
+    :param environments: names of entry points, all entry points of the application by default
+    :param freeze: put read-only :class:`settei.config.FrozenConfig` snapshots into the storage
+    :param gc_freeze: move all objects to the permanent generation of garbage collector (Python 3.7+)
+
+    :return: dictionary of environment name to config."""
+    configs = get_configs(application, environments)
+    if freeze:
+        for environment, config_instance in configs.items():
+            config_instance = configs[environment] = config_instance.freeze()
+            config_storage[(application, environment)] = config_instance
+
+    if gc_freeze and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+
+    return configs
+
+
+def __getattr__(name):
+    """Import asynchronous API only when it is used, so asyncio is not imported together with settei."""
+    if name == 'aget_config':
+        from .aio import aget_config
+        return aget_config
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
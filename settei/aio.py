@@ -0,0 +1,74 @@
+"""
+Asynchronous API of settei.
+
+Entry points discovery, imports and invocation of entry points (which usually read config files) are blocking, so
+they are run in an executor and the event loop keeps serving other coroutines. Independent environments of the
+dependency graph are built concurrently.
+"""
+import asyncio
+import weakref
+
+from . import ConfigGenerator, EnvironmentIsMissing, config_storage, get_environment, tracing
+
+#: Configs which are being built, per event loop.
+pending = weakref.WeakKeyDictionary()
+
+
+async def aget_config(application, environment=None, executor=None):
+    """Get config for specific application and environment without blocking the event loop.
+
+    Coroutines which request the same config at the same time wait for a single build.
+
+    :param application: group of entry points
+    :param environment: name of entry point from which you want to get config
+    :param executor: executor for blocking calls, default executor of the loop is used if not specified
+
+    :return: result of calling entry point"""
+    key = (application, get_environment(environment))
+    config = config_storage.lookup(key)
+    if config is not None:
+        return config
+
+    loop = asyncio.get_running_loop()
+    loop_pending = pending.setdefault(loop, {})
+    task = loop_pending.get(key)
+    if task is None:
+        task = loop_pending[key] = loop.create_task(build_config(loop, executor, *key))
+        task.add_done_callback(lambda task: loop_pending.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def build_config(loop, executor, application, environment):
+    """Build config in executor and put it into the storage.
+
+    :param loop: running event loop
+    :param executor: executor for blocking calls
+    :param application: group of entry points
+    :param environment: name of entry point
+
+    :return: built config.
+    """
+    start = tracing.clock()
+    generator = ConfigGenerator(application, environment, config_storage.resolved.setdefault(application, {}))
+    entry_points = await loop.run_in_executor(executor, generator.get_entry_points)
+    if environment not in entry_points:
+        raise EnvironmentIsMissing()
+
+    order = await loop.run_in_executor(executor, generator.get_resolution_order, environment)
+
+    async def build(name, dependencies):
+        if dependencies:
+            await asyncio.gather(*dependencies)
+        await loop.run_in_executor(executor, generator.build, name)
+
+    tasks = {}
+    for name in order:
+        dependencies = [tasks[dependency] for dependency in generator.get_dependencies(name) if dependency in tasks]
+        tasks[name] = loop.create_task(build(name, dependencies))
+    if tasks:
+        await asyncio.gather(*tasks.values())
+
+    if order:
+        config_storage.record_build(tracing.clock() - start)
+    config = generator.validate_environment(generator.resolve(environment))
+    return config_storage.setdefault((application, environment), config.copy())
@@ -1,11 +1,30 @@
 import os
-import imp
+import binascii
 import errno
+import hashlib
+import json
+import marshal
 import sys
+import tempfile
+import threading
+import types
+import weakref
+
+from collections import OrderedDict, namedtuple
+
+try:
+    from collections.abc import ItemsView, Mapping, ValuesView
+except ImportError:
+    from collections import ItemsView, Mapping, ValuesView
+
+from . import loaders
+from . import tracing
 
 PY2 = sys.version_info[0] == 2
 
 if not PY2:
+    from importlib.util import MAGIC_NUMBER
+
     string_types = (str,)
 
     def reraise(tp, value, tb=None):
@@ -13,13 +32,29 @@ if not PY2:
             raise value.with_traceback(tb)
         raise value
 else:
+    import imp
+
+    MAGIC_NUMBER = imp.get_magic()
+
     string_types = (str, unicode)
 
     exec('def reraise(tp, value, tb=None):\n raise tp, value, tb')
 
 
+#: Maximum number of import names which resolution is memoized by :func:`import_string`.
+IMPORT_CACHE_SIZE = 256
+
+#: Memoized resolutions of import names: import name to ``(module name, attribute name or None)``.
+import_cache = OrderedDict()
+import_cache_lock = threading.Lock()
+
+
 class ImportStringError(ImportError):
-    """Provides information about a failed :func:`import_string` attempt."""
+    """Provides information about a failed :func:`import_string` attempt.
+
+    The message imports every prefix of the import name to find out where the import failed, so it is built only
+    when the error is rendered.
+    """
 
     #: String in dotted notation that failed to be imported.
     import_name = None
@@ -27,8 +62,16 @@ class ImportStringError(ImportError):
     exception = None
 
     def __init__(self, import_name, exception):
+        ImportError.__init__(self, import_name, exception)
         self.import_name = import_name
         self.exception = exception
+        self._message = None
+
+    @property
+    def message(self):
+        """Diagnostic message, it is built on first access."""
+        if self._message is not None:
+            return self._message
 
         msg = (
             'import_string() failed for %r. Possible reasons are:\n\n'
@@ -42,7 +85,7 @@ class ImportStringError(ImportError):
 
         name = ''
         tracked = []
-        for part in import_name.replace(':', '.').split('.'):
+        for part in self.import_name.replace(':', '.').split('.'):
             name += (name and '.') + part
             imported = import_string(name, silent=True)
             if imported:
@@ -50,23 +93,70 @@ class ImportStringError(ImportError):
             else:
                 track = ['- %r found in %r.' % (n, i) for n, i in tracked]
                 track.append('- %r not found.' % name)
-                msg = msg % (import_name, '\n'.join(track),
-                             exception.__class__.__name__, str(exception))
+                msg = msg % (self.import_name, '\n'.join(track),
+                             self.exception.__class__.__name__, str(self.exception))
                 break
 
-        ImportError.__init__(self, msg)
+        self._message = msg
+        return msg
+
+    def __str__(self):
+        return self.message
 
     def __repr__(self):
         return '<%s(%r, %r)>' % (self.__class__.__name__, self.import_name,
                                  self.exception)
 
 
+def split_import_name(import_name):
+    """Split import name to module name and attribute name.
+
+    :param import_name: dotted name or name with colon as object delimiter
+    :return: tuple of module name and attribute name, attribute name is `None` for top level modules.
+    """
+    if ':' in import_name:
+        return tuple(import_name.split(':', 1))
+    if '.' in import_name:
+        return tuple(import_name.rsplit('.', 1))
+    return import_name, None
+
+
+def get_imported(module, obj):
+    """Get already imported object from ``sys.modules`` without the import machinery.
+
+    :param module: module name
+    :param obj: attribute name or `None`
+    :return: imported object or `None` if it is not imported yet.
+    """
+    imported = sys.modules.get(module)
+    if imported is None or obj is None:
+        return imported
+    value = getattr(imported, obj, None)
+    if value is None:
+        # a submodule which is not set up by its parent package yet
+        return sys.modules.get(module + '.' + obj)
+    return value
+
+
+def remember_import(import_name, resolution):
+    """Memoize resolution of the import name, the oldest names are forgotten when the cache is full."""
+    with import_cache_lock:
+        import_cache.pop(import_name, None)
+        import_cache[import_name] = resolution
+        while len(import_cache) > IMPORT_CACHE_SIZE:
+            import_cache.popitem(last=False)
+
+
 def import_string(import_name, silent=False):
     """Imports an object based on a string.  This is useful if you want to
     use import paths as endpoints or something similar.  An import path can
     be specified either in dotted notation (``xml.sax.saxutils.escape``)
     or with a colon as object delimiter (``xml.sax.saxutils:escape``).
 
+    Objects of already imported modules are taken from ``sys.modules``
+    directly and resolutions of import names are memoized, so attributes of
+    reloaded modules are still up to date.
+
     If `silent` is True the return value will be `None` if the import fails.
 
     :param import_name: the dotted name for the object to import.
@@ -78,31 +168,358 @@ def import_string(import_name, silent=False):
     assert isinstance(import_name, string_types)
     # force the import name to automatically convert to strings
     import_name = str(import_name)
+
+    resolution = import_cache.get(import_name)
+    if resolution is not None:
+        imported = get_imported(*resolution)
+        if imported is not None:
+            return imported
+
+    module, obj = split_import_name(import_name)
+    imported = get_imported(module, obj)
+    if imported is not None:
+        remember_import(import_name, (module, obj))
+        return imported
+
     try:
-        if ':' in import_name:
-            module, obj = import_name.split(':', 1)
-        elif '.' in import_name:
-            module, obj = import_name.rsplit('.', 1)
+        if obj is None:
+            imported = __import__(import_name)
         else:
-            return __import__(import_name)
-        # __import__ is not able to handle unicode strings in the fromlist
-        # if the module is a package
-        if PY2 and isinstance(obj, unicode):
-            obj = obj.encode('utf-8')
-        try:
-            return getattr(__import__(module, None, None, [obj]), obj)
-        except (ImportError, AttributeError):
-            # support importing modules not yet set up by the parent module
-            # (or package for that matter)
-            modname = module + '.' + obj
-            __import__(modname)
-            return sys.modules[modname]
+            # __import__ is not able to handle unicode strings in the fromlist
+            # if the module is a package
+            if PY2 and isinstance(obj, unicode):
+                obj = obj.encode('utf-8')
+            try:
+                imported = getattr(__import__(module, None, None, [obj]), obj)
+            except (ImportError, AttributeError):
+                # support importing modules not yet set up by the parent module
+                # (or package for that matter)
+                modname = module + '.' + obj
+                __import__(modname)
+                imported = sys.modules[modname]
+                module, obj = modname, None
     except ImportError as e:
         if not silent:
             reraise(
                 ImportStringError,
                 ImportStringError(import_name, e),
                 sys.exc_info()[2])
+        return None
+    remember_import(import_name, (module, obj))
+    return imported
+
+
+def get_cache_path(filename, cache, optimize=0):
+    """Get path of the file with cached code object of Python file.
+
+    :param filename: the filename of Python file
+    :param cache: `True` to store cache next to the file or path to cache directory
+    :param optimize: optimization level of the interpreter, code of other levels is cached in other files, like
+                     ``opt-`` tags of ``.pyc`` files
+    :return: path to cache file.
+    """
+    suffix = '.opt-{0}.settei-cache'.format(optimize) if optimize else '.settei-cache'
+    if cache is True:
+        return filename + suffix
+    name = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+    return os.path.join(cache, name + suffix)
+
+
+def read_code_cache(cache_path, key):
+    """Read cached code object.
+
+    :param cache_path: path to cache file
+    :param key: key of the Python file, it should match the key stored in the cache file
+    :return: code object or `None` if cache is missing, broken or stale.
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            if marshal.load(cache_file) != key:
+                return None
+            code = marshal.load(cache_file)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, types.CodeType) else None
+
+
+def write_code_cache(cache_path, key, code):
+    """Atomically write code object to cache file. Failures are ignored, the file is just a cache.
+
+    :param cache_path: path to cache file
+    :param key: key of the Python file
+    :param code: code object
+    """
+    directory = os.path.dirname(cache_path) or os.curdir
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.settei-')
+        with os.fdopen(fd, 'wb') as cache_file:
+            marshal.dump(key, cache_file)
+            marshal.dump(code, cache_file)
+        if hasattr(os, 'replace'):
+            os.replace(temp_path, cache_path)
+        else:
+            os.rename(temp_path, cache_path)
+    except (IOError, OSError):
+        pass
+
+
+def compile_pyfile(filename, cache=None):
+    """Compiles a Python file. If `cache` is set, code object is stored with :mod:`marshal` and reused until path,
+    modification time or size of the file, the interpreter or its optimization level are changed.
+
+    :param filename: the filename of Python file
+    :param cache: `True` to store cache next to the file, path to cache directory or `None` to disable cache
+    :return: code object.
+    """
+    with open(filename, 'rb') as config_file:
+        if cache:
+            stat = os.fstat(config_file.fileno())
+            optimize = sys.flags.optimize
+            key = (MAGIC_NUMBER, optimize, os.path.abspath(filename), stat.st_mtime, stat.st_size)
+            cache_path = get_cache_path(filename, cache, optimize)
+            code = read_code_cache(cache_path, key)
+            if code is not None:
+                return code
+        code = compile(config_file.read(), filename, 'exec')
+    if cache:
+        write_code_cache(cache_path, key, code)
+    return code
+
+
+def get_namespace(obj):
+    """Get attributes of the object which :func:`dir` would list, without sorting them and without building a list
+    of every inherited attribute. Attributes of :class:`object` itself are skipped, they are never settings.
+
+    Module dictionary is used directly, dictionaries of MRO of classes and instances are merged. Values are taken
+    from the dictionaries as is, so descriptors are not bound.
+
+    :param obj: any object
+    :return: mapping of attributes or `None` if the object customizes :func:`dir`.
+    """
+    obj_type = type(obj)
+    if obj_type is types.ModuleType:
+        return None if '__dir__' in obj.__dict__ else obj.__dict__
+    if isinstance(obj, type):
+        if getattr(obj_type, '__dir__', None) is not getattr(type, '__dir__', None):
+            return None
+        mro, instance_dict = obj.__mro__, None
+    else:
+        mro = getattr(obj_type, '__mro__', None)
+        instance_dict = getattr(obj, '__dict__', None)
+        if (getattr(obj_type, '__dir__', None) is not getattr(object, '__dir__', None) or obj.__class__ is not obj_type
+                or mro is None or not isinstance(instance_dict, dict)):
+            return None
+    dicts = [cls.__dict__ for cls in reversed(mro) if cls is not object]
+    if instance_dict is not None:
+        dicts.append(instance_dict)
+    if len(dicts) == 1:
+        return dicts[0]
+    namespace = {}
+    for attributes in dicts:
+        namespace.update(attributes)
+    return namespace
+
+
+def parse_bool(value):
+    """Parse boolean value of environment variable: ``1``, ``true``, ``yes``, ``on`` and ``0``, ``false``, ``no``,
+    ``off`` or empty string in any case."""
+    normalized = value.strip().lower()
+    if normalized in ('1', 'true', 'yes', 'on'):
+        return True
+    if normalized in ('', '0', 'false', 'no', 'off'):
+        return False
+    raise ValueError('Not a boolean: {0!r}'.format(value))
+
+
+def parse_list(value):
+    """Parse comma separated list, items are stripped."""
+    if not value.strip():
+        return []
+    return [item.strip() for item in value.split(',')]
+
+
+#: Coercions of environment variable values by type or by name.
+COERCIONS = {
+    bool: parse_bool,
+    list: parse_list,
+    tuple: lambda value: tuple(parse_list(value)),
+    dict: json.loads,
+    'bool': parse_bool,
+    'int': int,
+    'float': float,
+    'str': str,
+    'list': parse_list,
+    'json': json.loads,
+}
+
+
+class EnvironmentPlan(object):
+    """Mapping of environment variables to config keys and coercions of their values, it is compiled once per
+    prefix and types, so applying it is a single pass over the environment.
+
+    :param prefix: prefix of environment variables, it is not part of config keys
+    :param types: dictionary of config key to type or function which coerces string value, nested keys are joined
+                  with the separator
+    :param separator: separator of nested keys
+    """
+
+    def __init__(self, prefix, types=None, separator='__'):
+        self.prefix = prefix
+        self.separator = separator
+        #: Environment variable name to tuple of key path and coercion.
+        self.paths = {}
+        for key, value_type in (types or {}).items():
+            self.paths[prefix + key] = (self.split(key), COERCIONS.get(value_type, value_type))
+
+    def split(self, key):
+        return tuple(key.split(self.separator)) if self.separator else (key,)
+
+    def get_values(self, environ=None):
+        """Get values of environment variables with the prefix.
+
+        :param environ: environment, ``os.environ`` by default
+        :return: list of ``(key path, value)`` pairs, top level keys go first.
+        """
+        prefix = self.prefix
+        paths = self.paths
+        values = []
+        for name, value in (os.environ if environ is None else environ).items():
+            if not name.startswith(prefix):
+                continue
+            entry = paths.get(name)
+            if entry is None:
+                entry = paths[name] = (self.split(name[len(prefix):]), None)
+            path, coerce = entry
+            if not path[0].isupper() or not all(path):
+                continue
+            if coerce is not None:
+                try:
+                    value = coerce(value)
+                except ValueError as e:
+                    raise ValueError('Environment variable {0} has invalid value: {1}'.format(name, e))
+            values.append((path, value))
+        values.sort(key=lambda item: len(item[0]))
+        return values
+
+    def apply(self, config, environ=None):
+        """Update the config with values of environment variables.  Nested
+        dictionaries are copied, so they are not changed for configs which
+        share them.
+
+        :param config: the config
+        :param environ: environment, ``os.environ`` by default
+        """
+        for path, value in self.get_values(environ):
+            key = path[0]
+            config[key] = value if len(path) == 1 else set_nested(config.get(key), path[1:], value)
+
+    def overlay(self, config, environ=None):
+        """Get overlay of the config with values of environment variables,
+        frozen config gets frozen overlay.
+
+        :param config: the config
+        :param environ: environment, ``os.environ`` by default
+        :return: new config.
+        """
+        if isinstance(config, FrozenConfig):
+            return self.overlay(config.thaw(), environ).freeze()
+        layer = config.overlay()
+        self.apply(layer, environ)
+        return layer
+
+
+def set_nested(mapping, path, value):
+    """Copy the mapping and set value of nested key in the copy.  Keys which
+    already exist are matched regardless of case.
+
+    :param mapping: a mapping or `None`
+    :param path: tuple of keys
+    :param value: the value
+    :return: new dictionary.
+    """
+    result = dict(mapping) if isinstance(mapping, Mapping) else {}
+    key = path[0]
+    if key not in result:
+        key = next((existing for existing in result if str(existing).upper() == key.upper()), key)
+    result[key] = value if len(path) == 1 else set_nested(result.get(key), path[1:], value)
+    return result
+
+
+#: Compiled plans by prefix, separator and types.
+env_plans = {}
+
+
+def get_env_plan(prefix, types=None, separator='__'):
+    """Get compiled :class:`EnvironmentPlan`, it is compiled once per
+    prefix, separator and types.
+
+    :return: :class:`EnvironmentPlan`.
+    """
+    try:
+        key = (prefix, separator, tuple(sorted((types or {}).items())))
+        return env_plans[key]
+    except TypeError:
+        return EnvironmentPlan(prefix, types, separator)
+    except KeyError:
+        return env_plans.setdefault(key, EnvironmentPlan(prefix, types, separator))
+
+
+class Lazy(object):
+    """Marks a value which is computed only when it is accessed for the
+    first time.  The result is memoized, the function is called only once
+    even if several threads access the value at the same time::
+
+        config['DSN'] = Lazy(lambda: build_dsn(read_secrets()))
+
+    Copies of the config share the memoized value.
+
+    :param function: a function without arguments which computes the value
+    """
+
+    __slots__ = ('function', 'value', 'evaluated', 'lock')
+
+    def __init__(self, function):
+        self.function = function
+        self.value = None
+        self.evaluated = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Returns the value, it is computed on the first call."""
+        if not self.evaluated:
+            with self.lock:
+                if not self.evaluated:
+                    self.value = self.function()
+                    self.evaluated = True
+                    self.function = None
+        return self.value
+
+    def __repr__(self):
+        if self.evaluated:
+            return '<Lazy evaluated %r>' % (self.value,)
+        return '<Lazy %r>' % (self.function,)
+
+
+class ConfigValuesView(ValuesView):
+    """Values of a config, :class:`Lazy` values are computed."""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        for key, value in get_raw_items(self._mapping):
+            yield value.get() if isinstance(value, Lazy) else value
+
+
+class ConfigItemsView(ItemsView):
+    """Items of a config, :class:`Lazy` values are computed."""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        for key, value in get_raw_items(self._mapping):
+            yield key, value.get() if isinstance(value, Lazy) else value
 
 
 class Config(dict):
@@ -113,10 +530,136 @@ class Config(dict):
     :param defaults: an optional dictionary of default values
     """
 
+    #: Default value of `cache` argument of :meth:`from_pyfile` and :meth:`from_envvar`.
+    pyfile_cache = None
+
+    #: Absolute paths of files which the config was loaded from.
+    sources = frozenset()
+
+    #: Name of entry point which built the config, it is set by :class:`settei.ConfigGenerator`.
+    environment = None
+
     def __init__(self, defaults=None):
         dict.__init__(self, defaults or {})
 
-    def from_envvar(self, variable_name, silent=False):
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, Lazy):
+            return value.get()
+        return value
+
+    def get(self, key, default=None):
+        """Returns the value for the key if it is in the config, otherwise
+        `default`.  :class:`Lazy` values are computed.
+        """
+        value = dict.get(self, key, default)
+        if isinstance(value, Lazy):
+            return value.get()
+        return value
+
+    def evaluate(self):
+        """Computes all :class:`Lazy` values and stores their results
+        instead of them.
+
+        :return: the config itself.
+        """
+        for key, value in list(dict.items(self)):
+            if isinstance(value, Lazy):
+                dict.__setitem__(self, key, value.get())
+        return self
+
+    def __iter__(self):
+        # defined in Python, so dict(), dict.update() and dict.copy() read
+        # the config through keys() and __getitem__ and compute Lazy values
+        return dict.__iter__(self)
+
+    if PY2:
+        def values(self):
+            """Returns a list of values, :class:`Lazy` values are computed."""
+            return list(ConfigValuesView(self))
+
+        def items(self):
+            """Returns a list of items, :class:`Lazy` values are computed."""
+            return list(ConfigItemsView(self))
+
+        def itervalues(self):
+            return iter(ConfigValuesView(self))
+
+        def iteritems(self):
+            return iter(ConfigItemsView(self))
+
+        def viewvalues(self):
+            return ConfigValuesView(self)
+
+        def viewitems(self):
+            return ConfigItemsView(self)
+    else:
+        def values(self):
+            """Returns a view of values, :class:`Lazy` values are computed."""
+            return ConfigValuesView(self)
+
+        def items(self):
+            """Returns a view of items, :class:`Lazy` values are computed."""
+            return ConfigItemsView(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == (other if type(other) is dict else dict(other.items()))
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def copy(self):
+        """Returns a shallow copy of the config which has the same type and
+        attributes.  :class:`Lazy` values are shared with the copy.
+        """
+        rv = self.__class__.__new__(self.__class__)
+        dict.update(rv, dict.items(self))
+        rv.__dict__.update(self.__dict__)
+        return rv
+
+    def freeze(self):
+        """Returns a read-only snapshot of the config, see :class:`FrozenConfig`."""
+        return FrozenConfig(self)
+
+    def overlay(self):
+        """Returns a :class:`LayeredConfig` which reads through to this
+        config and keeps its own changes separately.  Changes of this config
+        are not tracked, it shouldn't be changed while the overlay is used.
+        Overlays of subclasses are instances of the subclass too and get
+        attributes of the config, like :meth:`copy`.
+        """
+        rv = get_layered_class(self.__class__)(self)
+        rv.__dict__.update(
+            (key, value) for key, value in self.__dict__.items() if key not in LAYERED_ATTRIBUTES)
+        return rv
+
+    def fingerprint(self):
+        """Returns a stable fingerprint of keys and values of the config,
+        it is the same for equal configs in any process.  Values of
+        different types are different even if they are equal, e.g. ``1``
+        and ``1.0``.  Digests of values which can't be changed in place
+        (strings, numbers, frozen configs) are cached per key, so only
+        changed keys are hashed again.  :class:`Lazy` values are computed.
+
+        :return: hexadecimal string.
+        """
+        cache = self.__dict__.get('_digests')
+        if cache is None:
+            cache = self.__dict__['_digests'] = {}
+        return get_fingerprint(self.items(), cache)
+
+    def add_source(self, filename):
+        """Remembers that the config was loaded from the file.
+
+        :param filename: the filename of the config.
+        """
+        self.sources = self.sources | frozenset([os.path.abspath(filename)])
+
+    def from_envvar(self, variable_name, silent=False, cache=None):
         """Loads a configuration from an environment variable pointing to
         a configuration file.  This is basically just a shortcut with nicer
         error messages for this line of code::
@@ -124,6 +667,7 @@ class Config(dict):
         :param variable_name: name of the environment variable
         :param silent: set to `True` if you want silent failure for missing
                        files.
+        :param cache: see :meth:`from_pyfile`.
         :return: bool. `True` if able to load config, `False` otherwise.
         """
         rv = os.environ.get(variable_name)
@@ -135,9 +679,9 @@ class Config(dict):
                                'loaded.  Set this variable and make it '
                                'point to a configuration file' %
                                variable_name)
-        return self.from_pyfile(rv, silent=silent)
+        return self.from_pyfile(rv, silent=silent, cache=cache)
 
-    def from_pyfile(self, filename, silent=False):
+    def from_pyfile(self, filename, silent=False, cache=None):
         """Updates the values in the config from a Python file.  This function
         behaves as if the file was imported as module with the
         :meth:`from_object` function.
@@ -145,31 +689,899 @@ class Config(dict):
         :param filename: the absolute filename of the config.
         :param silent: set to `True` if you want silent failure for missing
                        files.
+        :param cache: set to `True` to cache compiled code next to the file
+                      or to path of cache directory. :attr:`pyfile_cache`
+                      is used by default.
         """
-        d = imp.new_module('config')
+        if cache is None:
+            cache = self.pyfile_cache
+        d = types.ModuleType('config')
         d.__file__ = filename
         try:
-            with open(filename) as config_file:
-                exec(compile(config_file.read(), filename, 'exec'), d.__dict__)
+            if tracing.tracer is None:
+                exec(compile_pyfile(filename, cache), d.__dict__)
+            else:
+                with tracing.tracer.span('from_pyfile', filename):
+                    exec(compile_pyfile(filename, cache), d.__dict__)
         except IOError as e:
             if silent and e.errno in (errno.ENOENT, errno.EISDIR):
                 return False
             e.strerror = 'Unable to load configuration file (%s)' % e.strerror
             raise
+        self.add_source(filename)
         self.from_object(d)
         return True
 
-    def from_object(self, obj):
+    def from_object(self, obj, prefix=None):
         """Updates the values from the given object.  An object can be of one
         of the following two types:
 
         -   a string: in this case the object with that name will be imported
         -   an actual object reference: that object is used directly
 
+        Only uppercase attributes are loaded.  If the object has a
+        ``__settings__`` list, tuple or set of names, only these attributes
+        are loaded and nothing else is scanned.
+
         :param obj: an import name or object
+        :param prefix: load only attributes which names start with the prefix,
+                       e.g. ``'DB_'``
         """
         if isinstance(obj, string_types):
-            obj = import_string(obj)
-        for key in dir(obj):
-            if key.isupper():
-                self[key] = getattr(obj, key)
+            if tracing.tracer is None:
+                obj = import_string(obj)
+            else:
+                with tracing.tracer.span('from_object', obj):
+                    obj = import_string(obj)
+        if isinstance(obj, types.ModuleType) and getattr(obj, '__file__', None):
+            self.add_source(obj.__file__)
+        keys = getattr(obj, '__settings__', None)
+        namespace = None
+        if not isinstance(keys, (list, tuple, set, frozenset)):
+            namespace = get_namespace(obj)
+            keys = dir(obj) if namespace is None else namespace
+        if prefix:
+            keys = [key for key in keys if key.startswith(prefix)]
+        keys = [key for key in keys if key.isupper()]
+        # values of modules and plain classes are read from the namespace, descriptors of classes are still bound
+        direct = namespace is not None and type(obj) in (types.ModuleType, type)
+        bind = direct and type(obj) is type
+        descriptor_types = {}
+        for key in sorted(keys if namespace is not None else set(keys)):
+            if direct:
+                value = namespace[key]
+                if bind:
+                    value_type = type(value)
+                    if value_type not in descriptor_types:
+                        descriptor_types[value_type] = hasattr(value_type, '__get__')
+                    if descriptor_types[value_type]:
+                        value = getattr(obj, key)
+            else:
+                value = getattr(obj, key)
+            self[key] = value
+
+    def from_env(self, prefix, types=None, separator='__', environ=None):
+        """Updates the values from environment variables with the prefix,
+        e.g. ``APP_DEBUG`` is loaded as ``DEBUG`` with ``'APP_'`` prefix.
+        Like in other loaders only uppercase keys are loaded.  Nested keys
+        are joined with the separator: ``APP_DATABASES__DEFAULT__PORT``.
+        Values are strings unless their types are specified::
+
+            config.from_env('APP_', types={'DEBUG': bool, 'WORKERS': int,
+                                           'DATABASES__DEFAULT__PORT': int,
+                                           'HOSTS': list, 'CACHES': 'json'})
+
+        Types are ``bool``, ``int``, ``float``, ``str``, ``list`` (comma
+        separated), ``tuple``, ``dict`` or ``'json'`` or any function which
+        takes a string.
+
+        :param prefix: prefix of environment variables
+        :param types: dictionary of key to type
+        :param separator: separator of nested keys, `None` disables them
+        :param environ: environment, ``os.environ`` by default
+        :return: `True`.
+        """
+        get_env_plan(prefix, types, separator).apply(self, environ)
+        return True
+
+    def from_mapping(self, mapping):
+        """Updates the values from the given mapping or iterable of
+        ``(key, value)`` pairs.  Like :meth:`from_object` only uppercase keys
+        are loaded, keys which are not strings are skipped.
+
+        :param mapping: a mapping, an iterable of pairs or `None` for empty
+                        files, e.g. empty YAML or ``null`` JSON
+        :return: `True`.
+        """
+        if mapping is None:
+            return True
+        if hasattr(mapping, 'items'):
+            mapping = mapping.items()
+        for key, value in mapping:
+            if isinstance(key, string_types) and key.isupper():
+                self[key] = value
+        return True
+
+    def from_file(self, filename, load, silent=False):
+        """Updates the values in the config from a file which is parsed with
+        the given function.  The file is opened in binary mode, the function
+        should return a mapping or an iterable of ``(key, value)`` pairs.
+
+        :param filename: the filename of the config.
+        :param load: a function which takes a file and returns its data.
+        :param silent: set to `True` if you want silent failure for missing
+                       files.
+        :return: bool. `True` if able to load config, `False` otherwise.
+        """
+        try:
+            with open(filename, 'rb') as config_file:
+                self.add_source(filename)
+                if tracing.tracer is None:
+                    return self.from_mapping(load(config_file))
+                with tracing.tracer.span('from_file', filename):
+                    return self.from_mapping(load(config_file))
+        except IOError as e:
+            if silent and e.errno in (errno.ENOENT, errno.EISDIR):
+                return False
+            e.strerror = 'Unable to load configuration file (%s)' % e.strerror
+            raise
+
+    def from_json(self, filename, silent=False, stream=False):
+        """Updates the values in the config from a JSON file with an object
+        at the top level.
+
+        :param filename: the filename of the config.
+        :param silent: set to `True` if you want silent failure for missing
+                       files.
+        :param stream: set to `True` to read the file in chunks and decode
+                       the object item by item, so the whole document is never
+                       kept in memory.
+        :return: bool. `True` if able to load config, `False` otherwise.
+        """
+        return self.from_file(filename, loaders.iter_json if stream else loaders.load_json, silent=silent)
+
+    def from_toml(self, filename, silent=False):
+        """Updates the values in the config from a TOML file.  Requires
+        ``tomllib`` (Python 3.11+), ``tomli`` or ``toml``.
+
+        :param filename: the filename of the config.
+        :param silent: set to `True` if you want silent failure for missing
+                       files.
+        :return: bool. `True` if able to load config, `False` otherwise.
+        """
+        return self.from_file(filename, loaders.load_toml, silent=silent)
+
+    def from_yaml(self, filename, silent=False):
+        """Updates the values in the config from a YAML file.  Requires
+        ``PyYAML``.
+
+        :param filename: the filename of the config.
+        :param silent: set to `True` if you want silent failure for missing
+                       files.
+        :return: bool. `True` if able to load config, `False` otherwise.
+        """
+        return self.from_file(filename, loaders.load_yaml, silent=silent)
+
+    def from_ini(self, filename, section=None, silent=False):
+        """Updates the values in the config from a section of an INI file.
+        Values are loaded as strings.
+
+        :param filename: the filename of the config.
+        :param section: name of the section, ``DEFAULT`` section is used if
+                        not specified.
+        :param silent: set to `True` if you want silent failure for missing
+                       files.
+        :return: bool. `True` if able to load config, `False` otherwise.
+        """
+        return self.from_file(filename, lambda ini_file: loaders.load_ini(ini_file, section), silent=silent)
+
+
+#: Marks keys which are deleted in a layer but can exist in its parents.
+DELETED = object()
+
+#: Guards building of flattened dictionaries of layered configs.
+flatten_lock = threading.Lock()
+
+#: Attributes which keep state of layers, they are not inherited by overlays.
+LAYERED_ATTRIBUTES = frozenset(
+    ('parent', 'delta', '_stale', '_deleted', '_children', '_digests', 'own_sources', 'sources'))
+
+#: Layered classes of subclasses of :class:`Config`, they are created once per class.
+layered_classes = {}
+
+
+def get_layered_class(config_class):
+    """Returns the class of overlays of configs of the given class, it
+    mixes :class:`LayeredConfig` into subclasses of :class:`Config`.
+
+    :param config_class: class of the parent config
+    :return: subclass of :class:`LayeredConfig`.
+    """
+    if issubclass(config_class, LayeredConfig):
+        return config_class
+    if config_class is Config:
+        return LayeredConfig
+    try:
+        return layered_classes[config_class]
+    except KeyError:
+        pass
+    layered_class = type('Layered' + config_class.__name__, (LayeredConfig, config_class), {
+        '__module__': config_class.__module__,
+        'base_class': config_class,
+    })
+    return layered_classes.setdefault(config_class, layered_class)
+
+
+def make_layered(config_class, defaults):
+    """Creates an overlay of the class which mixes :class:`LayeredConfig`
+    into the config class, it is used to unpickle overlays.
+    """
+    return get_layered_class(config_class)(None, defaults)
+
+
+class LayeredConfig(Config):
+    """Config which stores only its own changes over the parent config, like
+    :class:`collections.ChainMap`.  Environments which inherit other
+    environments get layered configs, so memory scales with the size of
+    overrides rather than with the number of environments::
+
+        default = Config({'DEBUG': False, 'ANSWER': 42})
+        dev = default.overlay()
+        dev['DEBUG'] = True
+        assert dev.delta == {'DEBUG': True}
+
+    Reads go through a flattened dictionary of all layers, so code which
+    reads the dictionary directly (``json.dumps``, ``dict.copy``) sees all
+    values.  It is built when the config is created and rebuilt when the
+    config or any of its layered parents is changed.  Configs which are only
+    read through their overlays can drop it with :meth:`compact`.
+
+    :param parent: the parent config, changes of :class:`LayeredConfig`
+                   parents are tracked, other parents shouldn't be changed
+    :param defaults: an optional dictionary of values of the own layer
+    """
+
+    def __init__(self, parent=None, defaults=None):
+        dict.__init__(self)
+        #: The parent config or `None`.
+        self.parent = parent
+        #: Values of the own layer, deleted keys are marked with :data:`DELETED`.
+        self.delta = dict(defaults or {})
+        self._stale = True
+        self._deleted = DELETED in self.delta.values()
+        self._children = None
+        if isinstance(parent, LayeredConfig):
+            parent.add_child(self)
+        self.flatten()
+
+    @property
+    def layers(self):
+        """List of layers from this config to the most distant parent."""
+        layers = []
+        layer = self
+        while isinstance(layer, LayeredConfig):
+            layers.append(layer)
+            layer = layer.parent
+        if layer is not None:
+            layers.append(layer)
+        return layers
+
+    @property
+    def sources(self):
+        """Absolute paths of files which the config and its parents were loaded from."""
+        sources = self.__dict__.get('own_sources', frozenset())
+        parent_sources = getattr(self.parent, 'sources', None)
+        return sources | parent_sources if parent_sources else sources
+
+    @sources.setter
+    def sources(self, sources):
+        self.own_sources = frozenset(sources)
+
+    def add_child(self, child):
+        with flatten_lock:
+            if self._children is None:
+                self._children = weakref.WeakValueDictionary()
+            self._children[id(child)] = child
+
+    def invalidate(self):
+        """Rebuilds flattened dictionaries of the config and of all configs
+        which overlay it.  Configs which were read are flattened again at
+        once, so code which reads the dictionary directly (``json.dumps``,
+        ``dict.copy``) never sees it empty, other configs are flattened on
+        the next read.
+        """
+        stack = [self]
+        flat = []
+        while stack:
+            layer = stack.pop()
+            if not layer._stale:
+                layer._stale = True
+                flat.append(layer)
+            if layer._children:
+                stack.extend(layer._children.values())
+        for layer in flat:
+            layer.flatten()
+
+    def compact(self):
+        """Drops flattened dictionary of the config, it keeps only its own
+        layer until the next read.  It is used for configs which are only
+        read through their overlays.
+        """
+        with flatten_lock:
+            self._stale = True
+            dict.clear(self)
+
+    def invalidate_children(self):
+        if self._children:
+            for child in list(self._children.values()):
+                child.invalidate()
+
+    def flatten(self):
+        """Builds flattened dictionary of all layers if it was dropped.
+
+        :return: the config itself.
+        """
+        if not self._stale:
+            return self
+        with flatten_lock:
+            if self._stale:
+                values = {}
+                deleted = False
+                for layer in reversed(self.layers):
+                    if isinstance(layer, LayeredConfig):
+                        values.update(layer.delta)
+                        deleted = deleted or layer._deleted
+                    else:
+                        values.update(dict.items(layer) if isinstance(layer, dict) else layer.items())
+                if deleted:
+                    for key in [key for key, value in values.items() if value is DELETED]:
+                        del values[key]
+                dict.clear(self)
+                dict.update(self, values)
+                self._stale = False
+        return self
+
+    def get_layer(self, key):
+        """Returns the layer which supplies the value of the key.  Name of
+        its environment is available as ``environment`` attribute.
+
+        :param key: the key
+        :return: :class:`Config` or mapping of the layer.
+        """
+        for layer in self.layers:
+            values = layer.delta if isinstance(layer, LayeredConfig) else layer
+            if key in values:
+                if isinstance(layer, LayeredConfig) and values[key] is DELETED:
+                    break
+                return layer
+        raise KeyError(key)
+
+    def layer_fingerprint(self):
+        """Returns a fingerprint of the own layer, see :meth:`fingerprint`.
+
+        :return: hexadecimal string.
+        """
+        cache = self.__dict__.get('_digests')
+        if cache is None:
+            cache = self.__dict__['_digests'] = {}
+        return get_fingerprint(self.delta.items(), cache)
+
+    def attribution(self):
+        """Returns environments which supplied values of the config.
+
+        :return: dictionary of key to name of environment.
+        """
+        attribution = {}
+        for layer in reversed(self.layers):
+            environment = getattr(layer, 'environment', None)
+            if isinstance(layer, LayeredConfig):
+                for key, value in layer.delta.items():
+                    if value is DELETED:
+                        attribution.pop(key, None)
+                    else:
+                        attribution[key] = environment
+            else:
+                attribution.update(dict.fromkeys(layer, environment))
+        return attribution
+
+    def __getitem__(self, key):
+        if self._stale:
+            self.flatten()
+        value = dict.__getitem__(self, key)
+        if isinstance(value, Lazy):
+            return value.get()
+        return value
+
+    def get(self, key, default=None):
+        if self._stale:
+            self.flatten()
+        return Config.get(self, key, default)
+
+    def __contains__(self, key):
+        if self._stale:
+            self.flatten()
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        return dict.__iter__(self.flatten())
+
+    def __len__(self):
+        return dict.__len__(self.flatten())
+
+    def keys(self):
+        return dict.keys(self.flatten())
+
+    if PY2:
+        def iterkeys(self):
+            return dict.iterkeys(self.flatten())
+
+        def has_key(self, key):
+            return key in self
+
+    def __repr__(self):
+        return dict.__repr__(self.flatten())
+
+    def __setitem__(self, key, value):
+        self.delta[key] = value
+        if not self._stale:
+            dict.__setitem__(self, key, value)
+        self.invalidate_children()
+
+    def forget(self, key):
+        """Removes the key from the own layer, it is masked if the parent can have it."""
+        if self.parent is None:
+            self.delta.pop(key, None)
+        else:
+            self.delta[key] = DELETED
+            self._deleted = True
+        self.invalidate_children()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self.flatten(), key)
+        self.forget(key)
+
+    def pop(self, key, *default):
+        self.flatten()
+        if not dict.__contains__(self, key):
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = dict.pop(self, key)
+        self.forget(key)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self.flatten())
+        self.forget(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        self.flatten()
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        self[key] = default
+        return default
+
+    def lookup(self, key, default=None):
+        """Returns the raw value of the key without building flattened
+        dictionary, :class:`Lazy` values are not computed.
+        """
+        if not self._stale:
+            return dict.get(self, key, default)
+        layer = self
+        while isinstance(layer, LayeredConfig):
+            if key in layer.delta:
+                value = layer.delta[key]
+                return default if value is DELETED else value
+            layer = layer.parent
+        if layer is None or key not in layer:
+            return default
+        return dict.__getitem__(layer, key) if isinstance(layer, dict) else layer[key]
+
+    def update(self, *args, **kwargs):
+        """Updates the own layer, values which are identical to the ones the
+        config already has are not stored.
+        """
+        values = {}
+        if args:
+            other = args[0]
+            if isinstance(other, dict):
+                values.update(get_raw_items(other))
+            elif hasattr(other, 'keys'):
+                values.update((key, other[key]) for key in other.keys())
+            else:
+                values.update(other)
+        values.update(kwargs)
+        values = dict((key, value) for key, value in values.items() if self.lookup(key, DELETED) is not value)
+        self.delta.update(values)
+        if not self._stale:
+            dict.update(self, values)
+        self.invalidate_children()
+
+    def clear(self):
+        if self.parent is None:
+            self.delta.clear()
+        else:
+            self.delta = dict.fromkeys(dict.keys(self.flatten()), DELETED)
+            self._deleted = True
+        dict.clear(self)
+        self._stale = False
+        self.invalidate_children()
+
+    def evaluate(self):
+        for key, value in list(get_raw_items(self)):
+            if isinstance(value, Lazy):
+                self[key] = value.get()
+        return self
+
+    def copy(self):
+        """Returns a config with the same parent and a copy of the own layer."""
+        rv = self.__class__.__new__(self.__class__)
+        rv.__dict__.update(self.__dict__)
+        LayeredConfig.__init__(rv, self.parent, self.delta)
+        return rv
+
+    if hasattr(dict, '__or__'):
+        def __or__(self, other):
+            return dict.__or__(self.flatten(), other)
+
+        def __ror__(self, other):
+            return dict.__ror__(self.flatten(), other)
+
+        def __ior__(self, other):
+            self.update(other)
+            return self
+
+    def __reduce__(self):
+        state = dict(
+            (key, value) for key, value in self.__dict__.items()
+            if key not in ('parent', 'delta', '_stale', '_deleted', '_children', '_digests'))
+        state['own_sources'] = self.sources
+        base_class = self.__class__.__dict__.get('base_class')
+        if base_class is not None:
+            return make_layered, (base_class, dict(self.items())), state
+        return self.__class__, (None, dict(self.items())), state
+
+
+def freeze_value(value):
+    """Converts a value to its immutable counterpart: mappings to
+    :class:`FrozenConfig`, lists to tuples and sets to frozensets.
+    :class:`Lazy` values stay lazy, their results are frozen.
+
+    :param value: any value
+    :return: immutable value.
+    """
+    if isinstance(value, Lazy):
+        if value.evaluated:
+            return freeze_value(value.value)
+        return Lazy(lambda: freeze_value(value.get()))
+    if isinstance(value, FrozenConfig):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenConfig(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_value(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze_value(item) for item in value)
+    return value
+
+
+class FrozenConfig(Mapping):
+    """Read-only snapshot of a config.  Values are frozen recursively, so
+    the snapshot can be shared between threads and forked processes without
+    copying.  Keys are also available as attributes::
+
+        config = Config({'DEBUG': True}).freeze()
+        assert config.DEBUG is config['DEBUG']
+
+    Snapshot has no per-instance dictionary, items are kept in a single
+    dictionary and the hash is calculated only once.
+
+    :param mapping: a mapping or an iterable of ``(key, value)`` pairs
+    :param sources: files which the config was loaded from, taken from the
+                    mapping by default
+    """
+
+    __slots__ = ('_data', '_hash', '_fingerprint', 'sources', '__weakref__')
+
+    def __init__(self, mapping=(), sources=None):
+        items = get_raw_items(mapping) if isinstance(mapping, dict) else dict(mapping).items()
+        data = dict((key, freeze_value(value)) for key, value in items)
+        if sources is None:
+            sources = getattr(mapping, 'sources', frozenset())
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_hash', None)
+        object.__setattr__(self, '_fingerprint', None)
+        object.__setattr__(self, 'sources', frozenset(sources))
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if isinstance(value, Lazy):
+            return value.get()
+        return value
+
+    def __getattr__(self, name):
+        try:
+            value = self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+        if isinstance(value, Lazy):
+            return value.get()
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is read-only' % self.__class__.__name__)
+
+    __delattr__ = __setattr__
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        value = self._data.get(key, default)
+        if isinstance(value, Lazy):
+            return value.get()
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenConfig):
+            return self._data == other._data
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(frozenset(self._data.items())))
+        return self._hash
+
+    def __reduce__(self):
+        return self.__class__, (self._data, self.sources)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self._data)
+
+    def fingerprint(self):
+        """Returns a stable fingerprint of keys and values, it is computed
+        only once, see :meth:`Config.fingerprint`.
+
+        :return: hexadecimal string.
+        """
+        if self._fingerprint is None:
+            object.__setattr__(self, '_fingerprint', get_fingerprint(self._data.items()))
+        return self._fingerprint
+
+    def freeze(self):
+        """Returns the snapshot itself, it is already read-only."""
+        return self
+
+    def thaw(self):
+        """Returns a mutable :class:`Config` with the same items, nested
+        values stay frozen.
+        """
+        rv = Config(self._data)
+        rv.sources = self.sources
+        return rv
+
+
+#: Types of values which digests are cached for, values of other types can be changed in place.
+IMMUTABLE_TYPES = frozenset(
+    (type(None), bool, int, float, complex, bytes, str, FrozenConfig) + ((unicode, long) if PY2 else ()))
+
+INTEGER_TYPES = (int, long) if PY2 else (int,)
+
+DELETED_DIGEST = hashlib.sha1(b'x').digest()
+
+#: Marks keys which are missing in a config.
+MISSING = object()
+
+
+def encode_value(value):
+    """Encodes a value for hashing.  Items of containers are encoded as
+    their digests, so encodings of different values never collide.  Values
+    which are equal once frozen (lists and tuples, sets and frozensets,
+    mappings and frozen configs) have the same encoding.
+
+    :param value: any value
+    :return: bytes.
+    """
+    if isinstance(value, Lazy):
+        value = value.get()
+    value_type = type(value)
+    if value_type is bytes:
+        return b'b' + value
+    if isinstance(value, string_types):
+        return b's' + value.encode('utf-8', 'surrogatepass')
+    if value is None or value_type in (bool, float, complex):
+        return '{0}:{1!r}'.format(value_type.__name__, value).encode('utf-8')
+    if value_type in INTEGER_TYPES:
+        return 'int:{0}'.format(value).encode('utf-8')
+    if isinstance(value, (Config, FrozenConfig)):
+        return b'd' + value.fingerprint().encode('ascii')
+    if isinstance(value, Mapping):
+        return b'd' + get_fingerprint((key, value[key]) for key in value).encode('ascii')
+    if isinstance(value, (list, tuple)):
+        return b'l' + b''.join(get_value_digest(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return b'e' + b''.join(sorted(get_value_digest(item) for item in value))
+    return '{0}.{1}:{2!r}'.format(value_type.__module__, value_type.__name__, value).encode('utf-8')
+
+
+def get_value_digest(value):
+    """Returns the digest of a value, values of other types than builtin
+    ones and configs are hashed by their ``repr``.
+
+    :param value: any value
+    :return: bytes.
+    """
+    if value is DELETED:
+        return DELETED_DIGEST
+    return hashlib.sha1(encode_value(value)).digest()
+
+
+def get_fingerprint(items, cache=None):
+    """Returns a fingerprint of items, digests of items are combined with
+    XOR, so the fingerprint doesn't depend on the order of items.
+
+    :param items: iterable of ``(key, value)`` pairs
+    :param cache: dictionary of key to tuple of value and digest of the item,
+                  digests of immutable values are stored in it
+    :return: hexadecimal string.
+    """
+    if cache is None:
+        cache = {}
+    fingerprint = 0
+    for key, value in items:
+        fingerprint ^= get_item_digest(key, value, cache)
+    return '{0:040x}'.format(fingerprint)
+
+
+def get_item_digest(key, value, cache):
+    """Returns the digest of an item as integer.
+
+    :param key: the key
+    :param value: the raw value
+    :param cache: dictionary of key to tuple of value and digest of the item
+    :return: integer.
+    """
+    cached = cache.get(key)
+    if cached is not None and cached[0] is value:
+        return cached[1]
+    digest = int(binascii.hexlify(hashlib.sha1(get_value_digest(key) + get_value_digest(value)).digest()), 16)
+    if type(value) in IMMUTABLE_TYPES or value is DELETED:
+        cache[key] = (value, digest)
+    return digest
+
+
+def fingerprint(mapping):
+    """Returns a stable fingerprint of a config or any other mapping, see
+    :meth:`Config.fingerprint`.
+
+    :param mapping: config or mapping
+    :return: hexadecimal string.
+    """
+    if isinstance(mapping, (Config, FrozenConfig)):
+        return mapping.fingerprint()
+    return get_fingerprint((key, mapping[key]) for key in mapping)
+
+
+def get_raw_getter(mapping):
+    """Returns a function which returns values of the mapping without
+    computing :class:`Lazy` values.
+
+    :param mapping: config or any other mapping
+    :return: function which takes the key and default value.
+    """
+    if isinstance(mapping, FrozenConfig):
+        return mapping._data.get
+    if isinstance(mapping, LayeredConfig):
+        return mapping.lookup
+    if isinstance(mapping, dict):
+        return lambda key, default: dict.get(mapping, key, default)
+    return mapping.get
+
+
+def get_raw_items(mapping):
+    """Returns items of the dictionary without computing :class:`Lazy`
+    values, layered configs are flattened first.
+
+    :param mapping: config or any other dictionary
+    :return: items view.
+    """
+    if isinstance(mapping, LayeredConfig):
+        mapping = mapping.flatten()
+    return dict.items(mapping)
+
+
+def get_digest_cache(mapping):
+    if isinstance(mapping, Config):
+        cache = mapping.__dict__.get('_digests')
+        if cache is None:
+            cache = mapping.__dict__['_digests'] = {}
+        return cache
+    return {}
+
+
+def get_layer_fingerprint(layer):
+    if isinstance(layer, LayeredConfig):
+        return layer.layer_fingerprint()
+    return fingerprint(layer)
+
+
+def get_changed_layers(a, b):
+    """Returns layers of configs which differ.  Layers are compared from the
+    most distant parents, shared layers and layers with the same content are
+    skipped until the first difference.
+
+    :param a: config
+    :param b: config
+    :return: tuple of lists of layers of both configs.
+    """
+    layers_a = a.layers if isinstance(a, LayeredConfig) else [a]
+    layers_b = b.layers if isinstance(b, LayeredConfig) else [b]
+    while layers_a and layers_b:
+        layer_a, layer_b = layers_a[-1], layers_b[-1]
+        if layer_a is not layer_b:
+            if isinstance(layer_a, LayeredConfig) is not isinstance(layer_b, LayeredConfig):
+                break
+            if get_layer_fingerprint(layer_a) != get_layer_fingerprint(layer_b):
+                break
+        layers_a.pop()
+        layers_b.pop()
+    return layers_a, layers_b
+
+
+class Diff(namedtuple('Diff', ('added', 'removed', 'changed'))):
+    """Keys which are only in the second config, only in the first one and
+    keys which values are different.  Diff is false if configs are equal.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__
+
+
+def diff(a, b):
+    """Compares two configs.  Values are compared by their digests, see
+    :meth:`Config.fingerprint`, so values of different types are changed
+    even if they are equal, e.g. ``1`` and ``1.0``.  Layers of :class:`LayeredConfig` which both
+    configs share or which have the same content are skipped, so
+    environments which share most of their inheritance chain are compared
+    by their own layers only.
+
+    :param a: config or any other mapping
+    :param b: config or any other mapping
+    :return: :class:`Diff` with sorted lists of keys.
+    """
+    keys = set()
+    for layer in sum(get_changed_layers(a, b), []):
+        keys.update(layer.delta if isinstance(layer, LayeredConfig) else layer)
+
+    get_a, get_b = get_raw_getter(a), get_raw_getter(b)
+    cache_a, cache_b = get_digest_cache(a), get_digest_cache(b)
+    added, removed, changed = [], [], []
+    for key in keys:
+        value_a, value_b = get_a(key, MISSING), get_b(key, MISSING)
+        if value_a is DELETED:
+            value_a = MISSING
+        if value_b is DELETED:
+            value_b = MISSING
+        if value_a is MISSING:
+            if value_b is not MISSING:
+                added.append(key)
+        elif value_b is MISSING:
+            removed.append(key)
+        elif value_a is not value_b:
+            if get_item_digest(key, value_a, cache_a) != get_item_digest(key, value_b, cache_b):
+                changed.append(key)
+    return Diff(sorted(added), sorted(removed), sorted(changed))
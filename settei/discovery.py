@@ -0,0 +1,321 @@
+"""
+Entry point discovery backends.
+
+Backends are plain callables which take a group name and return a list of entry points. Every entry point has
+a ``name`` attribute and a ``load()`` method. Heavy modules (``importlib.metadata``, ``pkg_resources``) are
+imported only when the backend is called for the first time, so importing settei stays cheap.
+
+The ``index`` backend keeps all ``settings_*`` groups in a single file on disk, so cold starts read that file
+instead of scanning metadata of every installed distribution. The index is keyed by a fingerprint of distributions
+metadata found on ``sys.path`` and its modification times, so it is rebuilt automatically when packages are installed
+or removed. Entries of ``sys.path`` without metadata, like the directory of the script, don't change the fingerprint,
+so ``python script.py``, ``python -m`` and ``python -c`` launches of the same interpreter share the index.
+"""
+import errno
+import hashlib
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+
+#: Prefix of entry point groups which are stored in the index.
+GROUP_PREFIX = 'settings_'
+
+#: Version of the index file format.
+INDEX_VERSION = 1
+
+METADATA_SUFFIXES = ('.dist-info', '.egg-info', '.egg-link')
+
+
+class EntryPoint(object):
+    """Entry point restored from the index."""
+
+    def __init__(self, name, value, group):
+        self.name = name
+        self.value = value
+        self.group = group
+
+    def load(self):
+        """Import object which entry point refers to.
+
+        :return: imported object.
+        """
+        module_name, _, attrs = self.value.partition(':')
+        obj = importlib.import_module(module_name.strip())
+        attrs = attrs.split('[', 1)[0].strip()
+        for attr in attrs.split('.') if attrs else ():
+            obj = getattr(obj, attr)
+        return obj
+
+    def __eq__(self, other):
+        return (self.name, self.value, self.group) == (other.name, other.value, other.group)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<%s(%r, %r, %r)>' % (self.__class__.__name__, self.name, self.value, self.group)
+
+
+def importlib_metadata_backend(group):
+    """Discover entry points of the group using ``importlib.metadata``.
+
+    :param group: name of the entry points group
+    :return: list of entry points.
+    """
+    try:
+        from importlib import metadata
+    except ImportError:
+        import importlib_metadata as metadata
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, ()))
+
+
+def pkg_resources_backend(group):
+    """Discover entry points of the group using ``pkg_resources``.
+
+    :param group: name of the entry points group
+    :return: list of entry points.
+    """
+    import pkg_resources
+    return list(pkg_resources.iter_entry_points(group))
+
+
+def fingerprint(path=None):
+    """Calculate fingerprint of installed distributions.
+
+    Only directory listings and ``stat`` calls are made, no metadata files are read. Only distributions metadata and
+    archives on the path are fingerprinted, entries without them don't change the fingerprint.
+
+    :param path: list of paths, ``sys.path`` by default
+    :return: hex digest.
+    """
+    digest = hashlib.sha1()
+    seen = set()
+    for entry in sys.path if path is None else path:
+        entry = os.path.abspath(entry or os.curdir)
+        if entry in seen:
+            continue
+        seen.add(entry)
+        try:
+            names = os.listdir(entry)
+        except OSError:
+            try:
+                digest.update(repr((entry, os.stat(entry).st_mtime)).encode('utf-8'))
+            except OSError:
+                pass
+            continue
+        for name in sorted(names):
+            if name.endswith(METADATA_SUFFIXES):
+                try:
+                    mtime = os.stat(os.path.join(entry, name)).st_mtime
+                except OSError:
+                    continue
+                digest.update(repr((entry, name, mtime)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def normalize_name(name):
+    """Normalize name of distribution, see PEP 503.
+
+    :param name: name of distribution
+    :return: normalized name.
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def scan_groups(prefix=GROUP_PREFIX):
+    """Scan all installed distributions for entry point groups with given prefix.
+
+    Duplicated entry points of different distributions are kept, so they are still detected by the ConfigGenerator.
+    Distributions which are shadowed by the distribution with the same name earlier on ``sys.path`` are skipped,
+    like ``importlib.metadata.entry_points`` and ``pkg_resources`` do.
+
+    :param prefix: prefix of entry point groups
+    :return: dictionary of group name to list of ``[name, value]`` pairs.
+    """
+    groups = {}
+    try:
+        try:
+            from importlib import metadata
+        except ImportError:
+            import importlib_metadata as metadata
+    except ImportError:
+        import pkg_resources
+        for distribution in pkg_resources.working_set:
+            for group, entry_points in distribution.get_entry_map().items():
+                if group.startswith(prefix):
+                    groups.setdefault(group, []).extend(
+                        [entry_point.name, str(entry_point).split('=', 1)[1].strip()]
+                        for entry_point in entry_points.values()
+                    )
+        return groups
+
+    seen = set()
+    for distribution in metadata.distributions():
+        name = normalize_name(distribution.metadata['Name'] or '')
+        if name in seen:
+            continue
+        seen.add(name)
+        for entry_point in distribution.entry_points:
+            if entry_point.group.startswith(prefix):
+                groups.setdefault(entry_point.group, []).append([entry_point.name, entry_point.value])
+    return groups
+
+
+def default_index_path():
+    """Get path of the index file.
+
+    ``SETTEI_INDEX_PATH`` environment variable has priority, otherwise the file is stored in the user cache
+    directory, one file per interpreter.
+
+    :return: path to the index file.
+    """
+    path = os.environ.get('SETTEI_INDEX_PATH')
+    if path:
+        return path
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    interpreter = hashlib.sha1(repr((sys.prefix, sys.executable)).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_home, 'settei', 'entry-points-{0}.json'.format(interpreter))
+
+
+def read_index(path):
+    """Read the index file.
+
+    :param path: path to the index file
+    :return: index dictionary or `None` if file is missing or broken.
+    """
+    try:
+        with open(path) as index_file:
+            index = json.load(index_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return None
+    return index
+
+
+def write_index(path, index):
+    """Atomically write the index file. Failures are ignored, index is just a cache.
+
+    :param path: path to the index file
+    :param index: index dictionary
+    """
+    directory = os.path.dirname(path) or os.curdir
+    try:
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.settei-')
+        with os.fdopen(fd, 'w') as index_file:
+            json.dump(index, index_file)
+        if hasattr(os, 'replace'):
+            os.replace(temp_path, path)
+        else:
+            os.rename(temp_path, path)
+    except (IOError, OSError):
+        pass
+
+
+def get_index(path=None):
+    """Get index of ``settings_*`` groups, rebuild it if installed distributions were changed.
+
+    :param path: path to the index file, `default_index_path` by default
+    :return: index dictionary.
+    """
+    path = path or default_index_path()
+    current = fingerprint()
+    index = read_index(path)
+    if index is None or index.get('fingerprint') != current:
+        index = {'version': INDEX_VERSION, 'fingerprint': current, 'groups': scan_groups()}
+        write_index(path, index)
+    return index
+
+
+def index_backend(group):
+    """Discover entry points of the group using the on-disk index.
+
+    Groups without ``settings_`` prefix are not indexed and are discovered from distributions metadata.
+
+    :param group: name of the entry points group
+    :return: list of entry points.
+    """
+    if not group.startswith(GROUP_PREFIX):
+        return metadata_backend()(group)
+    return [EntryPoint(name, value, group) for name, value in get_index()['groups'].get(group, ())]
+
+
+backends = {
+    'importlib': importlib_metadata_backend,
+    'pkg_resources': pkg_resources_backend,
+    'index': index_backend,
+}
+
+_backend = None
+
+
+def metadata_backend():
+    """Choose backend which reads metadata of installed distributions directly.
+
+    :return: ``importlib.metadata`` backend when it is available, ``pkg_resources`` backend otherwise.
+    """
+    try:
+        from importlib import metadata  # noqa
+    except ImportError:
+        try:
+            import importlib_metadata  # noqa
+        except ImportError:
+            return pkg_resources_backend
+    return importlib_metadata_backend
+
+
+def default_backend():
+    """Choose backend which is used if nothing was set explicitly.
+
+    The ``SETTEI_DISCOVERY_BACKEND`` environment variable has priority, otherwise ``importlib.metadata`` is used
+    when it is available and ``pkg_resources`` is the fallback.
+
+    :return: backend callable.
+    """
+    name = os.environ.get('SETTEI_DISCOVERY_BACKEND')
+    if name:
+        return backends[name]
+    return metadata_backend()
+
+
+def get_backend():
+    """Get current discovery backend.
+
+    :return: backend callable.
+    """
+    global _backend
+    if _backend is None:
+        _backend = default_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Set discovery backend.
+
+    :param backend: name of registered backend, callable or `None` to restore the default one.
+    """
+    global _backend
+    if backend is not None and not callable(backend):
+        backend = backends[backend]
+    _backend = backend
+
+
+def iter_entry_points(group):
+    """Get entry points of the group using current backend.
+
+    :param group: name of the entry points group
+    :return: list of entry points.
+    """
+    return get_backend()(group)
@@ -0,0 +1,271 @@
+"""
+Resolution of configs in subprocesses.
+
+Entry points which import heavy modules (ORMs, SDKs of cloud providers) to build a dictionary make every process that
+builds the config carry these modules. With this module configs are built in a pool of processes and only plain data
+gets back: dictionaries, lists, tuples, sets, strings, bytes, numbers, booleans and `None`. Modules which entry points
+import stay in the pool, configs of many applications and environments are built in parallel.
+
+.. code-block:: python
+
+    from settei import isolation
+
+    config = isolation.get_config('frontoffice', 'live')
+    configs = isolation.get_configs([('frontoffice', 'live'), ('backoffice', 'live')])
+
+Built configs are put into the storage, so :func:`settei.get_config` returns them without building. Processes of the
+pool keep configs they built until configs of the storage are invalidated, expired or reloaded, hot reload rebuilds
+configs which were built in the pool there and reloads modules of changed files in processes of the pool.
+"""
+import marshal
+import multiprocessing
+import threading
+import weakref
+
+from . import config, config_storage, get_environment, tracing
+
+#: Pool of processes, it is created when it is needed for the first time.
+executor = None
+
+#: Builds which are submitted to the pool per key and generation of the storage, threads which need the same config
+#: wait for a single build.
+pending = {}
+
+#: Configs which were built in the pool per key.
+isolated = weakref.WeakValueDictionary()
+
+#: Files which were changed since the pool was created, processes of the pool reload modules of these files when they
+#: see a new generation of the storage.
+changed_sources = frozenset()
+
+#: Generation of the storage which configs of this process were built for, it is used in processes of the pool.
+built_generation = None
+
+lock = threading.Lock()
+
+
+class NotPlainData(Exception):
+    """Raises if config has a value which can't be passed back from the subprocess."""
+    message = "Value of {0!r} key of {1!r} environment of {2!r} application is not plain data: {3}."
+
+    def __init__(self, application, environment, key, type_name):
+        Exception.__init__(self, application, environment, key, type_name)
+        self.application = application
+        self.environment = environment
+        self.key = key
+        self.type_name = type_name
+
+    def __str__(self):
+        if config.PY2:
+            return unicode(self).encode('utf-8')
+        return self.__unicode__()
+
+    def __unicode__(self):
+        return self.message.format(self.key, self.environment, self.application, self.type_name)
+
+
+def to_plain(value):
+    """Convert configs and other mappings to dictionaries and compute :class:`settei.config.Lazy` values.
+
+    :param value: any value
+    :return: value which consists of builtin types.
+    """
+    if isinstance(value, config.Lazy):
+        value = value.get()
+    value_type = type(value)
+    if value_type in (list, tuple, set, frozenset):
+        return value_type(to_plain(item) for item in value)
+    if isinstance(value, config.Mapping):
+        return dict((key, to_plain(value[key])) for key in value)
+    return value
+
+
+def build(application, environment, generation=None, changed=frozenset()):
+    """Build config, it is called in the subprocess. Configs which the subprocess built for another generation of the
+    storage are dropped first and modules of changed files are reloaded, so configs which are built again after
+    :meth:`settei.ConfigStorage.invalidate` or hot reload are not stale.
+
+    :param application: group of entry points
+    :param environment: name of entry point
+    :param generation: :attr:`settei.ConfigStorage.generation` of the storage of the parent process
+    :param changed: files which were changed, modules loaded from them are reloaded when the generation is new
+
+    :return: tuple of marshalled values and list of files which the config was built from.
+    """
+    global built_generation
+    if generation != built_generation:
+        if built_generation is not None and changed:
+            from .reload import reload_modules
+            reload_modules(changed)
+        config_storage.clear()
+        built_generation = generation
+    config_instance = config_storage.__getitem__(application, environment)
+    values = dict((key, to_plain(config_instance[key])) for key in config_instance)
+    try:
+        data = marshal.dumps(values)
+    except ValueError:
+        for key in sorted(values):
+            try:
+                marshal.dumps(values[key])
+            except ValueError:
+                raise NotPlainData(application, environment, key, type(config_instance[key]).__name__)
+        raise
+    return data, sorted(config_instance.sources)
+
+
+def get_executor(processes=None, context=None):
+    """Get pool of processes, it is created on the first call.
+
+    :param processes: number of processes, number of CPUs by default
+    :param context: name of :mod:`multiprocessing` start method, e.g. ``spawn`` for processes which don't inherit
+                    modules of the parent process, default method of the platform is used if not specified
+
+    :return: :class:`concurrent.futures.ProcessPoolExecutor`.
+    """
+    global executor
+    with lock:
+        if executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            kwargs = {}
+            if context is not None:
+                kwargs['mp_context'] = multiprocessing.get_context(context)
+            executor = ProcessPoolExecutor(processes, **kwargs)
+        return executor
+
+
+def shutdown():
+    """Stop processes of the pool, a new pool is created when it is needed again."""
+    global executor
+    global changed_sources
+    with lock:
+        pool, executor = executor, None
+        pending.clear()
+        changed_sources = frozenset()
+    if pool is not None:
+        pool.shutdown()
+
+
+def submit(key):
+    """Submit build of the config to the pool unless it is already submitted for the current generation of the
+    storage.
+
+    :param key: tuple of application and environment
+    :return: future of the result of :func:`build`.
+    """
+    pool = get_executor()
+    with lock:
+        pending_key = (key, config_storage.generation)
+        future = pending.get(pending_key)
+        if future is None:
+            future = pending[pending_key] = pool.submit(build, key[0], key[1], pending_key[1], changed_sources)
+            future.add_done_callback(lambda future: forget(pending_key, future))
+        return future
+
+
+def forget(key, future):
+    with lock:
+        if pending.get(key) is future:
+            del pending[key]
+
+
+def resubmit(keys, paths):
+    """Submit builds of configs after files were changed, it is used by :class:`settei.reload.Reloader`.
+
+    :param keys: tuples of application and environment
+    :param paths: absolute paths of changed files
+
+    :return: dictionary of key to future of the result of :func:`build`.
+    """
+    global changed_sources
+    with lock:
+        changed_sources = changed_sources.union(paths)
+    with config_storage.lock:
+        config_storage.generation += 1
+    return dict((key, submit(key)) for key in keys)
+
+
+def is_isolated(key):
+    """Check whether the config in the storage was built in the pool.
+
+    :param key: tuple of application and environment
+    :return: boolean.
+    """
+    config_instance = isolated.get(key)
+    return config_instance is not None and dict.get(config_storage, key) is config_instance
+
+
+def create(key, result):
+    """Create config from the result of the build.
+
+    :param key: tuple of application and environment
+    :param result: result of :func:`build`
+
+    :return: :class:`settei.config.Config`.
+    """
+    data, sources = result
+    config_instance = config.Config(marshal.loads(data))
+    config_instance.sources = frozenset(sources)
+    config_instance.environment = key[1]
+    return config_instance
+
+
+def load(key, result, freeze=False):
+    """Create config from the result of the build and put it into the storage.
+
+    :param key: tuple of application and environment
+    :param result: result of :func:`build`
+    :param freeze: put :class:`settei.config.FrozenConfig` into the storage
+
+    :return: config from the storage.
+    """
+    config_instance = create(key, result)
+    if freeze:
+        config_instance = config_instance.freeze()
+    stored = config_storage.setdefault(key, config_instance)
+    if stored is config_instance:
+        isolated[key] = stored
+    return stored
+
+
+def get_config(application, environment=None, freeze=False):
+    """Get config for specific application and environment, it is built in the pool of processes.
+
+    :param application: group of entry points
+    :param environment: name of entry point from which you want to get config
+    :param freeze: put :class:`settei.config.FrozenConfig` into the storage
+
+    :return: config which consists of plain data."""
+    key = (application, get_environment(environment))
+    config_instance = config_storage.lookup(key)
+    if config_instance is not None:
+        return config_instance
+    start = tracing.clock()
+    result = submit(key).result()
+    config_storage.record_build(tracing.clock() - start)
+    return load(key, result, freeze)
+
+
+def get_configs(keys, freeze=False):
+    """Get configs of several applications and environments, they are built in parallel in the pool of processes.
+
+    :param keys: iterable of ``(application, environment)`` tuples
+    :param freeze: put :class:`settei.config.FrozenConfig` into the storage
+
+    :return: dictionary of ``(application, environment)`` to config."""
+    configs = {}
+    futures = {}
+    for key in keys:
+        key = tuple(key)
+        if key in configs or key in futures:
+            continue
+        config_instance = config_storage.lookup(key)
+        if config_instance is not None:
+            configs[key] = config_instance
+        else:
+            futures[key] = submit(key)
+    start = tracing.clock()
+    results = dict((key, future.result()) for key, future in futures.items())
+    config_storage.record_build(tracing.clock() - start, len(results))
+    for key, result in results.items():
+        configs[key] = load(key, result, freeze)
+    return configs
@@ -0,0 +1,176 @@
+"""
+Parsers of structured data files which are used by :class:`settei.config.Config` loaders.
+
+Every parser takes a file opened in binary mode and returns a mapping or an iterable of ``(key, value)`` pairs.
+Parsers of optional formats import their libraries only when they are called.
+"""
+import codecs
+import json
+import re
+
+try:
+    import configparser
+except ImportError:
+    import ConfigParser as configparser
+
+#: Size of chunks in which JSON documents are read when they are streamed.
+JSON_CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_CHARACTERS = re.compile(r'[0-9.eE+-]*')
+
+
+class JSONObjectReader(object):
+    """Reads items of top level JSON object one by one, so the whole document is never kept in memory.
+
+    Only the text of the item which is being decoded is buffered, every value is decoded with the standard
+    :class:`json.JSONDecoder`.
+    """
+
+    def __init__(self, json_file, chunk_size=None):
+        self.file = json_file
+        self.chunk_size = chunk_size or JSON_CHUNK_SIZE
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = u''
+        self.pos = 0
+
+    def read(self):
+        """Read next chunk of the file into the buffer.
+
+        Chunks grow together with the value which is being decoded, so long values are decoded in linear time.
+
+        :return: `False` if the end of file is reached.
+        """
+        data = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if self.pos:
+            self.buffer, self.pos = self.buffer[self.pos:], 0
+        self.buffer += self.text_decoder.decode(data, final=not data)
+        return bool(data)
+
+    def skip_whitespace(self):
+        """Move position to the next significant character."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.read():
+                return
+
+    def expect(self, characters):
+        """Consume next significant character.
+
+        :param characters: allowed characters
+        :return: consumed character.
+        """
+        self.skip_whitespace()
+        character = self.buffer[self.pos:self.pos + 1]
+        if not character or character not in characters:
+            raise ValueError('Expecting one of {0!r}: {1!r}'.format(characters, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+        return character
+
+    def decode(self):
+        """Decode next JSON value, more chunks are read until the value is complete.
+
+        :return: decoded value.
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self.read():
+                    raise
+                continue
+            # a number at the end of the buffer can continue in the next chunk
+            if NUMBER_CHARACTERS.match(self.buffer, end).end() == len(self.buffer) and self.read():
+                continue
+            self.pos = end
+            return value
+
+    def expect_end(self):
+        """Check that only whitespace follows the object."""
+        self.skip_whitespace()
+        if self.pos < len(self.buffer):
+            raise ValueError('Extra data: {0!r}'.format(self.buffer[self.pos:self.pos + 20]))
+
+    def __iter__(self):
+        self.expect('{')
+        self.skip_whitespace()
+        if self.buffer[self.pos:self.pos + 1] == '}':
+            self.pos += 1
+            self.expect_end()
+            return
+        while True:
+            key = self.decode()
+            if not isinstance(key, type(u'')):
+                raise ValueError('Expecting property name: {0!r}'.format(key))
+            self.expect(':')
+            yield key, self.decode()
+            if self.expect(',}') == '}':
+                self.expect_end()
+                return
+
+
+def load_json(json_file):
+    """Parse JSON document.
+
+    :param json_file: file opened in binary mode
+    :return: decoded document.
+    """
+    return json.loads(json_file.read().decode('utf-8'))
+
+
+def iter_json(json_file):
+    """Parse JSON object item by item.
+
+    :param json_file: file opened in binary mode
+    :return: iterator of ``(key, value)`` pairs.
+    """
+    return iter(JSONObjectReader(json_file))
+
+
+def load_toml(toml_file):
+    """Parse TOML document with ``tomllib``, ``tomli`` or ``toml`` library.
+
+    :param toml_file: file opened in binary mode
+    :return: decoded document.
+    """
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            import toml
+            return toml.loads(toml_file.read().decode('utf-8'))
+    return tomllib.load(toml_file)
+
+
+def load_yaml(yaml_file):
+    """Parse YAML document with ``PyYAML`` library, its C loader is used if it is available.
+
+    :param yaml_file: file opened in binary mode
+    :return: decoded document.
+    """
+    import yaml
+    return yaml.load(yaml_file, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+def load_ini(ini_file, section=None):
+    """Parse INI file. Names of options keep their case and values are not interpolated.
+
+    :param ini_file: file opened in binary mode
+    :param section: name of section, default section is used if not specified
+    :return: dictionary of options of the section.
+    """
+    parser = configparser.RawConfigParser()
+    parser.optionxform = str
+    text = ini_file.read().decode('utf-8')
+    if hasattr(parser, 'read_string'):
+        parser.read_string(text)
+    else:
+        import io
+        parser.readfp(io.StringIO(text))
+    if section is None:
+        return parser.defaults()
+    return dict(parser.items(section))
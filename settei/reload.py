@@ -0,0 +1,277 @@
+"""
+Hot reload of configs.
+
+Every config remembers files it was built from (files loaded with ``Config.from_*`` methods and modules of entry
+points). :class:`Reloader` watches these files, with inotify where it is available and by polling modification
+times otherwise, and rebuilds only configs which were built from changed files. Rebuilt configs replace old ones
+in the storage one by one, readers get either the old config or the completely built new one.
+
+.. code-block:: python
+
+    import settei.reload
+
+    settei.reload.watch()
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+from . import ConfigGenerator, config_storage
+from .config import FrozenConfig
+
+try:
+    from importlib import reload
+except ImportError:  # Python 2 has builtin reload
+    pass
+
+logger = logging.getLogger(__name__)
+
+
+class PollingWatcher(object):
+    """Detects changes of files by polling their modification times."""
+
+    def __init__(self):
+        self.mtimes = {}
+
+    @staticmethod
+    def get_mtime(path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def wait(self, paths, timeout, stopped):
+        """Wait for changes of files. Files which are seen for the first time are not reported as changed.
+
+        :param paths: set of absolute paths of files
+        :param timeout: time to wait in seconds
+        :param stopped: event which interrupts waiting
+        :return: set of changed paths.
+        """
+        for path in paths:
+            if path not in self.mtimes:
+                self.mtimes[path] = self.get_mtime(path)
+        stopped.wait(timeout)
+
+        changed = set()
+        for path in paths:
+            mtime = self.get_mtime(path)
+            if mtime != self.mtimes[path]:
+                self.mtimes[path] = mtime
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """Detects changes of files with Linux inotify. Directories of files are watched, so files which are replaced
+    by editors or deployment tools are detected too."""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = os.O_NONBLOCK
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = {}
+
+    @classmethod
+    def available(cls):
+        """Check if inotify is supported by the platform."""
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            cls().close()
+        except (OSError, AttributeError):
+            return False
+        return True
+
+    def watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, directory.encode(sys.getfilesystemencoding()), self.MASK)
+        if wd >= 0:
+            self.directories[wd] = directory
+
+    def wait(self, paths, timeout, stopped):
+        """Wait for changes of files.
+
+        :param paths: set of absolute paths of files
+        :param timeout: time to wait in seconds
+        :param stopped: event which interrupts waiting, it is checked at least once per `timeout`
+        :return: set of changed paths.
+        """
+        watched = set(self.directories.values())
+        for directory in set(os.path.dirname(path) for path in paths) - watched:
+            self.watch(directory)
+
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return changed
+            raise
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+            offset += length
+            if wd in self.directories:
+                changed.add(os.path.join(self.directories[wd], name))
+        return changed & set(paths)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Reloader(object):
+    """Watches files which configs were built from and rebuilds configs when files are changed.
+
+    :param storage: storage of configs, global ``settei.config_storage`` by default
+    :param interval: how often files are checked in seconds
+    :param watcher: watcher of files, inotify is used if it is available and polling otherwise
+    """
+
+    def __init__(self, storage=None, interval=1.0, watcher=None):
+        self.storage = config_storage if storage is None else storage
+        self.interval = interval
+        self.watcher = watcher
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def get_sources(self):
+        """Get files which configs in the storage were built from.
+
+        :return: set of absolute paths.
+        """
+        sources = set()
+        for config in list(self.storage.values()):
+            sources.update(config.sources)
+        return sources
+
+    def reload_modules(self, paths):
+        """Reload modules which are loaded from changed files, see :func:`reload_modules`."""
+        reload_modules(paths)
+
+    def reload(self, paths):
+        """Rebuild configs which were built from changed files together with environments which inherit them.
+
+        Configs which can't be rebuilt are kept and the error is logged. Frozen configs are replaced with frozen
+        ones. Configs which were built with :mod:`settei.isolation` are rebuilt in its pool of processes.
+
+        :param paths: changed files
+        :return: list of ``(application, environment)`` keys of rebuilt configs.
+        """
+        paths = set(os.path.abspath(path) for path in paths)
+        self.reload_modules(paths)
+
+        keys = [key for key, config in list(self.storage.items()) if config.sources & paths]
+        # configs built in the pool of processes are rebuilt there, so their heavy modules are not imported here
+        isolation = sys.modules.get('settei.isolation')
+        isolated = set()
+        if isolation is not None and self.storage is isolation.config_storage:
+            isolated = set(key for key in keys if isolation.is_isolated(key))
+        futures = isolation.resubmit(isolated, paths) if isolated else {}
+        resolved = {}
+        for application, nodes in list(self.storage.resolved.items()):
+            fresh = dict((name, config) for name, config in list(nodes.items()) if not config.sources & paths)
+            if len(fresh) != len(nodes):
+                resolved[application] = fresh
+        for application, environment in keys:
+            if (application, environment) not in isolated:
+                resolved.setdefault(application, self.storage.resolved.setdefault(application, {}))
+
+        rebuilt = []
+        for key in keys:
+            application, environment = key
+            try:
+                if key in isolated:
+                    config = isolation.create(key, futures[key].result())
+                else:
+                    config = ConfigGenerator(application, environment, resolved[application]).get_config()
+                if isinstance(dict.get(self.storage, key), FrozenConfig):
+                    config = config.freeze()
+            except Exception:
+                logger.exception(
+                    'Unable to reload config of %r environment of %r application', environment, application)
+                continue
+            self.storage[key] = config
+            if key in isolated:
+                isolation.isolated[key] = config
+            rebuilt.append(key)
+
+        self.storage.resolved.update(resolved)
+        return rebuilt
+
+    def run(self):
+        """Watch files until the reloader is stopped."""
+        while not self.stopped.is_set():
+            changed = self.watcher.wait(self.get_sources(), self.interval, self.stopped)
+            if changed and not self.stopped.is_set():
+                try:
+                    self.reload(changed)
+                except Exception:
+                    logger.exception('Unable to reload configs')
+
+    def start(self):
+        """Start watching files in a daemon thread."""
+        if self.watcher is None:
+            self.watcher = InotifyWatcher() if InotifyWatcher.available() else PollingWatcher()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='settei-reloader')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching files."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+
+def reload_modules(paths):
+    """Reload modules which are loaded from changed files. Modules which can't be reloaded are kept and the error is
+    logged.
+
+    :param paths: absolute paths of changed files
+    """
+    for module in list(sys.modules.values()):
+        filename = getattr(module, '__file__', None)
+        if filename and os.path.abspath(filename) in paths:
+            try:
+                reload(module)
+            except Exception:
+                logger.exception('Unable to reload %r module', module.__name__)
+
+
+def watch(interval=1.0):
+    """Start reloading configs of the global storage when files they were built from are changed.
+
+    :param interval: how often files are checked in seconds
+    :return: started :class:`Reloader`.
+    """
+    return Reloader(interval=interval).start()
@@ -0,0 +1,322 @@
+"""
+Validation of configs.
+
+Schema describes keys of a config and their values. It is compiled only once into a validator function per key,
+types are checked by exact type first and with ``isinstance`` only if it doesn't match. Schema can be declared for
+the whole application, it validates configs of requested environments, or for a single entry point, it validates
+the config which the entry point returns:
+
+.. code-block:: python
+
+    from settei import schema
+
+    schema.register('frontoffice', {
+        'DEBUG': bool,
+        'WORKERS': schema.Field(int, check=lambda value: value > 0),
+        'LOG_LEVEL': schema.Field(str, choices=('DEBUG', 'INFO', 'WARNING')),
+        'SENTRY_DSN': schema.Field(str, required=False),
+        'DATABASES': {'default': {'HOST': str, 'PORT': int}},
+    })
+
+    @schema.validates({'SECRET_KEY': str})
+    def live(default):
+        ...
+
+Results of validation of :class:`settei.config.FrozenConfig` are cached, frozen configs can't be changed, so every
+one of them is validated by every schema only once.
+"""
+import threading
+import weakref
+
+from . import config
+
+#: Schemas of applications.
+schemas = {}
+
+#: Compiled checks of types, configs have many keys of the same types, so they share the checks.
+type_checks = {}
+
+MISSING = object()
+
+
+class ValidationError(Exception):
+    """Raises if config doesn't match the schema."""
+    message = "Config{0} doesn't match the schema: {1}."
+
+    def __init__(self, errors, environment=None):
+        Exception.__init__(self, errors, environment)
+        self.errors = errors
+        self.environment = environment
+
+    def __str__(self):
+        if config.PY2:
+            return unicode(self).encode('utf-8')
+        return self.__unicode__()
+
+    def __unicode__(self):
+        return self.message.format(
+            '' if self.environment is None else ' of {0!r} environment'.format(self.environment),
+            '; '.join('{0} {1}'.format(key, error) for key, error in self.errors))
+
+
+class Field(object):
+    """Description of a value.
+
+    :param types: type or tuple of types of the value, `bool` values are not accepted as `int` unless `bool` is
+                  listed too; dictionary or :class:`Schema` for nested mappings; any value is accepted if not
+                  specified
+    :param required: key should be in the config
+    :param choices: allowed values
+    :param check: function which takes the value and returns `False` or raises `ValueError` if it is wrong
+    """
+
+    def __init__(self, types=None, required=True, choices=None, check=None):
+        self.types = types
+        self.required = required
+        self.choices = choices
+        self.check = check
+
+
+def get_type_name(types):
+    return ' or '.join(value_type.__name__ for value_type in types)
+
+
+def compile_types(types):
+    """Compile check of types of the value, checks are shared by all schemas.
+
+    :param types: tuple of types
+    :return: function which takes the value and returns the error or `None`.
+    """
+    try:
+        return type_checks[types]
+    except KeyError:
+        pass
+    exact = frozenset(types)
+    strict = int in exact and bool not in exact
+    expected = 'should be {0}, got '.format(get_type_name(types))
+
+    def check_types(value):
+        value_type = type(value)
+        if value_type in exact:
+            return None
+        if isinstance(value, types) and not (strict and value_type is bool):
+            return None
+        return expected + value_type.__name__
+    return type_checks.setdefault(types, check_types)
+
+
+def compile_choices(choices):
+    """Compile check of allowed values.
+
+    :param choices: allowed values
+    :return: function which takes the value and returns the error or `None`.
+    """
+    try:
+        choices = frozenset(choices)
+    except TypeError:
+        choices = tuple(choices)
+    expected = 'should be one of {0}, got '.format(', '.join(repr(choice) for choice in sorted(choices, key=repr)))
+
+    def check_choices(value):
+        try:
+            if value in choices:
+                return None
+        except TypeError:
+            pass
+        return expected + repr(value)
+    return check_choices
+
+
+def compile_check(check):
+    """Compile custom check of the value.
+
+    :param check: function which takes the value and returns `False` or raises `ValueError` if it is wrong
+    :return: function which takes the value and returns the error or `None`.
+    """
+    name = getattr(check, '__name__', repr(check))
+    failed = 'failed {0} check'.format(name)
+
+    def check_value(value):
+        try:
+            if check(value) is False:
+                return failed
+        except ValueError as e:
+            return '{0}: {1}'.format(failed, e)
+        return None
+    return check_value
+
+
+def compile_field(field):
+    """Compile validator of the value.
+
+    :param field: :class:`Field`, type, tuple of types, dictionary or :class:`Schema`
+    :return: tuple of required flag and function which takes the value, its path and list of errors and appends
+             errors of the value to the list.
+    """
+    if not isinstance(field, Field):
+        field = Field(field)
+    nested = None
+    types = field.types
+    if isinstance(types, dict):
+        types = Schema(types)
+    if isinstance(types, Schema):
+        nested, types = types, (config.Mapping,)
+    elif isinstance(types, type):
+        types = (types,)
+
+    checks = []
+    if types is not None:
+        checks.append(compile_types(tuple(types)))
+    if field.choices is not None:
+        checks.append(compile_choices(field.choices))
+    if field.check is not None:
+        checks.append(compile_check(field.check))
+
+    if nested is not None:
+        check_types = checks[0]
+
+        def validate(value, path, errors):
+            error = check_types(value)
+            if error is not None:
+                errors.append((path, error))
+                return
+            prefix = path + '.'
+            errors.extend((prefix + key, error) for key, error in nested.get_errors(value))
+    elif not checks:
+        validate = None
+    elif len(checks) == 1:
+        check = checks[0]
+
+        def validate(value, path, errors):
+            error = check(value)
+            if error is not None:
+                errors.append((path, error))
+    else:
+        def validate(value, path, errors):
+            for check in checks:
+                error = check(value)
+                if error is not None:
+                    errors.append((path, error))
+                    return
+    return field.required, validate
+
+
+class Schema(object):
+    """Compiled schema of a config. Keys which are not described are not validated.
+
+    Values which are :class:`settei.config.Lazy` and aren't computed yet are not validated, so validation doesn't
+    compute them.
+
+    :param fields: dictionary of key to :class:`Field`, type, tuple of types or dictionary of the nested schema
+    """
+
+    def __init__(self, fields):
+        self.validators = []
+        for key in sorted(fields):
+            required, validate = compile_field(fields[key])
+            if validate is not None or required:
+                self.validators.append((key, required, validate))
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def get_errors(self, mapping):
+        """Validate the mapping, results are cached for frozen configs.
+
+        :param mapping: config or any other mapping
+        :return: list of ``(key, error)`` tuples, keys of nested mappings are joined with dots.
+        """
+        if type(mapping) is not config.FrozenConfig:
+            return self.validate_mapping(mapping)
+
+        key = id(mapping)
+        cached = self.results.get(key)
+        if cached is not None and cached[0]() is mapping:
+            return cached[1]
+        errors = self.validate_mapping(mapping)
+        results = self.results
+
+        def forget(ref):
+            with self.lock:
+                if results.get(key, (None,))[0] is ref:
+                    del results[key]
+        with self.lock:
+            results[key] = (weakref.ref(mapping, forget), errors)
+        return errors
+
+    def validate_mapping(self, mapping):
+        get = config.get_raw_getter(mapping)
+        errors = []
+        for key, required, validate in self.validators:
+            value = get(key, MISSING)
+            if value is MISSING:
+                if required:
+                    errors.append((key, 'is required'))
+                continue
+            if validate is None:
+                continue
+            if type(value) is config.Lazy:
+                if not value.evaluated:
+                    continue
+                value = value.value
+            validate(value, key, errors)
+        return errors
+
+    def validate(self, mapping, environment=None):
+        """Validate the mapping.
+
+        :param mapping: config or any other mapping
+        :param environment: name of entry point which built the config, it is used in the error
+        :return: the mapping itself.
+        """
+        errors = self.get_errors(mapping)
+        if errors:
+            raise ValidationError(errors, environment if environment is not None else getattr(
+                mapping, 'environment', None))
+        return mapping
+
+
+def compile_schema(fields):
+    """Compile schema unless it is already compiled.
+
+    :param fields: dictionary of fields or :class:`Schema`
+    :return: :class:`Schema`.
+    """
+    return fields if isinstance(fields, Schema) else Schema(fields)
+
+
+def register(application, fields):
+    """Declare schema of every config of the application.
+
+    :param application: group of entry points
+    :param fields: dictionary of fields or :class:`Schema`, `None` removes the schema
+    :return: :class:`Schema`.
+    """
+    if fields is None:
+        schemas.pop(application, None)
+        return None
+    compiled = schemas[application] = compile_schema(fields)
+    return compiled
+
+
+def validates(fields):
+    """Decorator of entry point which declares schema of its config.
+
+    :param fields: dictionary of fields or :class:`Schema`
+    :return: decorator.
+    """
+    compiled = compile_schema(fields)
+
+    def decorator(function):
+        function.settei_schema = compiled
+        return function
+    return decorator
+
+
+def validate(config_instance, fields):
+    """Validate the config.
+
+    :param config_instance: config or any other mapping
+    :param fields: dictionary of fields or :class:`Schema`, compile it once to validate many configs
+    :return: the config itself.
+    """
+    return compile_schema(fields).validate(config_instance)
@@ -0,0 +1,268 @@
+"""
+Snapshots of resolved configs.
+
+Snapshot is a binary file with a resolved config, so production processes can load it without entry points
+discovery, imports and execution of config files. Values are stored with :mod:`marshal`, values which marshal can't
+store are tagged and pickled.
+
+Snapshot keeps a fingerprint of installed distributions and of files which the config was built from, stale
+snapshot is rejected. Only distributions metadata is fingerprinted, not ``sys.path`` itself, so the snapshot is valid
+for script, ``-m`` and ``-c`` launches alike.
+
+Usage::
+
+    python -m settei.snapshot export frontoffice live /var/lib/frontoffice/settings.snapshot
+    python -m settei.snapshot show /var/lib/frontoffice/settings.snapshot
+"""
+import argparse
+import marshal
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+
+from . import ConfigGenerator, config, discovery
+
+MAGIC = b'SETTEI-SNAPSHOT\n'
+VERSION = 1
+HEADER_LENGTH = struct.Struct('<I')
+
+#: First item of tuples which are used for tagged values.
+TAG = '\0settei'
+
+MARSHAL_TYPES = (type(None), bool, int, float, complex, bytes, str) + ((unicode, long) if config.PY2 else ())
+
+
+class StaleSnapshot(Exception):
+    """Raises if snapshot is stale or doesn't belong to the application and environment."""
+    message = "Snapshot {0!r} can't be used: {1}."
+
+    def __init__(self, path, reason):
+        Exception.__init__(self, path, reason)
+        self.path = path
+        self.reason = reason
+
+    def __str__(self):
+        if config.PY2:
+            return unicode(self).encode('utf-8')
+        return self.__unicode__()
+
+    def __unicode__(self):
+        return self.message.format(self.path, self.reason)
+
+
+def encode(value):
+    """Convert value to the one which can be stored with marshal.
+
+    :param value: any value
+    :return: marshallable value.
+    """
+    value_type = type(value)
+    if value_type in MARSHAL_TYPES:
+        return value
+    if value_type is dict:
+        return dict((encode(key), encode(item)) for key, item in value.items())
+    if value_type is list:
+        return [encode(item) for item in value]
+    if value_type is tuple:
+        items = tuple(encode(item) for item in value)
+        return (TAG, 'tuple', items) if value and value[0] == TAG else items
+    if value_type in (set, frozenset):
+        return value_type(encode(item) for item in value)
+    if value_type is config.FrozenConfig:
+        return TAG, 'frozen', encode(dict(value))
+    if value_type is config.Lazy:
+        return encode(value.get())
+    return TAG, 'pickle', pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(value):
+    """Restore value which was converted by :func:`encode`.
+
+    :param value: marshalled value
+    :return: original value.
+    """
+    value_type = type(value)
+    if value_type is dict:
+        return dict((decode(key), decode(item)) for key, item in value.items())
+    if value_type is list:
+        return [decode(item) for item in value]
+    if value_type is tuple:
+        if len(value) == 3 and value[0] == TAG:
+            kind, data = value[1:]
+            if kind == 'tuple':
+                return tuple(decode(item) for item in data)
+            if kind == 'frozen':
+                return config.FrozenConfig(decode(data))
+            return pickle.loads(data)
+        return tuple(decode(item) for item in value)
+    if value_type in (set, frozenset):
+        return value_type(decode(item) for item in value)
+    return value
+
+
+def get_sources_fingerprint(sources):
+    """Get modification times and sizes of files.
+
+    :param sources: paths of files
+    :return: sorted list of ``(path, mtime, size)`` tuples, mtime and size are `None` for missing files.
+    """
+    fingerprint = []
+    for path in sorted(sources):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            fingerprint.append((path, None, None))
+        else:
+            fingerprint.append((path, stat.st_mtime, stat.st_size))
+    return fingerprint
+
+
+def dump(config_instance, path, application, environment):
+    """Atomically write snapshot of the config.
+
+    :param config_instance: resolved config
+    :param path: path to snapshot file
+    :param application: group of entry points
+    :param environment: name of entry point
+    """
+    header = marshal.dumps({
+        'version': VERSION,
+        'python': config.MAGIC_NUMBER,
+        'application': application,
+        'environment': environment,
+        'frozen': isinstance(config_instance, config.FrozenConfig),
+        'distributions': discovery.fingerprint(),
+        'sources': get_sources_fingerprint(config_instance.sources),
+    })
+    payload = marshal.dumps(encode(dict(config_instance)))
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.settei-')
+    with os.fdopen(fd, 'wb') as snapshot_file:
+        snapshot_file.write(MAGIC)
+        snapshot_file.write(HEADER_LENGTH.pack(len(header)))
+        snapshot_file.write(header)
+        snapshot_file.write(payload)
+    if hasattr(os, 'replace'):
+        os.replace(temp_path, path)
+    else:
+        os.rename(temp_path, path)
+
+
+def read(path, validate=None):
+    """Read snapshot, the file is memory-mapped and decoded in place.
+
+    :param path: path to snapshot file
+    :param validate: function which takes path and header and raises :class:`StaleSnapshot` if the snapshot can't
+                     be used, it is called before values are decoded
+    :return: tuple of header dictionary and config.
+    """
+    with open(path, 'rb') as snapshot_file:
+        try:
+            data = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise StaleSnapshot(path, 'not a snapshot file')
+    try:
+        view = memoryview(data)
+        try:
+            offset = len(MAGIC) + HEADER_LENGTH.size
+            if view[:len(MAGIC)].tobytes() != MAGIC or len(view) < offset:
+                raise StaleSnapshot(path, 'not a snapshot file')
+            header_end = offset + HEADER_LENGTH.unpack_from(view, len(MAGIC))[0]
+            try:
+                header = marshal.loads(view[offset:header_end])
+            except (EOFError, ValueError, TypeError):
+                raise StaleSnapshot(path, 'broken header')
+            if header.get('version') != VERSION or header.get('python') != config.MAGIC_NUMBER:
+                raise StaleSnapshot(path, 'written by another version of settei or Python')
+            if validate is not None:
+                validate(path, header)
+            try:
+                values = decode(marshal.loads(view[header_end:]))
+            except (EOFError, ValueError, TypeError):
+                raise StaleSnapshot(path, 'broken values')
+        finally:
+            view.release()
+    finally:
+        data.close()
+
+    config_instance = config.Config(values)
+    config_instance.sources = frozenset(source for source, mtime, size in header['sources'])
+    if header['frozen']:
+        config_instance = config_instance.freeze()
+    return header, config_instance
+
+
+def load(path, application=None, environment=None):
+    """Load snapshot of the config, snapshot is validated against installed distributions and files which the config
+    was built from.
+
+    :param path: path to snapshot file
+    :param application: group of entry points which the snapshot should belong to
+    :param environment: name of entry point which the snapshot should belong to
+    :return: config.
+    """
+    def validate(path, header):
+        if application is not None and header['application'] != application:
+            raise StaleSnapshot(path, 'it belongs to {0!r} application'.format(header['application']))
+        if environment is not None and header['environment'] != environment:
+            raise StaleSnapshot(path, 'it belongs to {0!r} environment'.format(header['environment']))
+        if header['distributions'] != discovery.fingerprint():
+            raise StaleSnapshot(path, 'installed distributions were changed')
+        sources = [source for source, mtime, size in header['sources']]
+        if header['sources'] != get_sources_fingerprint(sources):
+            raise StaleSnapshot(path, 'config files were changed')
+
+    return read(path, validate)[1]
+
+
+def export(application, environment, path, freeze=False):
+    """Resolve config and write its snapshot.
+
+    :param application: group of entry points
+    :param environment: name of entry point
+    :param path: path to snapshot file
+    :param freeze: load snapshot as :class:`settei.config.FrozenConfig`
+    :return: resolved config.
+    """
+    config_instance = ConfigGenerator(application, environment).get_config()
+    if freeze:
+        config_instance = config_instance.freeze()
+    dump(config_instance, path, application, environment)
+    return config_instance
+
+
+def main(argv=None):
+    """Command line interface."""
+    parser = argparse.ArgumentParser(prog='python -m settei.snapshot', description='Snapshots of resolved configs.')
+    commands = parser.add_subparsers(dest='command')
+    export_parser = commands.add_parser('export', help='resolve config and write its snapshot')
+    export_parser.add_argument('application')
+    export_parser.add_argument('environment')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--freeze', action='store_true', help='load snapshot as frozen config')
+    show_parser = commands.add_parser('show', help='validate snapshot and print its config')
+    show_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        config_instance = export(args.application, args.environment, args.path, freeze=args.freeze)
+        print('{0} settings of {1!r} environment of {2!r} application are written to {3}'.format(
+            len(config_instance), args.environment, args.application, args.path))
+    elif args.command == 'show':
+        try:
+            config_instance = load(args.path)
+        except StaleSnapshot as e:
+            parser.exit(1, '{0}\n'.format(e))
+        for key in sorted(config_instance):
+            print('{0} = {1!r}'.format(key, config_instance[key]))
+    else:
+        parser.print_help()
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Profiling of config resolution.
+
+Tracer records a tree of timings: entry points discovery, ``load()`` and invocation of every entry point and every
+``Config.from_*`` loader call with its path or import name. The tree can be exported as JSON or in collapsed stack
+format which is accepted by flame graph tools (``flamegraph.pl``, speedscope).
+
+.. code-block:: python
+
+    from settei import get_config, tracing
+
+    with tracing.trace() as tracer:
+        get_config('frontoffice', 'live')
+
+    print(tracer.to_json())
+
+When tracing is disabled the only cost is a check of the module global :data:`tracer`.
+"""
+import json
+import threading
+import time
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+#: Active tracer, `None` when tracing is disabled.
+tracer = None
+
+
+class Span(object):
+    """Timing of a single operation."""
+
+    __slots__ = ('kind', 'name', 'start', 'duration', 'children')
+
+    def __init__(self, kind, name, start):
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.children = []
+
+    @property
+    def label(self):
+        return '{0}:{1}'.format(self.kind, self.name)
+
+    def to_dict(self, origin=0):
+        """Convert span and its children to dictionary.
+
+        :param origin: time which start of the span is relative to
+        :return: dictionary.
+        """
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'start': self.start - origin,
+            'duration': self.duration,
+            'children': [child.to_dict(origin) for child in self.children],
+        }
+
+
+class SpanContext(object):
+    """Context manager which records a span."""
+
+    __slots__ = ('tracer', 'span')
+
+    def __init__(self, tracer, kind, name):
+        self.tracer = tracer
+        self.span = Span(kind, str(name), 0)
+
+    def __enter__(self):
+        stack = self.tracer.get_stack()
+        (stack[-1].children if stack else self.tracer.roots).append(self.span)
+        stack.append(self.span)
+        self.span.start = clock()
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.span.duration = clock() - self.span.start
+        self.tracer.get_stack().pop()
+
+
+class Tracer(object):
+    """Records timings of config resolution. Spans of every thread have their own tree."""
+
+    def __init__(self):
+        self.roots = []
+        self.origin = clock()
+        self.local = threading.local()
+        self.previous = None
+
+    def get_stack(self):
+        try:
+            return self.local.stack
+        except AttributeError:
+            stack = self.local.stack = []
+            return stack
+
+    def span(self, kind, name):
+        """Record timing of an operation.
+
+        :param kind: kind of the operation, e.g. ``load`` or ``from_pyfile``
+        :param name: name of entry point, path or import name
+        :return: context manager.
+        """
+        return SpanContext(self, kind, name)
+
+    def start(self):
+        """Enable tracing with this tracer."""
+        global tracer
+        self.previous, tracer = tracer, self
+        return self
+
+    def stop(self):
+        """Disable tracing, previously active tracer is enabled again."""
+        global tracer
+        tracer, self.previous = self.previous, None
+
+    __enter__ = start
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    def to_dict(self):
+        """Get timing tree, times are in seconds relative to creation of the tracer.
+
+        :return: list of root spans as dictionaries.
+        """
+        return [span.to_dict(self.origin) for span in self.roots]
+
+    def to_json(self, **kwargs):
+        """Get timing tree as JSON.
+
+        :param kwargs: arguments of :func:`json.dumps`
+        :return: JSON string.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def collapsed(self):
+        """Get timings in collapsed stack format, one ``frame;frame;frame count`` line per stack where count is self
+        time of the stack in microseconds.
+
+        :return: string.
+        """
+        totals = {}
+        stack = [((span.label,), span) for span in reversed(self.roots)]
+        while stack:
+            path, span = stack.pop()
+            if span.duration is None:
+                continue
+            children = sum(child.duration or 0 for child in span.children)
+            totals[path] = totals.get(path, 0) + max(span.duration - children, 0)
+            stack.extend((path + (child.label,), child) for child in reversed(span.children))
+        return ''.join(
+            '{0} {1}\n'.format(';'.join(path), int(round(total * 1e6))) for path, total in sorted(totals.items()))
+
+
+def trace():
+    """Create tracer, it is enabled inside ``with`` block.
+
+    :return: :class:`Tracer`.
+    """
+    return Tracer()
@@ -40,4 +40,7 @@ setup(
     tests_require=['detox'],
     cmdclass={'test': ToxTestCommand},
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['settei-snapshot = settei.snapshot:main'],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""Configuration of tests."""
+import os
+import sys
+
+import pkg_resources
+import pytest
+
+import settei
+from settei import discovery
+from tests.test_get_entry_points import get_duplicate_entry_points, get_entry_points, require
+
+collect_ignore = []
+
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_aio.py')
+
+
+@pytest.fixture
+def config_environment():
+    """Set CONFIG_ENVIRONMENT for tests."""
+    os.environ['CONFIG_ENVIRONMENT'] = 'dev'
+
+
+@pytest.fixture
+def clean_config():
+    """Cleaning config for tests."""
+    settei.config_storage.clear()
+
+
+@pytest.fixture
+def monkeypatch_entrypoint(monkeypatch, clean_config):
+    """Mokeypatching EntryPoint."""
+    monkeypatch.setattr(pkg_resources.EntryPoint, 'require', require)
+
+
+@pytest.fixture
+def monkeypatch_pkg_resources(monkeypatch, monkeypatch_entrypoint):
+    """Monkeypatching pkg_resources.iter_entry_points with our list of entry points."""
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_entry_points)
+    monkeypatch.setattr(discovery, '_backend', discovery.pkg_resources_backend)
+
+
+@pytest.fixture
+def monkeypatch_pkg_resources_duplicate(monkeypatch, monkeypatch_entrypoint):
+    """Monkeypatching pkg_resources.iter_entry_points with our list of duplicated entry points."""
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_duplicate_entry_points)
+    monkeypatch.setattr(discovery, '_backend', discovery.pkg_resources_backend)
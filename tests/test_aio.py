@@ -0,0 +1,112 @@
+"""Test asynchronous API."""
+import asyncio
+import sys
+import time
+
+import pkg_resources
+import pytest
+
+import settei
+from settei import config
+from settei import discovery
+from settei import schema
+
+BUILD_TIME = 0.2
+
+calls = []
+
+
+def slow_left():
+    """Function which is used by entry points for getting settings slowly."""
+    calls.append('slow_left')
+    time.sleep(BUILD_TIME)
+    return config.Config({'LEFT': True})
+
+
+def slow_right():
+    """Function which is used by entry points for getting settings slowly."""
+    calls.append('slow_right')
+    time.sleep(BUILD_TIME)
+    return config.Config({'RIGHT': True})
+
+
+def both(slow_left, slow_right):
+    """Function which is used by entry points for getting settings from two independent environments."""
+    calls.append('both')
+    slow_left.update(slow_right)
+    return slow_left
+
+
+def get_entry_points(group, name=None):
+    """Create list of entry points."""
+    return [
+        pkg_resources.EntryPoint.parse('slow_left = tests.test_aio:slow_left'),
+        pkg_resources.EntryPoint.parse('slow_right = tests.test_aio:slow_right'),
+        pkg_resources.EntryPoint.parse('both = tests.test_aio:both'),
+    ]
+
+
+@pytest.fixture
+def slow_entry_points(monkeypatch, monkeypatch_entrypoint):
+    """Monkeypatching pkg_resources.iter_entry_points with slow entry points."""
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_entry_points)
+    monkeypatch.setattr(discovery, '_backend', discovery.pkg_resources_backend)
+    del calls[:]
+
+
+def test_aget_config(monkeypatch_pkg_resources):
+    """Check that config is the same as the one which is built synchronously."""
+    dev_config = asyncio.run(settei.aget_config('application', 'dev'))
+
+    assert dev_config is settei.get_config('application', 'dev')
+
+
+def test_aget_config_environment_is_missing(monkeypatch_pkg_resources):
+    """Check that EnvironmentIsMissing is raising for missing environment."""
+    with pytest.raises(settei.EnvironmentIsMissing):
+        asyncio.run(settei.aget_config('application', 'missing_environment'))
+
+
+def test_aget_config_application_schema(monkeypatch_pkg_resources):
+    """Check that schema of the application validates only the requested environment."""
+    schema.register('application', {'ANSWER': int})
+    try:
+        assert asyncio.run(settei.aget_config('application', 'dev'))['ANSWER'] == 42
+        with pytest.raises(schema.ValidationError):
+            asyncio.run(settei.aget_config('application', 'default'))
+    finally:
+        schema.register('application', None)
+
+
+def test_aget_config_builds_branches_concurrently(slow_entry_points):
+    """Check that independent environments are built concurrently and the loop is not blocked."""
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(BUILD_TIME / 10)
+
+    async def main():
+        ticker_task = asyncio.ensure_future(ticker())
+        start = time.time()
+        configs = await asyncio.gather(*[settei.aget_config('application', 'both') for _ in range(10)])
+        elapsed = time.time() - start
+        ticker_task.cancel()
+        return configs, elapsed
+
+    configs, elapsed = asyncio.run(main())
+
+    assert configs[0] == {'LEFT': True, 'RIGHT': True}
+    assert all(config_instance is configs[0] for config_instance in configs)
+    assert sorted(calls) == ['both', 'slow_left', 'slow_right']
+    assert elapsed < BUILD_TIME * 1.9
+    assert len(ticks) > 5
+
+
+def test_settei_import_does_not_import_asyncio():
+    """Check that asyncio is imported only when asynchronous API is used."""
+    import subprocess
+
+    code = 'import sys, settei; sys.exit("settei.aio" in sys.modules)'
+    assert subprocess.call([sys.executable, '-c', code]) == 0
@@ -0,0 +1,53 @@
+"""Test loading of environment variables."""
+import pytest
+
+import settei
+from settei import config
+
+
+def test_from_env():
+    """Check that environment variables with the prefix are loaded with coercion and nested keys."""
+    environ = {
+        'APP_DEBUG': 'yes', 'APP_WORKERS': '4', 'APP_HOSTS': 'a.example.com, b.example.com', 'APP_NAME': 'app',
+        'APP_CACHES': '{"default": {"TIMEOUT": 60}}', 'APP_DATABASES__DEFAULT__PORT': '5433', 'APP_lower': 'ignored',
+        'OTHER_DEBUG': 'no',
+    }
+    base = config.Config({'DATABASES': {'default': {'HOST': 'localhost', 'PORT': 5432}}})
+    settings = base.overlay()
+
+    assert settings.from_env('APP_', types={
+        'DEBUG': bool, 'WORKERS': 'int', 'HOSTS': list, 'CACHES': 'json', 'DATABASES__DEFAULT__PORT': int,
+    }, environ=environ)
+
+    assert settings == {
+        'DEBUG': True, 'WORKERS': 4, 'HOSTS': ['a.example.com', 'b.example.com'], 'NAME': 'app',
+        'CACHES': {'default': {'TIMEOUT': 60}}, 'DATABASES': {'default': {'HOST': 'localhost', 'PORT': 5433}},
+    }
+    assert base['DATABASES']['default']['PORT'] == 5432
+
+
+def test_from_env_plan_is_compiled_once():
+    """Check that plan is compiled once per prefix and types and invalid values are reported."""
+    types = {'DEBUG': bool}
+
+    assert config.get_env_plan('APP_', types) is config.get_env_plan('APP_', dict(types))
+    assert config.get_env_plan('APP_', types) is not config.get_env_plan('APP_')
+    with pytest.raises(ValueError) as excinfo:
+        config.Config().from_env('APP_', types=types, environ={'APP_DEBUG': 'maybe'})
+    assert 'APP_DEBUG' in str(excinfo.value)
+
+
+def test_get_config_env_overlay(monkeypatch, monkeypatch_pkg_resources):
+    """Check that environment variables are applied as the final layer of the stored config."""
+    monkeypatch.setenv('SETTEI_TEST_ANSWER', '43')
+
+    overlay = settei.get_config('application', 'dev', env_prefix='SETTEI_TEST_', env_types={'ANSWER': int})
+    stored = settei.get_config('application', 'dev')
+
+    assert overlay['ANSWER'] == 43 and stored['ANSWER'] == 42
+    assert settei.get_config('application', 'dev', env_prefix='SETTEI_TEST_', env_types={'ANSWER': int}) is overlay
+
+    frozen = settei.preload('application', ['dev'], gc_freeze=False)['dev']
+    frozen_overlay = settei.get_config('application', 'dev', env_prefix='SETTEI_TEST_', env_types={'ANSWER': int})
+    assert isinstance(frozen_overlay, config.FrozenConfig)
+    assert frozen_overlay['ANSWER'] == 43 and frozen['ANSWER'] == 42
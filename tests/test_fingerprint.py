@@ -0,0 +1,87 @@
+"""Test fingerprints and diffs of configs."""
+import settei
+from settei import config
+
+
+def test_fingerprint():
+    """Check that fingerprint is stable and depends only on keys and values."""
+    values = {'DEBUG': False, 'ANSWER': 42, 'NAME': u'settei', 'HOSTS': ['example.com'],
+              'DATABASES': {'default': {'PORT': 5432}}}
+    settings = config.Config(values)
+    assert settings.fingerprint() == '691c5b605a08b97e71d5b1b4ea059dce4bde900a'
+
+    overlay = config.Config({'DEBUG': True, 'ANSWER': 42}).overlay()
+    overlay.update(values)
+    nested = config.Config(values)
+    nested['DATABASES'] = config.FrozenConfig(values['DATABASES'])
+    lazy = config.Config(values)
+    lazy['NAME'] = config.Lazy(lambda: u'settei')
+    for equal in (overlay, nested, lazy, dict(reversed(list(values.items())))):
+        assert settei.fingerprint(equal) == settings.fingerprint()
+
+    assert config.FrozenConfig({'ANSWER': 42}).fingerprint() == config.Config({'ANSWER': 42}).fingerprint()
+    different = [{'ANSWER': 42.0}, {'ANSWER': True}, {'ANSWER': '42'}, {'ANSWER': [42]}, {'ANSWER': {42}}, {}]
+    fingerprints = set(settei.fingerprint(mapping) for mapping in different + [{'ANSWER': 42}])
+    assert len(fingerprints) == len(different) + 1
+
+    assert settei.fingerprint({'PATH': u'/tmp/\udcff'}) != settei.fingerprint({'PATH': u'/tmp/\udcfe'})
+
+
+def test_fingerprint_frozen():
+    """Check that fingerprint of the config doesn't change when it is frozen and lists become tuples."""
+    settings = config.Config({'HOSTS': ['example.com'], 'DATABASES': {'default': {'OPTIONS': [['sslmode', 'on']]}}})
+    frozen = settings.freeze()
+
+    assert frozen['HOSTS'] == ('example.com',)
+    assert settings.fingerprint() == frozen.fingerprint()
+    assert settei.fingerprint({'HOSTS': ('example.com',)}) == settei.fingerprint({'HOSTS': ['example.com']})
+    assert not settei.diff(settings, frozen)
+
+
+def test_fingerprint_cache(monkeypatch):
+    """Check that digests of immutable values are cached per key and changed values are hashed again."""
+    settings = config.Config({'ANSWER': 42, 'HOSTS': ['example.com']})
+    fingerprint = settings.fingerprint()
+
+    calls = []
+    get_value_digest = config.get_value_digest
+    monkeypatch.setattr(config, 'get_value_digest', lambda value: calls.append(value) or get_value_digest(value))
+    assert settings.fingerprint() == fingerprint
+    assert 42 not in calls and ['example.com'] in calls
+
+    settings['HOSTS'].append('example.org')
+    settings['ANSWER'] = 43
+    assert settings.fingerprint() != fingerprint
+    assert 43 in calls
+
+
+def test_diff(monkeypatch_pkg_resources):
+    """Check that diff reports added, removed and changed keys."""
+    assert settei.diff({'A': 1, 'B': [1], 'C': 3}, {'B': [2], 'C': 3, 'D': 4}) == (['D'], ['A'], ['B'])
+    assert not settei.diff({'A': [1]}, config.Config({'A': [1]}))
+
+    dev = settei.get_config('application', 'dev')
+    live = settei.get_config('application', 'live')
+    assert settei.diff(dev, live) == settei.diff(dict(dev), dict(live)) == (['DEBUG'], [], [])
+    assert settei.diff(live, dev) == ([], ['DEBUG'], [])
+    assert settei.diff({'A': 1}, {'A': 1.0}) == ([], [], ['A'])
+
+
+def test_diff_shared_layers():
+    """Check that only layers which differ are compared."""
+    base = config.Config(dict(('KEY_{0}'.format(i), i) for i in range(100)))
+    dev = base.overlay()
+    dev['DEBUG'] = True
+    live = base.overlay()
+    live['DEBUG'] = False
+    del live['KEY_0']
+
+    assert config.get_changed_layers(dev, live) == ([dev], [live])
+    assert settei.diff(dev, live) == ([], ['KEY_0'], ['DEBUG'])
+
+    rebuilt = config.Config(base).overlay()
+    rebuilt['DEBUG'] = True
+    rebuilt['KEY_1'] = -1
+    assert config.get_changed_layers(dev, rebuilt) == ([dev], [rebuilt])
+    assert settei.diff(dev, rebuilt) == ([], [], ['KEY_1'])
+    assert not settei.diff(dev, dev.copy())
@@ -0,0 +1,37 @@
+"""Test read-only snapshots of configs."""
+import pytest
+
+from settei import config
+
+
+def test_freeze():
+    """Check that frozen config is read-only and hashable snapshot of config."""
+    import pickle
+
+    settings = config.Config({'ANSWER': 42, 'HOSTS': ['example.com'], 'DATABASES': {'default': {'PORT': 5432}}})
+    settings.add_source(__file__)
+    frozen = settings.freeze()
+    settings['ANSWER'] = 43
+
+    assert frozen['ANSWER'] == frozen.ANSWER == 42
+    assert frozen.HOSTS == ('example.com',)
+    assert frozen.DATABASES.default.PORT == 5432
+    assert frozen.sources == settings.sources
+    assert frozen.freeze() is frozen
+    assert hash(frozen) == hash(config.Config(frozen).freeze())
+    assert frozen == dict(ANSWER=42, HOSTS=('example.com',), DATABASES={'default': {'PORT': 5432}})
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    assert pickle.loads(pickle.dumps(frozen)).sources == frozen.sources
+
+    with pytest.raises(TypeError):
+        frozen['ANSWER'] = 43
+    with pytest.raises(AttributeError):
+        frozen.ANSWER = 43
+    with pytest.raises(AttributeError):
+        frozen.MISSING
+    assert not hasattr(frozen, '__dict__')
+
+    thawed = frozen.thaw()
+    thawed['ANSWER'] = 43
+    assert isinstance(thawed, config.Config)
+    assert frozen['ANSWER'] == 42
@@ -1,11 +1,13 @@
 """Test getting entry points."""
 import os
+import sys
 
 import pkg_resources
 import pytest
 
 import settei
 from settei import config
+from settei import discovery
 
 # used for checking loading setting by from_envvar and from_pyfile
 TEST_KEY = 'foo'
@@ -88,7 +90,34 @@ def settings_from_invalid_path(default):
 
 
 def live(default, dev):
-    """Function is used by entry points for getting settings for live environment."""
+    """Function is used by entry points for getting settings for live environment.
+
+    :param default: it is dependency which will be calculated in moment of getting settings from this env.
+    :param dev: it is another dependency which is calculated from default one as well.
+    """
+    default.update(dev)
+    default['DEBUG'] = False
+    return default
+
+
+def cycle_start(cycle_end):
+    """Function which is used by entry points for getting settings with circular dependency."""
+    return cycle_end
+
+
+def cycle_middle(cycle_start):
+    """Function which is used by entry points for getting settings with circular dependency."""
+    return cycle_start
+
+
+def cycle_end(cycle_middle):
+    """Function which is used by entry points for getting settings with circular dependency."""
+    return cycle_middle
+
+
+def depends_on_cycle(default, cycle_middle):
+    """Function which is used by entry points for getting settings which depend on circular dependency."""
+    return default
 
 
 def get_entry_points(group, name=None):
@@ -112,6 +141,10 @@ def get_entry_points(group, name=None):
             'settings_from_invalid_path = tests.test_get_entry_points:settings_from_invalid_path'
         ),
         pkg_resources.EntryPoint.parse('wrong_config_object = tests.test_get_entry_points:wrong_config_object'),
+        pkg_resources.EntryPoint.parse('cycle_start = tests.test_get_entry_points:cycle_start'),
+        pkg_resources.EntryPoint.parse('cycle_middle = tests.test_get_entry_points:cycle_middle'),
+        pkg_resources.EntryPoint.parse('cycle_end = tests.test_get_entry_points:cycle_end'),
+        pkg_resources.EntryPoint.parse('depends_on_cycle = tests.test_get_entry_points:depends_on_cycle'),
     ]
 
 
@@ -121,41 +154,11 @@ def get_duplicate_entry_points(group, name=None):
             pkg_resources.EntryPoint.parse('dev = tests.test_get_entry_points:dev')]
 
 
-def require(self, env, installer):
+def require(self, env=None, installer=None):
     """Monkeypatched function of EntryPoint class."""
     pass
 
 
-@pytest.fixture
-def config_environment():
-    """Set CONFIG_ENVIRONMENT for tests."""
-    os.environ['CONFIG_ENVIRONMENT'] = 'dev'
-
-
-@pytest.fixture
-def clean_config():
-    """Cleaning config for tests."""
-    settei.config_storage.clear()
-
-
-@pytest.fixture
-def monkeypatch_entrypoint(monkeypatch, clean_config):
-    """Mokeypatching EntryPoint."""
-    monkeypatch.setattr(pkg_resources.EntryPoint, 'require', require)
-
-
-@pytest.fixture
-def monkeypatch_pkg_resources(monkeypatch, monkeypatch_entrypoint):
-    """Monkeypatching pkg_resources.iter_entry_points with our list of entry points."""
-    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_entry_points)
-
-
-@pytest.fixture
-def monkeypatch_pkg_resources_duplicate(monkeypatch, monkeypatch_entrypoint):
-    """Monkeypatching pkg_resources.iter_entry_points with our list of duplicated entry points."""
-    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_duplicate_entry_points)
-
-
 def test_default_entry_point(monkeypatch_pkg_resources):
     """Check that we are getting config for default environment correctly."""
     default_config = settei.get_config('application', 'default')
@@ -188,11 +191,32 @@ def test_environment_is_missing(monkeypatch_pkg_resources):
         settei.get_config('application', 'missing_environment')
 
 
-def test_more_than_one_dependency_injection_specified(monkeypatch_pkg_resources):
-    """Check that it is impossible to have more that one dependency injection for entry point."""
+def test_several_dependency_injections(monkeypatch_pkg_resources):
+    """Check that entry point can depend on several environments."""
+    live_config = settei.get_config('application', 'live')
+
+    assert live_config == dict(dev(default()), DEBUG=False)
+
+
+@pytest.mark.parametrize(('environment', 'path'), [
+    ('cycle_start', ['cycle_start', 'cycle_end', 'cycle_middle', 'cycle_start']),
+    ('depends_on_cycle', ['cycle_middle', 'cycle_start', 'cycle_end', 'cycle_middle']),
+])
+def test_circular_dependency(monkeypatch_pkg_resources, environment, path):
+    """Check that CircularDependency with path of the cycle is raised if entry points depend on each other."""
+    with pytest.raises(settei.CircularDependency) as exc_info:
+        settei.get_config('application', environment)
+
+    assert exc_info.value.path == path
+    assert ' -> '.join(path) in str(exc_info.value)
 
-    with pytest.raises(settei.MoreThanOneDependencyInjection):
-        settei.get_config('application', 'live')
+
+def test_resolution_order(monkeypatch_pkg_resources):
+    """Check that dependencies are resolved before dependents and only once."""
+    generator = settei.ConfigGenerator('application', 'live')
+    generator.get_entry_points()
+
+    assert generator.get_resolution_order('live') == ['default', 'dev', 'live']
 
 
 def test_wrong_config_type(monkeypatch_pkg_resources):
@@ -226,6 +250,134 @@ def test_loading_settings_from_object_with_invalid_path_to_object(monkeypatch_pk
         settei.get_config('application', 'settings_from_object_with_invalid_path_to_object')
 
 
+class BaseSettings(object):
+    DEBUG = False
+    DB_HOST = 'localhost'
+    lowercase = 'ignored'
+
+    @property
+    def DB_URL(self):
+        return 'postgresql://{0}'.format(self.DB_HOST)
+
+    @staticmethod
+    def FACTORY():
+        return 42
+
+
+class DerivedSettings(BaseSettings):
+    DEBUG = True
+    DB_PORT = 5432
+    __slots__ = ('SLOT',)
+
+
+class CustomDirSettings(object):
+    def __dir__(self):
+        return ['VIRTUAL']
+
+    def __getattr__(self, name):
+        return name.lower()
+
+
+def make_instance():
+    instance = DerivedSettings()
+    instance.SLOT = 'slot'
+    instance.DB_HOST = 'db.example.com'
+    return instance
+
+
+@pytest.mark.parametrize('obj', [
+    config, SettingsHandler, DerivedSettings, make_instance(), CustomDirSettings(), {'KEY': 'value'},
+], ids=['module', 'class', 'hierarchy', 'instance', 'custom-dir', 'dict'])
+def test_from_object_same_as_dir(obj):
+    """Check that attributes are loaded exactly as a dir() scan loads them."""
+    expected = [(key, getattr(obj, key)) for key in dir(obj) if key.isupper()]
+    settings = config.Config()
+
+    settings.from_object(obj)
+
+    assert list(settings.items()) == expected
+
+
+def test_from_object_prefix():
+    """Check that only attributes with the prefix are loaded."""
+    settings = config.Config()
+    settings.from_object(make_instance(), prefix='DB_')
+
+    assert settings == {'DB_HOST': 'db.example.com', 'DB_PORT': 5432, 'DB_URL': 'postgresql://db.example.com'}
+
+
+def test_from_object_allowlist():
+    """Check that only attributes listed in __settings__ are loaded."""
+    class Settings(DerivedSettings):
+        __settings__ = ('DEBUG', 'DB_PORT', 'lowercase')
+
+    settings = config.Config()
+    settings.from_object(Settings)
+
+    assert settings == {'DEBUG': True, 'DB_PORT': 5432}
+
+
+@pytest.mark.parametrize('import_name, expected', [
+    ('os', os),
+    ('os.path', os.path),
+    ('os.path.join', os.path.join),
+    ('os.path:join', os.path.join),
+    ('xml.sax', __import__('xml.sax').sax),
+])
+def test_import_string(import_name, expected):
+    """Check that objects are imported both by the import machinery and from sys.modules."""
+    config.import_cache.clear()
+
+    assert config.import_string(import_name) is expected
+    assert config.import_string(import_name) is expected
+
+
+def test_import_string_sys_modules(monkeypatch):
+    """Check that objects of already imported modules are taken from sys.modules and are up to date."""
+    import types
+
+    module = types.ModuleType('settei_test_module')
+    module.VALUE = 1
+    monkeypatch.setitem(sys.modules, 'settei_test_module', module)
+
+    assert config.import_string('settei_test_module:VALUE') == 1
+    module.VALUE = 2
+    assert config.import_string('settei_test_module:VALUE') == 2
+
+
+def test_import_string_cache_size(monkeypatch):
+    """Check that number of memoized import names is bounded and the oldest ones are forgotten."""
+    monkeypatch.setattr(config, 'IMPORT_CACHE_SIZE', 2)
+    config.import_cache.clear()
+
+    config.import_string('os.path')
+    config.import_string('os.sep')
+    config.import_string('os.path')
+    config.import_string('os.getcwd')
+
+    assert list(config.import_cache) == ['os.sep', 'os.getcwd']
+
+
+def test_import_string_error_is_lazy(monkeypatch):
+    """Check that import of every prefix for the error message is done only when the message is rendered."""
+    calls = []
+    import_string = config.import_string
+
+    def counting_import_string(import_name, silent=False):
+        calls.append(import_name)
+        return import_string(import_name, silent)
+
+    with pytest.raises(config.ImportStringError) as excinfo:
+        config.import_string('tests.test_get_entry_points.missing.name')
+    monkeypatch.setattr(config, 'import_string', counting_import_string)
+
+    assert calls == []
+    assert "'tests.test_get_entry_points.missing' not found." in str(excinfo.value)
+    assert calls == ['tests', 'tests.test_get_entry_points', 'tests.test_get_entry_points.missing']
+    str(excinfo.value)
+    assert len(calls) == 3
+
+
 def test_loading_settings_from_envvar(monkeypatch_pkg_resources):
     """Check that settings were loaded from environment variable."""
 
@@ -249,3 +401,293 @@ def test_environment_from_envvar(monkeypatch_pkg_resources, config_environment):
     assert config == dev(default())
 
     del(os.environ['CONFIG_ENVIRONMENT'])
+
+
+def test_discovery_backends_are_interchangeable(monkeypatch):
+    """Check that importlib.metadata and pkg_resources backends find the same entry points."""
+    monkeypatch.setattr(discovery, '_backend', None)
+    group = 'console_scripts'
+
+    assert sorted(ep.name for ep in discovery.importlib_metadata_backend(group)) == sorted(
+        ep.name for ep in discovery.pkg_resources_backend(group))
+
+
+def test_set_discovery_backend_by_name(monkeypatch):
+    """Check that backend can be chosen by its name and restored to the default one."""
+    monkeypatch.setattr(discovery, '_backend', None)
+
+    discovery.set_backend('pkg_resources')
+    assert discovery.get_backend() is discovery.pkg_resources_backend
+
+    discovery.set_backend(None)
+    assert discovery.get_backend() is discovery.importlib_metadata_backend
+
+
+def test_settei_import_does_not_import_pkg_resources():
+    """Check that pkg_resources is not imported together with settei."""
+    import subprocess
+
+    code = 'import sys, settei; sys.exit("pkg_resources" in sys.modules)'
+    assert subprocess.call([sys.executable, '-c', code]) == 0
+
+
+def make_distribution(path, name, entry_points):
+    """Create metadata of installed distribution with given entry points text."""
+    dist_info = path.join('{0}-1.0.dist-info'.format(name))
+    dist_info.ensure(dir=True)
+    dist_info.join('METADATA').write('Metadata-Version: 2.1\nName: {0}\nVersion: 1.0\n'.format(name))
+    dist_info.join('entry_points.txt').write(entry_points)
+
+
+@pytest.fixture
+def site_packages(monkeypatch, tmpdir):
+    """Directory with installed distributions and the index file."""
+    path = tmpdir.mkdir('site-packages')
+    make_distribution(path, 'frontoffice', '[settings_frontoffice]\ndefault = tests.test_get_entry_points:default\n')
+    monkeypatch.syspath_prepend(str(path))
+    monkeypatch.setenv('SETTEI_INDEX_PATH', str(tmpdir.join('index.json')))
+    return path
+
+
+def test_index_backend(site_packages, tmpdir, monkeypatch):
+    """Check that index is written once and then used instead of scanning distributions."""
+    entry_points = discovery.index_backend('settings_frontoffice')
+
+    assert entry_points == [
+        discovery.EntryPoint('default', 'tests.test_get_entry_points:default', 'settings_frontoffice')]
+    assert entry_points[0].load() is default
+    assert tmpdir.join('index.json').check()
+
+    def scan_groups():
+        raise AssertionError('Index should not be rebuilt.')
+
+    monkeypatch.setattr(discovery, 'scan_groups', scan_groups)
+    assert discovery.index_backend('settings_frontoffice') == entry_points
+
+
+def test_index_backend_rebuilds_index(site_packages):
+    """Check that index is rebuilt when distribution is installed."""
+    import importlib
+
+    assert discovery.index_backend('settings_backoffice') == []
+
+    make_distribution(
+        site_packages, 'backoffice',
+        '[settings_backoffice]\ndefault = tests.test_get_entry_points:default\ndev = tests.test_get_entry_points:dev\n',
+    )
+    importlib.invalidate_caches()
+
+    assert [entry_point.name for entry_point in discovery.index_backend('settings_backoffice')] == ['default', 'dev']
+
+
+def test_discovery_fingerprint(site_packages, tmpdir):
+    """Check that fingerprint depends on distributions metadata, not on entries of the path without it."""
+    path = [str(site_packages)]
+    current = discovery.fingerprint(path)
+    scripts = tmpdir.mkdir('scripts')
+    scripts.join('script.py').write('')
+
+    assert discovery.fingerprint([str(scripts)] + path) == current
+    assert discovery.fingerprint(['', os.getcwd()]) == discovery.fingerprint([os.getcwd()])
+
+    make_distribution(scripts, 'backoffice', '')
+    assert discovery.fingerprint([str(scripts)] + path) != current
+
+
+def test_index_backend_keeps_duplicates(site_packages, monkeypatch, clean_config):
+    """Check that duplicated entry points from different distributions are detected with the index."""
+    make_distribution(
+        site_packages, 'frontoffice_extra', '[settings_frontoffice]\ndefault = tests.test_get_entry_points:default\n')
+    monkeypatch.setattr(discovery, '_backend', discovery.index_backend)
+
+    with pytest.raises(settei.DuplicateEntryPoint):
+        settei.get_config('frontoffice', 'default')
+
+
+def test_index_backend_skips_shadowed_distributions(site_packages, monkeypatch, tmpdir):
+    """Check that distribution which is shadowed by the one with the same name earlier on the path is skipped."""
+    import importlib
+
+    shadowed = tmpdir.mkdir('shadowed')
+    make_distribution(shadowed, 'frontoffice', '[settings_frontoffice]\ndefault = tests.test_get_entry_points:dev\n')
+    monkeypatch.setattr(sys, 'path', sys.path + [str(shadowed)])
+    importlib.invalidate_caches()
+
+    entry_points = discovery.index_backend('settings_frontoffice')
+
+    assert entry_points == [
+        discovery.EntryPoint('default', 'tests.test_get_entry_points:default', 'settings_frontoffice')]
+    assert [(entry_point.name, entry_point.value) for entry_point in entry_points] == [
+        (entry_point.name, entry_point.value)
+        for entry_point in discovery.importlib_metadata_backend('settings_frontoffice')]
+
+
+def test_dependency_is_resolved_once(monkeypatch, monkeypatch_pkg_resources):
+    """Check that shared dependency is invoked once per application and dependents can't change it."""
+
+    calls = []
+    original_default = default
+
+    def counted_default():
+        calls.append(None)
+        return original_default()
+
+    monkeypatch.setattr(sys.modules[__name__], 'default', counted_default)
+
+    dev_config = settei.get_config('application', 'dev')
+    object_config = settei.get_config('application', 'settings_from_object')
+    default_config = settei.get_config('application', 'default')
+
+    assert len(calls) == 1
+    assert dev_config['ANSWER'] == 42
+    assert object_config['ANSWER'] == SettingsHandler.ANSWER
+    assert 'ANSWER' not in default_config
+    assert type(default_config) is config.Config
+
+
+def test_entry_point_is_loaded_once(monkeypatch, monkeypatch_pkg_resources):
+    """Check that every entry point of the graph is loaded only once."""
+    loaded = []
+    original_load = pkg_resources.EntryPoint.load
+
+    def load(self, *args, **kwargs):
+        loaded.append(self.name)
+        return original_load(self, *args, **kwargs)
+
+    monkeypatch.setattr(pkg_resources.EntryPoint, 'load', load)
+
+    settei.get_config('application', 'live')
+
+    assert sorted(loaded) == ['default', 'dev', 'live']
+
+
+def test_get_arguments():
+    """Check that only positional arguments of callable objects are introspected."""
+    class Handler(object):
+        def __call__(self, default, dev, *args, **kwargs):
+            pass
+
+    assert settei.get_arguments(live) == ['default', 'dev']
+    assert settei.get_arguments(Handler()) == ['default', 'dev']
+
+
+def test_concurrent_get_config(monkeypatch, monkeypatch_pkg_resources):
+    """Check that config and environments it inherits are built only once when many threads request it or its
+    siblings at the same time."""
+    import threading
+    import time
+
+    calls = []
+    default_calls = []
+    original_default = default
+    original_dev = dev
+
+    def slow_default():
+        default_calls.append(None)
+        time.sleep(0.05)
+        return original_default()
+
+    def slow_dev(default):
+        calls.append(None)
+        time.sleep(0.05)
+        return original_dev(default)
+
+    monkeypatch.setattr(sys.modules[__name__], 'default', slow_default)
+    monkeypatch.setattr(sys.modules[__name__], 'dev', slow_dev)
+
+    threads_count = 32
+    siblings = ('settings_from_object', 'settings_from_object_with_path_to_object', 'dev')
+    barrier = threading.Barrier(threads_count)
+    results = []
+
+    def worker(index):
+        barrier.wait()
+        settei.get_config('application', siblings[index % len(siblings)])
+        for environment in ('dev', 'default', 'dev'):
+            results.append(settei.get_config('application', environment))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(default_calls) == 1
+    assert len(results) == threads_count * 3
+    assert len(set(id(config) for config in results)) == 2
+    assert not settei.config_storage.building
+    assert not settei.building_nodes
+
+
+@pytest.mark.parametrize('threads', [None, 4])
+def test_get_configs(monkeypatch, monkeypatch_pkg_resources, threads):
+    """Check that entry points are discovered once and shared environments are resolved once."""
+    calls = []
+    original_default = default
+    discovered = []
+
+    def counted_default():
+        calls.append(None)
+        return original_default()
+
+    def counted_get_entry_points(group):
+        discovered.append(group)
+        return get_entry_points(group)
+
+    monkeypatch.setattr(sys.modules[__name__], 'default', counted_default)
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', counted_get_entry_points)
+
+    configs = settei.get_configs('application', ['live', 'dev', 'settings_from_object'], threads=threads)
+
+    assert sorted(configs) == ['dev', 'live', 'settings_from_object']
+    assert configs['live'] == dict(dev(original_default()), DEBUG=False)
+    assert configs['settings_from_object']['ANSWER'] == SettingsHandler.ANSWER
+    assert len(calls) == 1
+    assert discovered == ['settings_application']
+    assert settei.get_config('application', 'dev') is configs['dev']
+    assert settei.get_configs('application', ['dev']) == {'dev': configs['dev']}
+    assert discovered == ['settings_application']
+
+
+def test_get_configs_all_environments(monkeypatch, monkeypatch_pkg_resources):
+    """Check that all environments are resolved by default and missing environments are not accepted."""
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', lambda group: get_entry_points(group)[:3])
+
+    assert sorted(settei.get_configs('application', threads=2)) == ['default', 'dev', 'live']
+    with pytest.raises(settei.EnvironmentIsMissing):
+        settei.get_configs('application', ['dev', 'missing_environment'])
+
+
+def test_get_configs_error(monkeypatch_pkg_resources):
+    """Check that errors of entry points built in threads are raised."""
+    with pytest.raises(settei.WrongConfigTypeError):
+        settei.get_configs('application', ['live', 'wrong_config_object'], threads=4)
+
+
+def test_preload(monkeypatch_pkg_resources):
+    """Check that preloaded configs are frozen and returned by get_config."""
+    configs = settei.preload('application', ['default', 'dev', 'live'], gc_freeze=False)
+
+    assert sorted(configs) == ['default', 'dev', 'live']
+    assert isinstance(configs['live'], config.FrozenConfig)
+    assert configs['live'] == dict(dev(default()), DEBUG=False)
+    assert settei.get_config('application', 'live') is configs['live']
+
+    with pytest.raises(settei.EnvironmentIsMissing):
+        settei.preload('application', ['missing_environment'], gc_freeze=False)
+
+
+def test_preload_all_environments(monkeypatch, monkeypatch_pkg_resources):
+    """Check that all environments are preloaded by default and garbage collector is frozen."""
+    import gc
+
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', lambda group: get_entry_points(group)[:3])
+    frozen = []
+    monkeypatch.setattr(gc, 'freeze', lambda: frozen.append(None), raising=False)
+
+    configs = settei.preload('application', freeze=False)
+
+    assert sorted(configs) == ['default', 'dev', 'live']
+    assert isinstance(configs['dev'], config.Config)
+    assert frozen == [None]
@@ -0,0 +1,139 @@
+"""Test resolution of configs in subprocesses."""
+import marshal
+import sys
+
+import pkg_resources
+import pytest
+
+import settei
+from settei import config, discovery, isolation, reload
+from tests.test_get_entry_points import get_entry_points
+
+HEAVY_MODULE = 'settei_test_heavy_module'
+
+
+def heavy(default):
+    """Entry point which imports a module only to get a value."""
+    module = __import__(HEAVY_MODULE)
+    default['HEAVY'] = {'ANSWER': config.Lazy(lambda: module.ANSWER), 'HOSTS': ['example.com']}
+    return default
+
+
+def heavy_file(default):
+    """Entry point which imports a module and gets settings from file."""
+    __import__(HEAVY_MODULE)
+    default.from_envvar('SETTEI_ISOLATION_FILE')
+    return default
+
+
+def not_plain(default):
+    """Entry point which returns a value of its own type."""
+    default['HANDLER'] = object()
+    return default
+
+
+def get_isolation_entry_points(group, name=None):
+    return get_entry_points(group, name) + [
+        pkg_resources.EntryPoint.parse('heavy = tests.test_isolation:heavy'),
+        pkg_resources.EntryPoint.parse('heavy_file = tests.test_isolation:heavy_file'),
+        pkg_resources.EntryPoint.parse('not_plain = tests.test_isolation:not_plain'),
+    ]
+
+
+@pytest.fixture
+def pool(monkeypatch, monkeypatch_entrypoint, tmpdir):
+    """Create pool of forked processes which see patched entry points and the heavy module."""
+    tmpdir.join(HEAVY_MODULE + '.py').write('ANSWER = 42\n')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_isolation_entry_points)
+    monkeypatch.setattr(discovery, '_backend', discovery.pkg_resources_backend)
+    isolation.shutdown()
+    yield isolation.get_executor(2, 'fork')
+    isolation.shutdown()
+
+
+def test_get_config(pool):
+    """Check that config is built in the subprocess and modules which it imports are not imported."""
+    config_instance = isolation.get_config('application', 'heavy')
+
+    assert HEAVY_MODULE not in sys.modules
+    assert type(config_instance) is config.Config
+    assert config_instance['HEAVY'] == {'ANSWER': 42, 'HOSTS': ['example.com']}
+    assert config_instance['QUESTION'] == 'The Ultimate Question of Life, the Universe, and Everything'
+    assert config_instance.environment == 'heavy'
+    assert __file__.replace('.pyc', '.py') in config_instance.sources
+    assert settei.get_config('application', 'heavy') is config_instance
+    assert isolation.get_config('application', 'heavy') is config_instance
+
+
+def test_get_configs(pool):
+    """Check that several configs are built in parallel and put into the storage."""
+    keys = [('application', 'default'), ('application', 'dev'), ('application', 'heavy'), ('application', 'dev')]
+    configs = isolation.get_configs(keys, freeze=True)
+
+    assert sorted(configs) == sorted(set(keys))
+    assert configs[('application', 'dev')] == dict(QUESTION=configs[('application', 'default')]['QUESTION'], ANSWER=42)
+    assert all(isinstance(config_instance, config.FrozenConfig) for config_instance in configs.values())
+    assert settei.get_config('application', 'dev') is configs[('application', 'dev')]
+    assert HEAVY_MODULE not in sys.modules
+
+
+def test_errors(pool):
+    """Check that errors of the subprocess are raised."""
+    with pytest.raises(settei.EnvironmentIsMissing):
+        isolation.get_config('application', 'missing')
+
+    with pytest.raises(isolation.NotPlainData) as e:
+        isolation.get_config('application', 'not_plain')
+    assert str(e.value) == (
+        "Value of 'HANDLER' key of 'not_plain' environment of 'application' application is not plain data: object.")
+    assert ('application', 'not_plain') not in settei.config_storage
+
+
+def test_build_generation(monkeypatch, monkeypatch_entrypoint):
+    """Check that the subprocess keeps configs until the generation of the storage is changed."""
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_isolation_entry_points)
+    monkeypatch.setattr(discovery, '_backend', discovery.pkg_resources_backend)
+    monkeypatch.setattr(isolation, 'built_generation', None)
+    assert marshal.loads(isolation.build('application', 'dev', 1)[0])['ANSWER'] == 42
+
+    monkeypatch.setattr('tests.test_get_entry_points.dev', lambda default: default.update(ANSWER=43) or default)
+    assert marshal.loads(isolation.build('application', 'dev', 1)[0])['ANSWER'] == 42
+    assert marshal.loads(isolation.build('application', 'dev', 2)[0])['ANSWER'] == 43
+    settei.config_storage.clear()
+
+
+def test_invalidate(pool, monkeypatch, tmpdir):
+    """Check that processes of the pool build configs again after they are invalidated in the storage."""
+    settings = tmpdir.join('settings.py')
+    settings.write('ANSWER = 42\n')
+    monkeypatch.setenv('SETTEI_ISOLATION_FILE', str(settings))
+    assert isolation.get_config('application', 'heavy_file')['ANSWER'] == 42
+    assert isolation.get_config('application', 'heavy_file') is settei.get_config('application', 'heavy_file')
+
+    settings.write('ANSWER = 43\n')
+    settei.config_storage.invalidate('application', 'heavy_file')
+    assert isolation.get_config('application', 'heavy_file')['ANSWER'] == 43
+
+
+def test_reload(pool, monkeypatch, tmpdir):
+    """Check that hot reload rebuilds configs in the pool and modules of changed files are reloaded there."""
+    settings = tmpdir.join('settings.py')
+    settings.write('ANSWER = 42\n')
+    monkeypatch.setenv('SETTEI_ISOLATION_FILE', str(settings))
+    configs = isolation.get_configs([('application', 'heavy'), ('application', 'heavy_file')], freeze=True)
+    assert configs[('application', 'heavy')]['HEAVY']['ANSWER'] == 42
+    heavy_module = tmpdir.join(HEAVY_MODULE + '.py')
+
+    settings.write('ANSWER = 43\n')
+    heavy_module.write('ANSWER = 43  # changed\n')
+    key = ('application', 'heavy_file')
+    assert reload.Reloader().reload([str(settings), str(heavy_module)]) == [key]
+    assert HEAVY_MODULE not in sys.modules
+    assert isinstance(settei.get_config(*key), config.FrozenConfig)
+    assert settei.get_config(*key)['ANSWER'] == 43
+    assert isolation.is_isolated(key)
+
+    # modules of changed files are reloaded by processes of the pool too
+    settei.config_storage.invalidate('application', 'heavy')
+    assert isolation.get_config('application', 'heavy')['HEAVY']['ANSWER'] == 43
@@ -0,0 +1,132 @@
+"""Test layered configs of inherited environments."""
+import sys
+
+import pytest
+
+import settei
+from settei import config
+
+
+class MyConfig(config.Config):
+    """Config with its own methods."""
+
+    def helper(self):
+        return self['ANSWER'] * 2
+
+
+def test_layered_config_subclass(monkeypatch, monkeypatch_pkg_resources):
+    """Check that overlays of subclasses keep their class, methods and attributes."""
+    import pickle
+
+    def default():
+        settings = MyConfig({'ANSWER': 21})
+        settings.extra = 'extra'
+        return settings
+
+    monkeypatch.setattr('tests.test_get_entry_points.default', default)
+    dev = settei.get_config('application', 'dev')
+
+    assert isinstance(dev, MyConfig) and isinstance(dev, config.LayeredConfig)
+    assert dev.extra == 'extra'
+    assert dev.helper() == 84
+    assert type(dev.overlay()) is type(dev) is type(config.get_layered_class(MyConfig)(None))
+    restored = pickle.loads(pickle.dumps(dev))
+    assert type(restored) is type(dev) and restored == dev and restored.extra == 'extra'
+
+
+def test_layered_config():
+    """Check that overlay keeps only its own changes and reads through to the parent."""
+    base = config.Config({'DEBUG': False, 'ANSWER': 42, 'HOSTS': ['example.com']})
+    dev = base.overlay()
+    dev['DEBUG'] = True
+    del dev['HOSTS']
+
+    assert dev == {'DEBUG': True, 'ANSWER': 42}
+    assert dev.delta == {'DEBUG': True, 'HOSTS': config.DELETED}
+    assert base == {'DEBUG': False, 'ANSWER': 42, 'HOSTS': ['example.com']}
+    assert len(dev) == 2 and sorted(dev) == ['ANSWER', 'DEBUG'] and 'HOSTS' not in dev
+    assert dev.get('HOSTS') is None
+    with pytest.raises(KeyError):
+        dev['HOSTS']
+
+    assert dev.pop('ANSWER') == 42 and dev.pop('ANSWER', None) is None
+    assert dev.setdefault('ANSWER', 43) == 43
+    dev.update({'QUESTION': '?'}, DEBUG=False)
+    assert dev == {'DEBUG': False, 'ANSWER': 43, 'QUESTION': '?'}
+
+    copied = dev.copy()
+    copied.clear()
+    assert copied == {} and dev == {'DEBUG': False, 'ANSWER': 43, 'QUESTION': '?'}
+
+
+def test_layered_config_invalidation():
+    """Check that flattened dictionaries of overlays are dropped when a layer is changed."""
+    base = config.LayeredConfig(None, {'DEBUG': False})
+    middle = base.overlay()
+    top = middle.overlay()
+    assert top['DEBUG'] is False
+
+    base['DEBUG'] = True
+    base['ANSWER'] = 42
+    assert top == {'DEBUG': True, 'ANSWER': 42}
+
+    middle['ANSWER'] = 43
+    del base['DEBUG']
+    assert top == {'ANSWER': 43}
+    assert top.delta == {} and middle.delta == {'ANSWER': 43}
+
+
+def test_layered_config_attribution(monkeypatch_pkg_resources):
+    """Check that environments get overlays and the layer which supplied every key is known."""
+    live = settei.get_config('application', 'live')
+
+    assert isinstance(live, config.LayeredConfig)
+    assert live.get_layer('QUESTION').environment == 'default'
+    assert live.get_layer('DEBUG').environment == 'live'
+    assert live.attribution() == {'QUESTION': 'default', 'ANSWER': 'live', 'DEBUG': 'live'}
+    assert settei.get_config('application', 'dev').delta == {'ANSWER': 42}
+    with pytest.raises(KeyError):
+        live.get_layer('MISSING')
+
+
+def test_layered_config_dict_storage(monkeypatch_pkg_resources):
+    """Check that code which reads the dictionary directly sees all values of inherited environments."""
+    import json
+
+    dev = settei.get_config('application', 'dev')
+    assert isinstance(dev, config.LayeredConfig)
+    assert json.loads(json.dumps(dev)) == dict.copy(dev) == dict(dev) == dev.flatten()
+    assert dict.copy(dev) == {'QUESTION': 'The Ultimate Question of Life, the Universe, and Everything', 'ANSWER': 42}
+
+    base = config.Config({'DEBUG': False})
+    overlay = base.overlay()
+    child = overlay.overlay()
+    overlay['ANSWER'] = 42
+    assert dict.copy(child) == {'DEBUG': False, 'ANSWER': 42}
+
+    if sys.version_info >= (3, 9):
+        overlay |= {'DEBUG': True}
+        assert overlay.delta == {'ANSWER': 42, 'DEBUG': True}
+        overlay.invalidate()
+        assert dict.copy(overlay) == {'DEBUG': True, 'ANSWER': 42} == overlay | {}
+
+
+def test_layered_config_copies(tmpdir):
+    """Check that overlays are pickled, frozen and copied with their sources and lazy values."""
+    import pickle
+
+    calls = []
+    base = config.Config({'HOSTS': config.Lazy(lambda: calls.append(None) or ['example.com'])})
+    base.add_source(str(tmpdir.join('base.py')))
+    overlay = base.overlay()
+    overlay.add_source(str(tmpdir.join('overlay.py')))
+    overlay['DEBUG'] = True
+
+    frozen = overlay.freeze()
+    assert calls == []
+    assert frozen == {'HOSTS': ('example.com',), 'DEBUG': True}
+    assert len(overlay.sources) == len(frozen.sources) == 2
+
+    restored = pickle.loads(pickle.dumps(overlay.evaluate()))
+    assert restored == overlay and restored.sources == overlay.sources
+    assert type(restored) is config.LayeredConfig
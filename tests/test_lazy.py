@@ -0,0 +1,71 @@
+"""Test lazily computed values."""
+import pytest
+
+from settei import config
+
+
+def test_lazy_value():
+    """Check that lazy value is computed on first access only once and shared by copies."""
+    calls = []
+
+    def compute():
+        calls.append(None)
+        return ['example.com']
+
+    settings = config.Config({'HOSTS': config.Lazy(compute), 'DEBUG': True})
+    copied = settings.copy()
+    frozen = settings.freeze()
+
+    assert calls == []
+    assert settings['HOSTS'] == settings.get('HOSTS') == copied['HOSTS'] == ['example.com']
+    assert frozen.HOSTS == frozen['HOSTS'] == ('example.com',)
+    assert len(calls) == 1
+    assert settings.get('MISSING', 42) == 42
+
+    settings.evaluate()
+    assert dict(settings.items()) == {'HOSTS': ['example.com'], 'DEBUG': True}
+
+
+@pytest.mark.parametrize('layered', [False, True])
+def test_lazy_value_mapping(layered):
+    """Check that lazy values are computed by iteration, comparison and copying to other dictionaries."""
+    import json
+
+    settings = config.Config({'ANSWER': config.Lazy(lambda: 42), 'DEBUG': True})
+    if layered:
+        settings = settings.overlay()
+    expected = {'ANSWER': 42, 'DEBUG': True}
+
+    assert settings == expected and expected == settings and not settings != expected
+    assert settings == config.Config(expected) == config.Config(expected).overlay()
+    assert dict(settings) == dict(settings.items()) == json.loads(json.dumps(settings)) == expected
+    assert sorted(settings.values(), key=repr) == [42, True]
+    assert ('ANSWER', 42) in settings.items()
+    other = {}
+    other.update(settings)
+    assert other == expected
+    assert type(dict.__getitem__(settings.copy(), 'ANSWER')) is config.Lazy
+
+
+def test_lazy_value_threads():
+    """Check that lazy value is computed once when many threads access it at the same time."""
+    import threading
+    import time
+
+    calls = []
+
+    def compute():
+        calls.append(None)
+        time.sleep(0.05)
+        return 42
+
+    settings = config.Config({'ANSWER': config.Lazy(compute)})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(settings['ANSWER'])) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 16
+    assert len(calls) == 1
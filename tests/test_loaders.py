@@ -0,0 +1,169 @@
+"""Test loaders of config files."""
+import collections
+import sys
+
+import pytest
+
+from settei import config
+from settei import loaders
+
+FLAGS = collections.namedtuple('FLAGS', 'optimize')
+
+
+@pytest.mark.parametrize('cache_dir', [False, True])
+def test_from_pyfile_cache(monkeypatch, tmpdir, cache_dir):
+    """Check that compiled code of Python file is cached and cache is invalidated when file is changed."""
+    settings_file = tmpdir.join('settings.py')
+    settings_file.write('ANSWER = 42\n')
+    cache = str(tmpdir.mkdir('cache')) if cache_dir else True
+
+    assert config.Config().from_pyfile(str(settings_file), cache=cache)
+    assert len((tmpdir.join('cache') if cache_dir else tmpdir).listdir('*.settei-cache')) == 1
+
+    def compile_disabled(*args):
+        raise AssertionError('Cached code should be used.')
+
+    monkeypatch.setattr(config, 'compile', compile_disabled, raising=False)
+    settings = config.Config()
+    settings.from_pyfile(str(settings_file), cache=cache)
+    assert settings == {'ANSWER': 42}
+
+    monkeypatch.undo()
+    settings_file.write('ANSWER = 4242\n')
+    settings = config.Config()
+    settings.from_pyfile(str(settings_file), cache=cache)
+    assert settings == {'ANSWER': 4242}
+
+
+def test_from_pyfile_cache_optimize(monkeypatch, tmpdir):
+    """Check that code is cached per optimization level of the interpreter."""
+    settings_file = tmpdir.join('settings.py')
+    settings_file.write('ANSWER = 42\n')
+    assert config.Config().from_pyfile(str(settings_file), cache=True)
+
+    compiled = []
+    monkeypatch.setattr(config, 'compile', lambda *args: compiled.append(args) or compile(*args), raising=False)
+    monkeypatch.setattr(sys, 'flags', FLAGS(optimize=2))
+    for _ in range(2):
+        settings = config.Config()
+        settings.from_pyfile(str(settings_file), cache=True)
+        assert settings == {'ANSWER': 42}
+    assert len(compiled) == 1
+    assert sorted(path.basename for path in tmpdir.listdir('*.settei-cache')) == [
+        'settings.py.opt-2.settei-cache', 'settings.py.settei-cache']
+
+
+def test_from_envvar_cache(monkeypatch, tmpdir):
+    """Check that cache set on the class is used by from_envvar."""
+    settings_file = tmpdir.join('settings.py')
+    settings_file.write('ANSWER = 42\n')
+    monkeypatch.setenv('SETTINGS_FILE', str(settings_file))
+    monkeypatch.setattr(config.Config, 'pyfile_cache', True)
+
+    settings = config.Config()
+    settings.from_envvar('SETTINGS_FILE')
+
+    assert settings == {'ANSWER': 42}
+    assert tmpdir.join('settings.py.settei-cache').check()
+
+
+STRUCTURED_SETTINGS = {
+    'ANSWER': 42,
+    'DEBUG': True,
+    'DATABASES': {'default': {'HOST': 'localhost', 'PORT': 5432}},
+    'HOSTS': ['example.com', u'пример.рф'],
+    'lowercase': 'ignored',
+}
+
+
+@pytest.mark.parametrize(('loader', 'kwargs', 'text'), [
+    ('from_json', {}, None),
+    ('from_json', {'stream': True}, None),
+    ('from_yaml', {}, None),
+    ('from_toml', {}, (
+        u'ANSWER = 42\nDEBUG = true\nHOSTS = ["example.com", "пример.рф"]\n'
+        u'lowercase = "ignored"\n[DATABASES.default]\nHOST = "localhost"\nPORT = 5432\n'
+    )),
+])
+def test_structured_loaders(tmpdir, loader, kwargs, text):
+    """Check that only uppercase keys are loaded from structured data files."""
+    import json
+
+    settings_file = tmpdir.join('settings')
+    settings_file.write_text(text or json.dumps(STRUCTURED_SETTINGS, indent=2), 'utf-8')
+    settings = config.Config()
+
+    assert getattr(settings, loader)(str(settings_file), **kwargs)
+    assert settings == dict((key, value) for key, value in STRUCTURED_SETTINGS.items() if key.isupper())
+
+
+@pytest.mark.parametrize(('loader', 'text'), [('from_json', 'null'), ('from_yaml', ''), ('from_yaml', '# empty')])
+def test_structured_loaders_empty(tmpdir, loader, text):
+    """Check that empty documents are loaded as empty mappings."""
+    settings_file = tmpdir.join('settings')
+    settings_file.write(text)
+    settings = config.Config()
+
+    assert getattr(settings, loader)(str(settings_file))
+    assert settings == {}
+
+
+def test_from_mapping_keys():
+    """Check that keys which are not strings are skipped."""
+    settings = config.Config()
+
+    assert settings.from_mapping({1: 'one', None: 'none', (u'A',): 'tuple', 'ANSWER': 42, u'DEBUG': True})
+    assert settings.from_mapping(None)
+    assert settings == {'ANSWER': 42, 'DEBUG': True}
+
+
+def test_from_ini(tmpdir):
+    """Check that uppercase options of the section are loaded as strings."""
+    settings_file = tmpdir.join('settings.ini')
+    settings_file.write('[DEFAULT]\nDEBUG = false\n\n[live]\nANSWER = 42\nlowercase = ignored\n')
+
+    default_settings = config.Config()
+    default_settings.from_ini(str(settings_file))
+    live_settings = config.Config()
+    live_settings.from_ini(str(settings_file), section='live')
+
+    assert default_settings == {'DEBUG': 'false'}
+    assert live_settings == {'DEBUG': 'false', 'ANSWER': '42'}
+
+
+@pytest.mark.parametrize('loader', ['from_json', 'from_toml', 'from_yaml', 'from_ini'])
+def test_structured_loaders_silent(tmpdir, loader):
+    """Check that missing files are ignored only in silent mode."""
+    missing = str(tmpdir.join('missing'))
+
+    assert getattr(config.Config(), loader)(missing, silent=True) is False
+    with pytest.raises(IOError):
+        getattr(config.Config(), loader)(missing)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1024])
+def test_json_object_reader(chunk_size):
+    """Check that items are decoded correctly regardless of chunk boundaries."""
+    import io
+    import json
+
+    document = {
+        'NUMBER': 1234567890, 'FLOAT': 1.5e-10, 'NULL': None, 'TRUE': True, 'EMPTY': {},
+        'NESTED': {'LIST': [1, [2, {'3': 'x y'}]]}, 'ESCAPED': u'"é\\n}', u'ключ': u'☃',
+    }
+    text = json.dumps(document, ensure_ascii=False, indent=1).encode('utf-8')
+
+    items = list(loaders.JSONObjectReader(io.BytesIO(text), chunk_size=chunk_size))
+
+    assert dict(items) == document
+    assert list(loaders.JSONObjectReader(io.BytesIO(b' { } '), chunk_size=chunk_size)) == []
+
+
+@pytest.mark.parametrize('text', [b'[1, 2]', b'{"A": 1', b'{"A" 1}', b'{"A": 1,}', b'{1: 2}',
+                                  b'{"A": 1} garbage', b'{} {}'])
+def test_json_object_reader_invalid(text):
+    """Check that invalid documents are not accepted."""
+    import io
+
+    with pytest.raises(ValueError):
+        list(loaders.JSONObjectReader(io.BytesIO(text), chunk_size=2))
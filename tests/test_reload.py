@@ -0,0 +1,176 @@
+"""Test hot reload of configs."""
+import os
+import sys
+import threading
+
+import pkg_resources
+import pytest
+
+import settei
+from settei import config
+from settei import discovery
+from settei import reload
+
+
+def default():
+    """Function which is used by entry points for getting settings for default environment."""
+    return config.Config({'QUESTION': 'The Ultimate Question of Life, the Universe, and Everything'})
+
+
+def from_file(default):
+    """Function which is used by entry points for getting settings from file."""
+    default.from_envvar('SETTEI_RELOAD_FILE')
+    return default
+
+
+def dev(from_file):
+    """Function which is used by entry points for getting settings which inherit settings from file."""
+    from_file['DEBUG'] = True
+    return from_file
+
+
+def live(default, from_file):
+    """Function which is used by entry points for getting settings which inherit settings from file as the second
+    dependency."""
+    default.update(from_file)
+    return default
+
+
+def get_entry_points(group, name=None):
+    """Create list of entry points."""
+    return [
+        pkg_resources.EntryPoint.parse('default = tests.test_reload:default'),
+        pkg_resources.EntryPoint.parse('from_file = tests.test_reload:from_file'),
+        pkg_resources.EntryPoint.parse('dev = tests.test_reload:dev'),
+        pkg_resources.EntryPoint.parse('live = tests.test_reload:live'),
+    ]
+
+
+@pytest.fixture
+def settings_file(monkeypatch, monkeypatch_entrypoint, tmpdir):
+    """Config file which is loaded by entry points."""
+    monkeypatch.setattr(pkg_resources, 'iter_entry_points', get_entry_points)
+    monkeypatch.setattr(discovery, '_backend', discovery.pkg_resources_backend)
+    settings_file = tmpdir.join('settings.py')
+    settings_file.write('ANSWER = 41\n')
+    monkeypatch.setenv('SETTEI_RELOAD_FILE', str(settings_file))
+    return settings_file
+
+
+def test_sources(settings_file):
+    """Check that config remembers files it was built from."""
+    dev_config = settei.get_config('application', 'dev')
+    default_config = settei.get_config('application', 'default')
+
+    assert dev_config.sources == set([str(settings_file), os.path.abspath(__file__)])
+    assert default_config.sources == set([os.path.abspath(__file__)])
+
+
+def test_reload(settings_file):
+    """Check that only configs built from changed file are rebuilt."""
+    dev_config = settei.get_config('application', 'dev')
+    default_config = settei.get_config('application', 'default')
+    settings_file.write('ANSWER = 42\n')
+
+    rebuilt = reload.Reloader().reload([str(settings_file)])
+
+    assert rebuilt == [('application', 'dev')]
+    assert settei.get_config('application', 'default') is default_config
+    assert dev_config['ANSWER'] == 41
+    assert settei.get_config('application', 'dev') == dict(default_config, ANSWER=42, DEBUG=True)
+    assert settei.get_config('application', 'from_file')['ANSWER'] == 42
+
+
+def test_reload_second_dependency(settings_file):
+    """Check that configs which inherit changed file through their second dependency are rebuilt."""
+    live_config = settei.get_config('application', 'live')
+    assert str(settings_file) in live_config.sources
+    settings_file.write('ANSWER = 42\n')
+
+    rebuilt = reload.Reloader().reload([str(settings_file)])
+
+    assert rebuilt == [('application', 'live')]
+    assert live_config['ANSWER'] == 41
+    assert settei.get_config('application', 'live')['ANSWER'] == 42
+
+
+def test_reload_error_keeps_config(settings_file):
+    """Check that config is kept if it can't be rebuilt."""
+    dev_config = settei.get_config('application', 'dev')
+    settings_file.write('ANSWER = \n')
+
+    assert reload.Reloader().reload([str(settings_file)]) == []
+    assert settei.get_config('application', 'dev') is dev_config
+
+
+def test_reload_module_error(monkeypatch, settings_file, tmpdir):
+    """Check that module which can't be reloaded doesn't stop rebuilding of configs."""
+    tmpdir.join('settei_reload_broken.py').write('ANSWER = 41\n')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    module = __import__('settei_reload_broken')
+    try:
+        settei.get_config('application', 'dev')
+        tmpdir.join('settei_reload_broken.py').write('ANSWER = \n')
+        settings_file.write('ANSWER = 42\n')
+
+        rebuilt = reload.Reloader().reload([module.__file__, str(settings_file)])
+    finally:
+        del sys.modules['settei_reload_broken']
+
+    assert rebuilt == [('application', 'dev')]
+    assert module.ANSWER == 41
+    assert settei.get_config('application', 'dev')['ANSWER'] == 42
+
+
+def test_reload_frozen(settings_file):
+    """Check that frozen configs are replaced with frozen ones."""
+    settei.preload('application', ['dev'], gc_freeze=False)
+    settings_file.write('ANSWER = 42\n')
+
+    assert reload.Reloader().reload([str(settings_file)]) == [('application', 'dev')]
+    dev_config = settei.get_config('application', 'dev')
+    assert isinstance(dev_config, config.FrozenConfig)
+    assert dev_config['ANSWER'] == 42
+
+
+@pytest.mark.parametrize('watcher_class', [
+    reload.PollingWatcher,
+    pytest.param(reload.InotifyWatcher, marks=pytest.mark.skipif(
+        not reload.InotifyWatcher.available(), reason='inotify is not available')),
+])
+def test_watcher(tmpdir, watcher_class):
+    """Check that watchers detect changed files."""
+    settings_file = tmpdir.join('settings.py')
+    settings_file.write('ANSWER = 41\n')
+    other_file = tmpdir.join('other.py')
+    paths = set([str(settings_file)])
+    stopped = threading.Event()
+    watcher = watcher_class()
+
+    try:
+        assert watcher.wait(paths, 0.01, stopped) == set()
+        other_file.write('ANSWER = 42\n')
+        settings_file.write('ANSWER = 42\n')
+        settings_file.setmtime(settings_file.mtime() + 1)
+        assert watcher.wait(paths, 0.5, stopped) == paths
+    finally:
+        watcher.close()
+
+
+def test_reloader_thread(settings_file):
+    """Check that started reloader rebuilds configs in background."""
+    import time
+
+    settei.get_config('application', 'dev')
+    reloader = reload.Reloader(interval=0.01, watcher=reload.PollingWatcher()).start()
+    try:
+        time.sleep(0.05)
+        settings_file.write('ANSWER = 42\n')
+        settings_file.setmtime(settings_file.mtime() + 1)
+        for _ in range(100):
+            if settei.get_config('application', 'dev')['ANSWER'] == 42:
+                break
+            time.sleep(0.01)
+        assert settei.get_config('application', 'dev')['ANSWER'] == 42
+    finally:
+        reloader.stop()
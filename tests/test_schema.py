@@ -0,0 +1,166 @@
+"""Test validation of configs."""
+import pytest
+
+import settei
+from settei import config, schema
+
+SCHEMA = {
+    'DEBUG': bool,
+    'WORKERS': schema.Field(int, check=lambda value: value > 0),
+    'LOG_LEVEL': schema.Field(str, choices=('DEBUG', 'INFO')),
+    'SENTRY_DSN': schema.Field(str, required=False),
+    'HOSTS': (list, tuple),
+    'SECRET': schema.Field(),
+    'DATABASES': {'default': {'HOST': str, 'PORT': int}},
+}
+
+VALID = {
+    'DEBUG': False,
+    'WORKERS': 4,
+    'LOG_LEVEL': 'INFO',
+    'HOSTS': ['example.com'],
+    'SECRET': object(),
+    'DATABASES': {'default': {'HOST': 'localhost', 'PORT': 5432}},
+    'UNKNOWN': 'not validated',
+}
+
+
+@pytest.fixture
+def application_schema():
+    """Register schema of the test application."""
+    yield schema.register('application', {'QUESTION': str, 'ANSWER': schema.Field(int, required=False)})
+    schema.register('application', None)
+
+
+def test_validate():
+    """Check that valid configs of all kinds pass."""
+    compiled = schema.Schema(SCHEMA)
+    for mapping in (VALID, config.Config(VALID), config.Config(VALID).freeze(), config.Config(VALID).overlay()):
+        assert compiled.validate(mapping) is mapping
+
+
+@pytest.mark.parametrize(('key', 'value', 'error'), [
+    ('DEBUG', 1, 'DEBUG should be bool, got int'),
+    ('WORKERS', True, 'WORKERS should be int, got bool'),
+    ('WORKERS', 0, 'WORKERS failed <lambda> check'),
+    ('LOG_LEVEL', 'TRACE', "LOG_LEVEL should be one of 'DEBUG', 'INFO', got 'TRACE'"),
+    ('LOG_LEVEL', [], "LOG_LEVEL should be str, got list"),
+    ('SENTRY_DSN', None, 'SENTRY_DSN should be str, got NoneType'),
+    ('HOSTS', 'example.com', 'HOSTS should be list or tuple, got str'),
+    ('DATABASES', [], 'DATABASES should be Mapping, got list'),
+    ('DATABASES', {'default': {'HOST': 'localhost', 'PORT': '5432'}}, 'DATABASES.default.PORT should be int, got str'),
+    ('DATABASES', {}, 'DATABASES.default is required'),
+])
+def test_validate_errors(key, value, error):
+    """Check that wrong values are reported with their keys."""
+    values = dict(VALID)
+    values[key] = value
+    with pytest.raises(schema.ValidationError) as e:
+        schema.validate(values, SCHEMA)
+    assert e.value.errors == [tuple(error.split(' ', 1))]
+    assert str(e.value) == "Config doesn't match the schema: {0}.".format(error)
+
+
+def test_validate_missing():
+    """Check that all missing required keys are reported, optional keys and unknown keys are not."""
+    with pytest.raises(schema.ValidationError) as e:
+        schema.validate({'UNKNOWN': 1}, SCHEMA)
+    assert e.value.errors == [(key, 'is required') for key in sorted(SCHEMA) if key != 'SENTRY_DSN']
+
+
+def test_validate_check_value_error():
+    """Check that ValueError of the custom check is reported."""
+    def port(value):
+        raise ValueError('{0} is reserved'.format(value))
+
+    with pytest.raises(schema.ValidationError) as e:
+        schema.validate({'PORT': 22}, {'PORT': schema.Field(int, check=port)})
+    assert e.value.errors == [('PORT', 'failed port check: 22 is reserved')]
+
+
+def test_validate_lazy():
+    """Check that lazy values are not computed by validation, computed ones are validated."""
+    calls = []
+    value = config.Lazy(lambda: calls.append(1) or 'forty two')
+    settings = config.Config({'ANSWER': value})
+    compiled = schema.Schema({'ANSWER': int})
+
+    compiled.validate(settings)
+    assert calls == []
+    assert settings['ANSWER'] == 'forty two'
+    with pytest.raises(schema.ValidationError):
+        compiled.validate(settings)
+
+
+def test_validate_frozen_cache(monkeypatch):
+    """Check that frozen configs are validated once per schema and results are forgotten with configs."""
+    compiled = schema.Schema(SCHEMA)
+    frozen = config.Config(VALID).freeze()
+    compiled.validate(frozen)
+
+    monkeypatch.setattr(compiled, 'validate_mapping', lambda mapping: pytest.fail('validated again'))
+    compiled.validate(frozen)
+    compiled.get_errors(frozen)
+
+    assert len(compiled.results) == 1
+    del frozen
+    assert len(compiled.results) == 0
+
+
+def test_validate_frozen_cache_errors():
+    """Check that errors of frozen configs are cached too."""
+    compiled = schema.Schema({'ANSWER': int})
+    frozen = config.FrozenConfig({'ANSWER': '42'})
+    for _ in range(2):
+        with pytest.raises(schema.ValidationError):
+            compiled.validate(frozen)
+    assert len(compiled.results) == 1
+
+
+def test_application_schema(monkeypatch, monkeypatch_pkg_resources, application_schema):
+    """Check that every config of the application is validated when it is built."""
+    assert settei.get_config('application', 'dev')['ANSWER'] == 42
+
+    def dev(default):
+        default['ANSWER'] = '42'
+        return default
+
+    monkeypatch.setattr('tests.test_get_entry_points.dev', dev)
+    settei.config_storage.clear()
+    with pytest.raises(schema.ValidationError) as e:
+        settei.get_config('application', 'dev')
+    assert str(e.value) == "Config of 'dev' environment doesn't match the schema: ANSWER should be int, got str."
+
+
+def test_entry_point_schema(monkeypatch, monkeypatch_pkg_resources):
+    """Check that schema declared on the entry point validates its config."""
+    @schema.validates({'ANSWER': int})
+    def default():
+        return config.Config({'QUESTION': 'The Ultimate Question of Life, the Universe, and Everything'})
+
+    monkeypatch.setattr('tests.test_get_entry_points.default', default)
+    with pytest.raises(schema.ValidationError) as e:
+        settei.get_config('application', 'default')
+    assert e.value.errors == [('ANSWER', 'is required')]
+    assert e.value.environment == 'default'
+
+
+def test_application_schema_requested_environment(monkeypatch, monkeypatch_pkg_resources):
+    """Check that schema of the application validates only requested environments, not the ones they inherit."""
+    def live(default, dev):
+        default.update(dev)
+        default['SECRET_KEY'] = 'secret'
+        return default
+
+    monkeypatch.setattr('tests.test_get_entry_points.live', live)
+    schema.register('application', {'SECRET_KEY': str})
+    try:
+        assert settei.get_config('application', 'live')['SECRET_KEY'] == 'secret'
+        settei.config_storage.clear()
+        assert settei.get_configs('application', ['live'])['live']['SECRET_KEY'] == 'secret'
+        with pytest.raises(schema.ValidationError) as e:
+            settei.get_config('application', 'dev')
+        assert e.value.errors == [('SECRET_KEY', 'is required')]
+        assert ('application', 'dev') not in settei.config_storage
+    finally:
+        schema.register('application', None)
@@ -0,0 +1,112 @@
+"""Test snapshots of resolved configs."""
+import datetime
+import sys
+
+import pytest
+
+import settei
+from settei import config
+from settei import discovery
+from settei import snapshot
+from tests.test_get_entry_points import default, dev
+
+
+@pytest.fixture
+def snapshot_path(tmpdir):
+    """Path to snapshot file."""
+    return str(tmpdir.join('settings.snapshot'))
+
+
+def test_export_and_load(monkeypatch, monkeypatch_pkg_resources, snapshot_path):
+    """Check that exported snapshot is loaded without building the config."""
+    exported = snapshot.export('application', 'dev', snapshot_path)
+    settei.config_storage.clear()
+
+    def build_disabled(self):
+        raise AssertionError('Config should be loaded from snapshot.')
+
+    monkeypatch.setattr(settei.ConfigGenerator, 'get_config', build_disabled)
+    loaded = settei.get_config('application', 'dev', snapshot=snapshot_path)
+
+    assert loaded == exported == dev(default())
+    assert type(loaded) is config.Config
+    assert loaded.sources == exported.sources
+    assert settei.get_config('application', 'dev') is loaded
+
+
+def test_values(snapshot_path):
+    """Check that values which marshal can't store are restored."""
+    now = datetime.datetime.now()
+    values = config.Config({
+        'DATE': now, 'TUPLE': (snapshot.TAG, 'pickle', b''), 'NESTED': {'SET': set([1, 2]), 'LIST': [now, (1, 2)]},
+        'FROZEN': config.Config({'HOSTS': ['example.com']}).freeze(), 'NONE': None,
+    })
+
+    snapshot.dump(values, snapshot_path, 'application', 'default')
+
+    assert snapshot.load(snapshot_path) == values
+
+
+def test_frozen(monkeypatch_pkg_resources, snapshot_path):
+    """Check that frozen snapshot is loaded as frozen config."""
+    snapshot.export('application', 'default', snapshot_path, freeze=True)
+
+    assert isinstance(snapshot.load(snapshot_path), config.FrozenConfig)
+
+
+def test_stale_snapshot(monkeypatch, monkeypatch_pkg_resources, snapshot_path, tmpdir):
+    """Check that stale snapshot is rejected and config is built instead."""
+    settings_file = tmpdir.join('settings.py')
+    settings_file.write('ANSWER = 42\n')
+    settings = config.Config()
+    settings.from_pyfile(str(settings_file))
+    snapshot.dump(settings, snapshot_path, 'application', 'default')
+
+    with pytest.raises(snapshot.StaleSnapshot):
+        snapshot.load(snapshot_path, 'application', 'dev')
+
+    settings_file.write('ANSWER = 4242\n')
+    with pytest.raises(snapshot.StaleSnapshot) as exc_info:
+        snapshot.load(snapshot_path)
+    assert 'config files were changed' in str(exc_info.value)
+    assert settei.get_config('application', 'default', snapshot=snapshot_path) == default()
+
+    settings_file.write('ANSWER = 42\n')
+    snapshot.dump(settings, snapshot_path, 'application', 'default')
+    monkeypatch.setattr(discovery, 'fingerprint', lambda: 'changed')
+    with pytest.raises(snapshot.StaleSnapshot):
+        snapshot.load(snapshot_path)
+
+
+def test_snapshot_launch(monkeypatch, snapshot_path, tmpdir):
+    """Check that snapshot is valid in processes which are launched differently and have other script paths."""
+    snapshot.dump(config.Config({'ANSWER': 42}), snapshot_path, 'application', 'default')
+    monkeypatch.syspath_prepend(str(tmpdir.mkdir('scripts')))
+    monkeypatch.setattr('sys.path', [''] + sys.path)
+
+    assert snapshot.load(snapshot_path) == {'ANSWER': 42}
+
+
+@pytest.mark.parametrize('content', [b'', b'garbage', snapshot.MAGIC + b'\xff\xff\xff\xff'])
+def test_invalid_snapshot(snapshot_path, content):
+    """Check that files which are not snapshots are rejected."""
+    with open(snapshot_path, 'wb') as snapshot_file:
+        snapshot_file.write(content)
+
+    with pytest.raises(snapshot.StaleSnapshot):
+        snapshot.load(snapshot_path)
+
+
+def test_cli(monkeypatch_pkg_resources, snapshot_path, capsys):
+    """Check command line interface."""
+    assert snapshot.main(['export', 'application', 'dev', snapshot_path]) == 0
+    assert snapshot.main(['show', snapshot_path]) == 0
+
+    assert "ANSWER = 42" in capsys.readouterr()[0]
+
+
+def test_lazy_values(snapshot_path):
+    """Check that lazy values are computed when snapshot is written."""
+    snapshot.dump(config.Config({'ANSWER': config.Lazy(lambda: 42)}), snapshot_path, 'application', 'default')
+
+    assert snapshot.load(snapshot_path) == {'ANSWER': 42}
@@ -0,0 +1,107 @@
+"""Test limits, invalidation and counters of the storage of configs."""
+import threading
+
+import settei
+from settei import config
+
+
+def test_storage_stats(monkeypatch_pkg_resources):
+    """Check that hits, misses and builds are counted."""
+    before = settei.config_storage.get_stats()
+    settei.get_config('application', 'dev')
+    settei.get_config('application', 'dev')
+    settei.get_configs('application', ['dev', 'live'])
+    stats = settei.config_storage.get_stats()
+
+    assert stats['size'] == 2
+    assert stats['hits'] - before['hits'] == 2
+    assert stats['misses'] - before['misses'] == 2
+    assert stats['builds'] - before['builds'] == 2
+    assert stats['build_time'] > before['build_time']
+
+
+def test_storage_stats_threads(monkeypatch_pkg_resources):
+    """Check that hits, misses and builds counted by concurrent threads are not lost."""
+    storage = settei.ConfigStorage({('application', 'dev'): config.Config({'ANSWER': 42})})
+
+    def read():
+        for _ in range(10000):
+            storage.lookup(('application', 'dev'))
+            storage.lookup(('application', 'missing'))
+            storage.record_build(0.5)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = storage.get_stats()
+    assert stats['hits'] == stats['misses'] == 80000
+    assert stats['builds'] == 80000 and stats['build_time'] == 40000
+    assert storage.get_stats()['hits'] == 80000
+
+
+def test_storage_maxsize(monkeypatch_pkg_resources):
+    """Check that least recently used configs are evicted."""
+    storage = settei.ConfigStorage(maxsize=2)
+    default = storage.__getitem__('application', 'default')
+    storage.__getitem__('application', 'dev')
+    assert storage.__getitem__('application', 'default') is default
+    storage.__getitem__('application', 'live')
+
+    assert sorted(storage) == [('application', 'default'), ('application', 'live')]
+    assert storage.get_stats()['evictions'] == 1
+    assert 'application' in storage.resolved
+
+    storage.configure(maxsize=1)
+    assert list(storage) == [('application', 'live')]
+    storage.configure(maxsize=0)
+    assert len(storage) == 0 and 'application' not in storage.resolved
+    assert storage.get_stats()['evictions'] == 3
+
+
+def test_storage_ttl(monkeypatch, monkeypatch_pkg_resources):
+    """Check that expired configs are built again."""
+    now = [100.0]
+    monkeypatch.setattr(settei.tracing, 'clock', lambda: now[0])
+    calls = []
+    monkeypatch.setattr('tests.test_get_entry_points.default', lambda: calls.append(1) or config.Config())
+    storage = settei.ConfigStorage(ttl=10)
+    default = storage.__getitem__('application', 'default')
+    storage.__getitem__('application', 'dev')
+
+    now[0] += 9
+    assert storage.__getitem__('application', 'default') is default
+    now[0] += 1
+    assert storage.__getitem__('application', 'default') is not default
+    assert len(calls) == 2
+    assert storage.get_stats()['expirations'] == 1
+    assert storage.get_stats()['builds'] == 3
+
+
+def test_storage_builds(monkeypatch_pkg_resources):
+    """Check that only configs built by invoking entry points are counted as builds."""
+    storage = settei.ConfigStorage(maxsize=1)
+    storage.__getitem__('application', 'live')
+    storage.__getitem__('application', 'dev')
+    storage.__getitem__('application', 'live')
+    assert storage.get_stats()['builds'] == 1
+
+
+def test_storage_invalidate(monkeypatch_pkg_resources):
+    """Check that configs of the application or of one environment are removed and built again."""
+    configs = settei.get_configs('application', ['default', 'dev', 'live'])
+    settei.get_config('application', 'dev', env_prefix='APP_')
+    storage = settei.config_storage
+
+    assert storage.invalidate('application', 'dev') == 1
+    assert ('application', 'dev') not in storage and 'application' not in storage.resolved
+    assert not storage.env_overlays
+    assert settei.get_config('application', 'dev') is not configs['dev']
+    assert settei.get_config('application', 'live') is configs['live']
+
+    assert storage.invalidate('application') == 3
+    assert storage.invalidate('missing') == 0
+    assert len(storage) == 0
+    assert storage.get_stats()['invalidations'] >= 4
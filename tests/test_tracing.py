@@ -0,0 +1,50 @@
+"""Test profiling of config resolution."""
+import json
+
+import settei
+from settei import tracing
+
+
+def test_trace(monkeypatch_pkg_resources):
+    """Check that discovery, loading, invocation and loaders are recorded as a tree."""
+    with tracing.trace() as tracer:
+        settei.get_config('application', 'settings_from_object_with_path_to_object')
+    settei.get_config('application', 'dev')
+
+    assert tracing.tracer is None
+    tree = tracer.to_dict()
+    assert [(span['kind'], span['name']) for span in tree] == [
+        ('discovery', 'settings_application'),
+        ('load', 'settings_from_object_with_path_to_object'),
+        ('load', 'default'),
+        ('invoke', 'default'),
+        ('invoke', 'settings_from_object_with_path_to_object'),
+    ]
+    assert [(span['kind'], span['name']) for span in tree[-1]['children']] == [
+        ('from_object', 'tests.test_get_entry_points.SettingsHandler')]
+    assert all(span['duration'] >= 0 and span['start'] >= 0 for span in tree)
+    assert json.loads(tracer.to_json()) == tree
+
+
+def test_collapsed(monkeypatch_pkg_resources, tmpdir):
+    """Check that collapsed stacks contain self time of every stack."""
+    settings_file = tmpdir.join('settings.json')
+    settings_file.write('{"ANSWER": 42}')
+
+    with tracing.trace() as tracer:
+        with tracer.span('invoke', 'default'):
+            settei.config.Config().from_json(str(settings_file))
+
+    lines = tracer.collapsed().splitlines()
+    assert [line.rsplit(' ', 1)[0] for line in lines] == [
+        'invoke:default', 'invoke:default;from_file:{0}'.format(settings_file)]
+    assert all(int(line.rsplit(' ', 1)[1]) >= 0 for line in lines)
+
+
+def test_nested_tracers():
+    """Check that previous tracer is enabled again when nested one is stopped."""
+    with tracing.trace() as outer:
+        with tracing.trace() as inner:
+            assert tracing.tracer is inner
+        assert tracing.tracer is outer
+    assert tracing.tracer is None